@@ -3,32 +3,36 @@
 from .core.node import Node, UsdNode, MetadataNode
 from .core.parameter import Parameter
 from .core.state import GraphState
+from .core.graph import PrimImportMask
 from .ui.nodeGraph import UsdNodeGraph
 from .ui.plugin import PluginContainer
 
 
-def setUsdFile(usdFile):
+def setUsdFile(usdFile, importMask=None):
     graph = UsdNodeGraph.getInstance()
     if graph is not None:
-        graph.setUsdFile(usdFile)
+        graph.setUsdFile(usdFile, importMask=importMask)
 
 
-def addUsdFile(usdFile):
+def addUsdFile(usdFile, importMask=None):
     graph = UsdNodeGraph.getInstance()
     if graph is not None:
-        graph.addUsdFile(usdFile)
+        graph.addUsdFile(usdFile, importMask=importMask)
 
 
-def addStage(stage, layer=None):
+def addStage(stage, layer=None, importMask=None):
     graph = UsdNodeGraph.getInstance()
     if graph is not None:
-        graph.addStage(stage, layer)
+        graph.addStage(stage, layer, importMask=importMask)
 
 
-def setStage(stage, layer=None):
+def setStage(stage, layer=None, importMask=None):
+    """
+    :param importMask: PrimImportMask(paths, maxDepth, primTypes) to open only some prims of the layer as nodes
+    """
     graph = UsdNodeGraph.getInstance()
     if graph is not None:
-        graph.setStage(stage, layer)
+        graph.setStage(stage, layer, importMask=importMask)
 
 
 def createNode(nodeType):
@@ -61,6 +65,12 @@ def findNodeAtPath(path):
         return graph.findNodeAtPath(path)
 
 
+def findNodesAtPaths(paths):
+    graph = UsdNodeGraph.getInstance()
+    if graph is not None:
+        return graph.findNodesAtPaths(paths)
+
+
 def applyChanges():
     graph = UsdNodeGraph.getInstance()
     if graph is not None:
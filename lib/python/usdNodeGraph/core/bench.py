@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+timings of the hot paths on synthetic graphs, run with: usdnodegraph bench [names...]
+each benchmark returns rows of (label, seconds, count), the best of the repeated runs
+"""
+
+import time
+from usdNodeGraph.core.parse._xml import ET
+
+
+def _bestTime(func, repeat):
+    best = None
+    for _ in range(max(1, repeat)):
+        start = time.time()
+        func()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def _createPrimGraph(primName):
+    from usdNodeGraph.core.graph import Graph
+
+    graph = Graph()
+    root = graph.createNode('Root')
+    prim = graph.createNode('PrimDefine')
+    prim.parameter('primName').setValueQuietly(primName)
+    graph.connect(root, prim)
+    return graph, prim
+
+
+def _nodeElement(nodeClass, name, params, outputs=(), inputs=()):
+    nodeElement = ET.Element('n', {'n': name, 'c': nodeClass})
+    for paramName, value, typeName in params:
+        paramElement = ET.SubElement(nodeElement, 'p', {'n': paramName, 'val': value})
+        if typeName is not None:
+            paramElement.set('t', typeName)
+            paramElement.set('cus', '1')
+    for tag, connections in [('o', outputs), ('i', inputs)]:
+        for otherName in connections:
+            ET.SubElement(nodeElement, tag, {
+                'n': 'output' if tag == 'o' else 'input',
+                'conN': otherName,
+                'conP': 'input' if tag == 'o' else 'output'
+            })
+    return nodeElement
+
+
+def createChainsElement(count):
+    """
+    :return: root element of count Root -> PrimDefine -> AttributeSet chains, 2 * count + 1 nodes
+    """
+    rootElement = ET.Element('usdnodegraph')
+    primNames = ['PrimDefine{}'.format(i) for i in range(count)]
+    rootElement.append(_nodeElement('Root', 'Root', [('x', '0.0', None), ('y', '0.0', None)], outputs=primNames))
+    for i, primName in enumerate(primNames):
+        attributeName = 'AttributeSet{}'.format(i)
+        rootElement.append(_nodeElement(
+            'PrimDefine', primName,
+            [('x', str(i * 150.0), None), ('y', '100.0', None), ('primName', 'p{}'.format(i), None)],
+            outputs=[attributeName], inputs=['Root']
+        ))
+        rootElement.append(_nodeElement(
+            'AttributeSet', attributeName,
+            [('x', str(i * 150.0), None), ('y', '200.0', None), ('size', str(float(i)), 'float')],
+            inputs=[primName]
+        ))
+    return rootElement
+
+
+TIME_SAMPLE_VALUES = [
+    ('float3', lambda i: (float(i), 2.0, 3.0)),
+    ('double', lambda i: float(i)),
+    ('float3[]', lambda i: [(float(i), 1.0, 2.0)] * 10),
+    ('token', lambda i: 't{}'.format(i)),
+]
+
+
+def benchTimeSamples(count=10000, repeat=3):
+    """
+    an AttributeSet with count keys written to the prim, against a Usd Set per key
+    """
+    rows = []
+    for typeName, makeValue in TIME_SAMPLE_VALUES:
+        graph, prim = _createPrimGraph('bench')
+        node = graph.createNode('AttributeSet')
+        graph.connect(prim, node)
+        parameter = node.addParameter('value', typeName, custom=True)
+        timeSamples = dict((float(i), makeValue(i)) for i in range(count))
+        parameter.setTimeSamplesQuietly(timeSamples)
+
+        stage = graph.executeToStage()
+        usdPrim = stage.GetPrimAtPath('/bench')
+        attribute = usdPrim.GetAttribute('value')
+        values = dict((t, attribute.Get(t)) for t in timeSamples)
+
+        def setPerKey():
+            attribute.Clear()
+            for t, value in timeSamples.items():
+                attribute.Set(value, t)
+
+        def execute():
+            attribute.Clear()
+            node.execute(stage, usdPrim)
+
+        rows.append(('{} per key Set'.format(typeName), _bestTime(setPerKey, repeat), count))
+        rows.append(('{} AttributeSet'.format(typeName), _bestTime(execute, repeat), count))
+        if dict((t, attribute.Get(t)) for t in timeSamples) != values:
+            raise Exception('time samples of {} differ from a Set per key'.format(typeName))
+    return rows
+
+
+# parts of the largest graph benchIndex is also timed at
+INDEX_SIZE_FRACTIONS = [0.05, 0.25, 0.5, 1.0]
+# the time per node at the largest graph may only grow this much over the smallest one
+INDEX_MAX_GROWTH = 4.0
+
+
+def _benchIndexSize(count, repeat):
+    from usdNodeGraph.core.graph import Graph
+
+    xmlString = ET.tostring(createChainsElement(count))
+    graphs = []
+
+    def load():
+        graph = Graph()
+        graph.loadFromXml(xmlString)
+        graphs.append(graph)
+
+    rows = [('loadFromXml', _bestTime(load, repeat), 2 * count + 1)]
+    graph = graphs[-1]
+    nodes = graph.allNodes()
+    names = [node.name() for node in nodes]
+    primPaths = [path for node in nodes for path in node.getPrimPath()]
+    nodeTypes = ['Root', 'PrimDefine', 'AttributeSet', ['PrimDefine', 'AttributeSet']]
+
+    def getNode():
+        for name in names:
+            graph.getNode(name)
+
+    # what getNode did before the index, on a sample of the names
+    sampleNames = names[::max(1, len(names) // 200)]
+
+    def scanNodes():
+        for name in sampleNames:
+            for node in nodes:
+                if node.name() == name:
+                    break
+
+    def getNodes():
+        for nodeType in nodeTypes * 10:
+            graph.getNodes(type=nodeType)
+
+    def getUniqueName():
+        for name in names:
+            graph.getUniqueName(name)
+
+    def getNodesAtPath():
+        for path in primPaths:
+            graph.getNodesAtPath(path)
+
+    rows.append(('getNode', _bestTime(getNode, repeat), len(names)))
+    rows.append(('scan of the nodes by name', _bestTime(scanNodes, repeat), len(sampleNames)))
+    rows.append(('getNodes by type', _bestTime(getNodes, repeat), len(nodeTypes) * 10))
+    rows.append(('getUniqueName of a taken name', _bestTime(getUniqueName, repeat), len(names)))
+    rows.append(('getNodesAtPath', _bestTime(getNodesAtPath, repeat), len(primPaths)))
+    return rows
+
+
+def benchIndex(count=20000, repeat=3):
+    """
+    load graphs of count nodes and of INDEX_SIZE_FRACTIONS of it with Graph.loadFromXml,
+    then look every node up by name, type and prim path.
+    the per node time of loading and of the lookups by node must stay about flat as the graph grows
+    """
+    rows = []
+    perNode = []
+    for fraction in INDEX_SIZE_FRACTIONS:
+        nodeCount = max(3, int(count * fraction))
+        sizeRows = _benchIndexSize(nodeCount // 2, repeat)
+        perNode.append(dict((label, seconds / itemCount) for label, seconds, itemCount in sizeRows))
+        rows.extend(
+            ('{} ({} nodes)'.format(label, 2 * (nodeCount // 2) + 1), seconds, itemCount)
+            for label, seconds, itemCount in sizeRows
+        )
+
+    # the scan is linear in the graph size and getNodes returns more nodes, they are not per node
+    for label in ['loadFromXml', 'getNode', 'getUniqueName of a taken name', 'getNodesAtPath']:
+        growth = perNode[-1][label] / max(perNode[0][label], 1e-9)
+        if growth > INDEX_MAX_GROWTH:
+            raise Exception('the time per node of {} grows {:.1f}x from the smallest graph'.format(label, growth))
+    return rows
+
+
+def benchXmlWrite(count=6000, repeat=3):
+    """
+    write count chains as .ung xml, against the ET.tostring and minidom round trip it replaced
+    """
+    import os
+    import tempfile
+    from xml.dom import minidom
+    from usdNodeGraph.core.parse._xml import XmlWriter, convertToString
+
+    rootElement = createChainsElement(count)
+    nodeCount = len(rootElement)
+    tempDir = tempfile.mkdtemp()
+    xmlFile = os.path.join(tempDir, 'bench.ung')
+
+    def prettyPrint():
+        minidom.parseString(ET.tostring(rootElement)).toprettyxml(indent='\t')
+
+    def toString():
+        convertToString(rootElement)
+
+    def toFile():
+        with open(xmlFile, 'w') as f:
+            writer = XmlWriter(f.write)
+            writer.writeDeclaration()
+            writer.startElement(rootElement.tag, rootElement.attrib)
+            for nodeElement in rootElement:
+                writer.writeElement(nodeElement)
+            writer.endElement()
+
+    try:
+        rows = [
+            ('minidom toprettyxml', _bestTime(prettyPrint, repeat), nodeCount),
+            ('convertToString', _bestTime(toString, repeat), nodeCount),
+            ('XmlWriter to a file', _bestTime(toFile, repeat), nodeCount),
+        ]
+        with open(xmlFile, 'r') as f:
+            if f.read() != convertToString(rootElement):
+                raise Exception('the file differs from convertToString')
+    finally:
+        if os.path.exists(xmlFile):
+            os.remove(xmlFile)
+        os.rmdir(tempDir)
+    return rows
+
+
+# name: (function, default count)
+BENCHMARKS = {
+    'index': (benchIndex, 20000),
+    'timesamples': (benchTimeSamples, 10000),
+    'xmlwrite': (benchXmlWrite, 6000),
+}
@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+
+from .core import Graph
+from .describe import PrimImportMask
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+
+import os
+import gc
+import shutil
+import tempfile
+import multiprocessing
+from pxr import Usd, Sdf
+from usdNodeGraph.core.graph.plan import STEP_EXECUTE
+from usdNodeGraph.core.state import GraphState
+from usdNodeGraph.utils.log import get_logger
+
+logger = get_logger('usdNodeGraph.branch')
+
+
+# nodes which can make a branch compose prims of other branches
+INTERNAL_REF_NODE_TYPES = ['Reference', 'Payload']
+BRANCH_LAYER_EXT = '.usdc'
+
+# plan, root layer, buckets of groups and output folder of the running executeBranches, the forked workers read it
+_forkTask = None
+
+
+def _findGroup(groupParents, index):
+    while groupParents[index] != index:
+        index = groupParents[index]
+    return index
+
+
+def getBranchGroups(plan):
+    """
+    group the children of the Root node into branches which author disjoint prim trees,
+    children with the same prim name or sharing nodes go into the same group
+    :param plan: ExecutionPlan
+    :return: list of groups in cook order, each a list of child step indexs, None if the graph can't be split
+    """
+    steps = plan.steps
+    if len(steps) == 0 or steps[0][1].Class() != 'Root':
+        return None
+
+    childIndexs = [index for index in range(1, steps[0][3]) if steps[index][2] == 0]
+    groupParents = dict([(index, index) for index in childIndexs])
+    nameIndexs = {}
+    nodeIndexs = {}
+
+    def union(index, other):
+        groupParents[_findGroup(groupParents, index)] = _findGroup(groupParents, other)
+
+    for childIndex in childIndexs:
+        stepType, node, _, end = steps[childIndex]
+        if stepType != STEP_EXECUTE or not node.NodeTypes().isSubType('Prim'):
+            return None
+        primName = node.parameter('primName').getValue()
+        if not Sdf.Path.IsValidIdentifier(primName):
+            return None
+
+        if primName in nameIndexs:
+            union(childIndex, nameIndexs[primName])
+        nameIndexs[primName] = childIndex
+
+        for index in range(childIndex, end):
+            n = steps[index][1]
+            if not n.incrementalCook:
+                # authors outside of its own prim tree
+                return None
+            if n.Class() in INTERNAL_REF_NODE_TYPES and n.parameter('assetPath').getValue() == '':
+                return None
+            if n in nodeIndexs and nodeIndexs[n] != childIndex:
+                union(childIndex, nodeIndexs[n])
+            nodeIndexs[n] = childIndex
+
+    groups = {}
+    for childIndex in childIndexs:
+        groups.setdefault(_findGroup(groupParents, childIndex), []).append(childIndex)
+    return sorted(groups.values(), key=lambda group: group[0])
+
+
+def _getTopPrimPaths(plan, childIndexs):
+    return [
+        Sdf.Path.absoluteRootPath.AppendChild(plan.steps[childIndex][1].parameter('primName').getValue())
+        for childIndex in childIndexs
+    ]
+
+
+def _getBuckets(plan, groups, count):
+    """
+    share the groups to count buckets of about the same number of steps
+    :return: list of buckets, each a list of child step indexs in cook order
+    """
+    buckets = [[] for _ in range(count)]
+    sizes = [0] * count
+    groupSizes = [(sum(plan.steps[index][3] - index for index in group), group) for group in groups]
+    for size, group in sorted(groupSizes, key=lambda item: -item[0]):
+        index = sizes.index(min(sizes))
+        buckets[index].extend(group)
+        sizes[index] += size
+    return [sorted(bucket) for bucket in buckets if len(bucket) > 0]
+
+
+def _cookBucket(bucketIndex):
+    plan, rootLayer, buckets, outputDir = _forkTask
+    bucket = buckets[bucketIndex]
+
+    layer = Sdf.Layer.CreateAnonymous()
+    layer.TransferContent(rootLayer)
+    stage = Usd.Stage.Open(layer)
+    rootPrim = stage.GetPseudoRoot()
+    cookedPaths = {}
+    errors = []
+    for childIndex in bucket:
+        stage = plan.execute(
+            stage, cookedPaths, start=childIndex, end=plan.steps[childIndex][3], prim=rootPrim,
+            logError=errors.append
+        )
+
+    # the parent only copies the prims of the bucket from it
+    layerFile = os.path.join(outputDir, '{}{}'.format(bucketIndex, BRANCH_LAYER_EXT))
+    layer.Export(layerFile)
+
+    # the nodes go back as their first step, the parent has the same plan
+    stepPaths = [
+        (plan.nodeSteps[node][0], [path.pathString for path in paths]) for node, paths in cookedPaths.items()
+    ]
+    return layerFile, stepPaths, errors
+
+
+def canForkProcesses():
+    """
+    :return: if this process can fork the workers of executeBranches
+    """
+    # a worker of another pool can't start processes
+    return hasattr(os, 'fork') and not multiprocessing.current_process().daemon
+
+
+def _newForkPool(processes):
+    # the objects of this process are left to the gc of the workers, so it doesn't copy all their pages
+    freeze = getattr(gc, 'freeze', None)
+    if freeze is not None:
+        freeze()
+    try:
+        getContext = getattr(multiprocessing, 'get_context', None)
+        if getContext is None:
+            return multiprocessing.Pool(processes)
+        return getContext('fork').Pool(processes)
+    finally:
+        if freeze is not None:
+            gc.unfreeze()
+
+
+def executeBranches(plan, stage, cookedPaths=None, processes=None, logError=None):
+    """
+    cook the branches under the Root node in forked processes, each process cooks a bucket of them
+    into a copy of the layer of stage, then their prims are copied back to stage
+    in the order a sequential cook creates them.
+    the processes are forked, so this is for a batch cook without a gui, on a system with fork.
+    :param plan: ExecutionPlan
+    :param stage: stage with the layer nodes executed
+    :param cookedPaths: if given, filled with the spec paths authored by each node
+    :param processes: pool size, cpu count if None
+    :param logError: called with the node execute errors, the logError function of GraphState if None
+    :return: the stage, None if there are less than two branches to cook or no processes
+    """
+    global _forkTask
+
+    groups = getBranchGroups(plan)
+    if groups is None or len(groups) < 2 or not canForkProcesses():
+        return None
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    buckets = _getBuckets(plan, groups, min(processes, len(groups)))
+
+    stage = plan.execute(stage, cookedPaths, start=0, end=1, logError=logError)
+    rootLayer = stage.GetRootLayer()
+
+    outputDir = tempfile.mkdtemp(prefix='usdNodeGraph_branches_')
+    _forkTask = (plan, rootLayer, buckets, outputDir)
+    try:
+        pool = _newForkPool(len(buckets))
+        try:
+            results = pool.map(_cookBucket, range(len(buckets)), chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+
+        childLayers = {}
+        for bucket, (layerFile, stepPaths, errors) in zip(buckets, results):
+            layer = Sdf.Layer.OpenAsAnonymous(layerFile)
+            for childIndex in bucket:
+                childLayers[childIndex] = layer
+            if cookedPaths is not None:
+                for index, paths in stepPaths:
+                    cookedPaths[plan.steps[index][1]] = [Sdf.Path(path) for path in paths]
+            for message in errors:
+                if logError is None:
+                    GraphState.executeFunction('logError', message)
+                else:
+                    logError(message)
+
+        copiedNames = set()
+        with Sdf.ChangeBlock():
+            for childIndex in sorted(childLayers.keys()):
+                primPath = _getTopPrimPaths(plan, [childIndex])[0]
+                layer = childLayers[childIndex]
+                if primPath.name in copiedNames or layer.GetPrimAtPath(primPath) is None:
+                    continue
+                Sdf.CopySpec(layer, primPath, rootLayer, primPath)
+                copiedNames.add(primPath.name)
+    finally:
+        _forkTask = None
+        shutil.rmtree(outputDir, ignore_errors=True)
+
+    logger.debug('cooked {} branch group(s) in {} process(es)'.format(len(groups), len(buckets)))
+
+    return stage
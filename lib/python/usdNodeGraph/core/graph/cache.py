@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+from collections import OrderedDict
+from pxr import Sdf
+from usdNodeGraph.utils.log import get_logger
+
+logger = get_logger('usdNodeGraph.cache')
+
+
+FRAGMENT_CACHE_MAX_SIZE = 64 * 1024 * 1024
+# fragments are kept at a short path, CopySpec maps the paths inside them back on replay
+FRAGMENT_ROOT_PATH = Sdf.Path('/ungFragment')
+
+SPEC_FIELD_SIZE = 64
+ARRAY_ITEM_SIZE = 16
+
+
+class CookFragment(object):
+    """
+    the prim spec a node left in the cooked layer, kept in its own small layer
+    """
+    def __init__(self, layer, specPath, primPath, size):
+        self.layer = layer
+        self.specPath = specPath
+        self.primPath = primPath
+        self.size = size
+
+
+class FragmentCache(object):
+    """
+    LRU cache of node cook fragments.
+    a key chains the signature of a step with the key of its upstream step and of the earlier specs at its output,
+    so the same key means the node runs on the same input and authors the same specs.
+    """
+    def __init__(self, maxSize=FRAGMENT_CACHE_MAX_SIZE):
+        self.maxSize = maxSize
+        self._fragments = OrderedDict()
+        self._signatures = {}
+        self.size = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def clear(self):
+        self._fragments = OrderedDict()
+        self._signatures = {}
+        self.size = 0
+
+    def stats(self):
+        return {
+            'fragments': len(self._fragments),
+            'size': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+    def resetStats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _getParameterSignature(self, parameter):
+        if parameter.hasConnect():
+            value = parameter.getConnect()
+        elif parameter.hasKey():
+            value = sorted(parameter.getTimeSamples().items())
+        elif parameter.hasSpecValue():
+            # the spec stands for its value, a big array is not read and printed
+            value = parameter.getSpecValue()
+        else:
+            value = parameter.getValue()
+        return parameter.name(), parameter.isOverride(), repr(value), sorted(parameter.getMetadatas().items())
+
+    def getNodeSignature(self, node):
+        """
+        the node type, parameters and metadata which decide what a node authors,
+        kept until the node is dirty again
+        """
+        signature = self._signatures.get(node)
+        if signature is None:
+            params = [
+                self._getParameterSignature(param) for param in node.parameters()
+                if param.name() not in node.cookIgnoreParameterNames
+            ]
+            metadata = sorted(node.getMetadatas().items()) if hasattr(node, 'getMetadatas') else []
+            signature = repr((node.Class(), params, metadata))
+            self._signatures[node] = signature
+        return signature
+
+    def discardNode(self, node):
+        self._signatures.pop(node, None)
+
+    def clearSignatures(self):
+        self._signatures = {}
+
+    def chainKey(self, key, *items):
+        sha = hashlib.sha1(key)
+        for item in items:
+            sha.update(item.encode('utf-8'))
+        return sha.digest()
+
+    def _estimateValueSize(self, value):
+        if hasattr(value, '__len__'):
+            return SPEC_FIELD_SIZE + len(value) * ARRAY_ITEM_SIZE
+        return SPEC_FIELD_SIZE
+
+    def _estimateFragmentSize(self, layer, rootPath):
+        # only attribute values are measured, other fields count as SPEC_FIELD_SIZE
+        size = 0
+        specs = [layer.GetPrimAtPath(rootPath)]
+        while specs:
+            spec = specs.pop()
+            size += len(spec.ListInfoKeys()) * SPEC_FIELD_SIZE
+            for propertySpec in spec.properties:
+                size += len(propertySpec.ListInfoKeys()) * SPEC_FIELD_SIZE
+                if propertySpec.HasInfo('default'):
+                    size += self._estimateValueSize(propertySpec.GetInfo('default'))
+                for time in layer.ListTimeSamplesForPath(propertySpec.path):
+                    size += self._estimateValueSize(layer.QueryTimeSample(propertySpec.path, time))
+            for variantSet in spec.variantSets:
+                for variant in variantSet.variants:
+                    specs.append(variant.primSpec)
+            specs.extend(spec.nameChildren)
+        return size
+
+    def _hasChildSpecs(self, spec):
+        # the children and the variant contents were authored by other nodes
+        if len(spec.nameChildren) > 0:
+            return True
+        for variantSet in spec.variantSets:
+            for variant in variantSet.variants:
+                if len(variant.primSpec.nameChildren) > 0 or len(variant.primSpec.properties) > 0:
+                    return True
+        return False
+
+    def store(self, key, layer, specPath, primPath):
+        """
+        copy the spec at specPath of layer into the cache
+        :return: False if the spec can't be cached
+        """
+        if not specPath.IsPrimPath():
+            # the pseudo root or a variant itself
+            return False
+        spec = layer.GetPrimAtPath(specPath)
+        if spec is None or self._hasChildSpecs(spec):
+            return False
+
+        fragmentLayer = Sdf.Layer.CreateAnonymous()
+        if not Sdf.CopySpec(layer, specPath, fragmentLayer, FRAGMENT_ROOT_PATH):
+            return False
+
+        size = self._estimateFragmentSize(fragmentLayer, FRAGMENT_ROOT_PATH)
+        if size > self.maxSize:
+            return False
+
+        old = self._fragments.pop(key, None)
+        if old is not None:
+            self.size -= old.size
+        self._fragments[key] = CookFragment(fragmentLayer, specPath, primPath, size)
+        self.size += size
+
+        while self.size > self.maxSize:
+            _, fragment = self._fragments.popitem(last=False)
+            self.size -= fragment.size
+            self.evictions += 1
+        return True
+
+    def replay(self, key, layer, specPath=None):
+        """
+        copy the fragment of key back to layer
+        :param specPath: the spec path the fragment is expected at
+        :return: the fragment, None if there is no fragment or it can't be copied
+        """
+        fragment = self._fragments.get(key)
+        if fragment is None or (specPath is not None and fragment.specPath != specPath):
+            self.misses += 1
+            return None
+        if layer.GetPrimAtPath(fragment.specPath.GetParentPath()) is None:
+            self.misses += 1
+            return None
+        if not Sdf.CopySpec(fragment.layer, FRAGMENT_ROOT_PATH, layer, fragment.specPath):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._fragments.pop(key)
+        self._fragments[key] = fragment
+        return fragment
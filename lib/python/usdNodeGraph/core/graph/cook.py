@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import traceback
+import multiprocessing
+from pxr import Sdf
+from usdNodeGraph.core.graph.core import Graph
+from usdNodeGraph.core.state import GraphState
+from usdNodeGraph.utils.log import get_logger
+
+logger = get_logger('usdNodeGraph.cook')
+
+
+UNG_EXT = '.ung'
+LAYER_EXTS = ['.usda', '.usd', '.usdc']
+DEFAULT_LAYER_EXT = '.usda'
+
+COOK_STATUS_OK = 'ok'
+COOK_STATUS_FAILED = 'failed'
+COOK_STATUS_SKIPPED = 'skipped'
+
+
+class CookJob(object):
+    def __init__(self, inputFile, ungFile, outputFile, layerFile=None, branchProcesses=1):
+        self.inputFile = inputFile
+        self.ungFile = ungFile
+        self.outputFile = outputFile
+        self.layerFile = layerFile
+        self.branchProcesses = branchProcesses
+
+    def key(self):
+        return self.ungFile, self.outputFile
+
+
+class CookResult(object):
+    def __init__(self, job, status=COOK_STATUS_OK, message='', times=None, errors=None):
+        self.job = job
+        self.status = status
+        self.message = message
+        self.times = times or {}
+        self.errors = errors or []
+
+    def totalTime(self):
+        return sum(self.times.values())
+
+    def toDict(self):
+        return {
+            'input': self.job.inputFile,
+            'ung': self.job.ungFile,
+            'output': self.job.outputFile,
+            'status': self.status,
+            'message': self.message,
+            'times': self.times,
+            'errors': self.errors,
+        }
+
+
+def _getExportFile(layerFile):
+    # same naming as GraphicsScene.exportToFile
+    base, exportExt = os.path.splitext(layerFile)
+    return base + '_export' + exportExt
+
+
+def resolveCookJob(inputFile, export=False, branchProcesses=1):
+    """
+    find the .ung graph and the output layer of an input file,
+    a layer uses its .ung sidecar like GraphicsScene.setStage does
+    :param inputFile: .ung file or usd layer
+    :param export: write to the _export layer like exportToFile instead of the layer itself
+    :param branchProcesses: processes to cook the branches under Root with, in a job cooked in this process
+    :return: CookJob
+    """
+    inputFile = os.path.abspath(inputFile)
+    base, ext = os.path.splitext(inputFile)
+
+    layerFile = None
+    if ext == UNG_EXT:
+        ungFile = inputFile
+        for layerExt in LAYER_EXTS:
+            if os.path.exists(base + layerExt):
+                layerFile = base + layerExt
+                break
+        outputFile = layerFile or base + DEFAULT_LAYER_EXT
+    else:
+        layerFile = inputFile
+        ungFile = base + UNG_EXT
+        outputFile = inputFile
+
+    if export:
+        outputFile = _getExportFile(outputFile)
+
+    return CookJob(inputFile, ungFile, outputFile, layerFile=layerFile, branchProcesses=branchProcesses)
+
+
+def cookJob(job):
+    """
+    load the graph of a job, cook it and save the output layer
+    :param job: CookJob
+    :return: CookResult
+    """
+    times = {}
+    errors = []
+
+    if not os.path.exists(job.ungFile):
+        return CookResult(job, COOK_STATUS_SKIPPED, message='no .ung graph: {}'.format(job.ungFile))
+
+    logErrorFunc = GraphState.getFunction('logError')
+    GraphState.setFunction('logError', errors.append)
+
+    try:
+        start = time.time()
+        layer = None
+        if job.layerFile is not None and os.path.exists(job.layerFile):
+            layer = Sdf.Layer.FindOrOpen(job.layerFile)
+        graph = Graph(layer=layer)
+        # every graph is cooked once here, nothing to replay
+        graph.fragmentCache = None
+        graph.cookProcesses = job.branchProcesses
+        graph.loadFromUng(job.ungFile)
+        times['load'] = time.time() - start
+
+        start = time.time()
+        stage = graph.executeToStage()
+        times['cook'] = time.time() - start
+
+        start = time.time()
+        stage.GetRootLayer().Export(job.outputFile)
+        times['save'] = time.time() - start
+    except Exception as e:
+        logger.debug(traceback.format_exc())
+        return CookResult(job, COOK_STATUS_FAILED, message='{}: {}'.format(type(e).__name__, e), times=times)
+    finally:
+        GraphState.setFunction('logError', logErrorFunc)
+
+    if len(errors) > 0:
+        return CookResult(
+            job, COOK_STATUS_FAILED,
+            message='{} node error(s), first: {}'.format(len(errors), errors[0].splitlines()[0]),
+            times=times, errors=errors
+        )
+    return CookResult(job, times=times)
+
+
+def cookJobs(jobs, processes=None, callback=None):
+    """
+    cook jobs in a process pool
+    :param jobs: list of CookJob
+    :param processes: pool size, cpu count if None, 1 cooks in this process
+    :param callback: called with each CookResult when it finishes
+    :return: list of CookResult in finish order
+    """
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    processes = max(1, min(processes, len(jobs)))
+
+    results = []
+    if processes == 1:
+        resultIter = (cookJob(job) for job in jobs)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(processes)
+        resultIter = pool.imap_unordered(cookJob, jobs)
+
+    try:
+        for result in resultIter:
+            results.append(result)
+            if callback is not None:
+                callback(result)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    return results
@@ -0,0 +1,790 @@
+# -*- coding: utf-8 -*-
+
+import re
+from pxr import Usd, Sdf
+from usdNodeGraph.core.node import Node
+from usdNodeGraph.core.layer import applyLayerDiff
+from usdNodeGraph.core.graph.plan import ExecutionPlan
+from usdNodeGraph.core.graph.cache import FragmentCache
+from usdNodeGraph.core.graph.branch import executeBranches
+from usdNodeGraph.core.graph.trie import PrimPathTrie
+from usdNodeGraph.core.parse._xml import ET, getConnections
+from usdNodeGraph.core.parse._journal import UngJournal
+from usdNodeGraph.utils.log import get_logger
+
+logger = get_logger('usdNodeGraph.graph')
+
+
+NODE_NAME_PATTERN = re.compile('(?P<suffix>[^\d]*)(?P<index>\d+)')
+
+
+class Graph(object):
+    """
+    pure data graph of node objects, cooks to a stage without any ui.
+    the graphics scene wraps one of these and keeps its connections synced.
+    """
+    def __init__(self, stage=None, layer=None):
+        self.stage = stage
+        self.layer = layer
+
+        self._resetNodeIndexs()
+        self._resetSaveState()
+        # counts every change of the nodes, it never goes back
+        self._changeCount = 0
+        self._plan = None
+        self._primPathsDeferred = 0
+        self._primPathsDirtyNodes = set()
+        self.fragmentCache = FragmentCache()
+        # more than 1 cooks the branches under Root in forked processes, see executeBranches
+        self.cookProcesses = 1
+        # threading.Event, a cook stops with CookCancelled when it is set
+        self.cancelEvent = None
+
+        self._resetCookState()
+
+    def _resetNodeIndexs(self):
+        # node: name, in add order
+        self._allNodes = {}
+        self._nodesOrder = {}
+        self._nodeCount = 0
+        # name: nodes with that name, type: {node: None}
+        self._nodesByName = {}
+        self._nodesByType = {}
+        # name suffix: max index in use
+        self._nodesSuffix = {}
+        # Sdf.Path: {node: None}, and the same paths keyed on their names without variant selections
+        self._primPathNodes = {}
+        self._primPathTrie = PrimPathTrie()
+        # node: change count of its last change
+        self._nodeChanges = {}
+
+    def _resetCookState(self):
+        self._cookStage = None
+        self._cookedPaths = {}
+        self._cookedLayerNodes = None
+        self._dirtyNodes = set()
+        self._fullCookRequired = True
+
+    def _resetSaveState(self):
+        # node: None, the nodes changed since they were saved
+        self._unsavedNodes = {}
+        # node: its name when it was saved, the names saved before which are not saved any more
+        self._savedNodeNames = {}
+        self._removedNodeNames = set()
+
+    def clear(self):
+        with self.deferPrimPaths():
+            for node in self.allNodes():
+                self.removeNode(node)
+        self._resetNodeIndexs()
+        self._resetSaveState()
+        self._plan = None
+        if self.fragmentCache is not None:
+            self.fragmentCache.clear()
+        self._resetCookState()
+
+    def _splitName(self, name):
+        match = re.match(NODE_NAME_PATTERN, name)
+        if match:
+            return match.group('suffix'), int(match.group('index'))
+        return name, 0
+
+    def getUniqueName(self, name):
+        if name not in self._nodesByName:
+            return name
+
+        suffix, index = self._splitName(name)
+        index = max(index, self._nodesSuffix.get(suffix, index))
+        while name in self._nodesByName:
+            index += 1
+            name = '{}{}'.format(suffix, index)
+
+        return name
+
+    def _indexNodeName(self, node, name):
+        self._nodesByName.setdefault(name, []).append(node)
+        suffix, index = self._splitName(name)
+        self._nodesSuffix[suffix] = max(index, self._nodesSuffix.get(suffix, index))
+
+    def _unindexNodeName(self, node, name):
+        nodes = self._nodesByName.get(name, [])
+        if node in nodes:
+            nodes.remove(node)
+        if len(nodes) == 0:
+            self._nodesByName.pop(name, None)
+
+    def _afterNodeNameChanged(self, node):
+        if node not in self._allNodes:
+            return
+        self._unindexNodeName(node, self._allNodes[node])
+        self._allNodes[node] = node.name()
+        self._indexNodeName(node, node.name())
+        # their connections refer to the node by name
+        for other in node.getSources() + node.getDestinations():
+            self.setNodeUnsaved(other)
+
+    def addNode(self, node):
+        name = node.name()
+
+        node.graph = self
+        self._allNodes.update({node: name})
+        self._nodesOrder[node] = self._nodeCount
+        self._nodeCount += 1
+        self._indexNodeName(node, name)
+        self._nodesByType.setdefault(node.nodeType, {})[node] = None
+        self._indexPrimPaths(node, node.getPrimPath())
+        self.setNodeUnsaved(node)
+        self.invalidatePlan()
+        self.updatePrimPaths([node])
+
+    def removeNode(self, node):
+        # disconnecting dirties the sources, their cook removes the specs of node
+        for source in node.getSources():
+            self.disconnect(source, node)
+        for destination in node.getDestinations():
+            self.disconnect(node, destination)
+
+        if node in self._allNodes:
+            self._unindexNodeName(node, self._allNodes.pop(node))
+            self._nodesOrder.pop(node)
+            self._nodesByType.get(node.nodeType, {}).pop(node, None)
+            self._unindexPrimPaths(node, node.getPrimPath())
+        self._dirtyNodes.discard(node)
+        self._unsavedNodes.pop(node, None)
+        if node in self._savedNodeNames:
+            self._removedNodeNames.add(self._savedNodeNames.pop(node))
+        self._nodeChanges.pop(node, None)
+        self._changeCount += 1
+        self._cookedPaths.pop(node, None)
+        if self.fragmentCache is not None:
+            self.fragmentCache.discardNode(node)
+        node.graph = None
+        self.invalidatePlan()
+
+    def createNode(self, nodeType, name=None, **kwargs):
+        """
+        :param nodeType: registered node type
+        :param name: wanted name, made unique in this graph
+        :return: the node object, None if the type is not registered
+        """
+        if nodeType not in Node.getAllNodeClassNames():
+            logger.warning('Un-Support Node Type: {}'.format(nodeType))
+            return
+        if name is None:
+            name = nodeType
+        nodeClass = Node.getNodeClass(nodeType)
+        node = nodeClass(
+            stage=self.stage, layer=self.layer,
+            name=self.getUniqueName(name),
+            **kwargs
+        )
+        self.addNode(node)
+        node.afterAddToGraph()
+        return node
+
+    def connect(self, source, destination):
+        # both keep the connections of their ports in the .ung
+        self.setNodeUnsaved(source)
+        self.setNodeUnsaved(destination)
+        if source in destination._sources:
+            return
+        source._destinations.append(destination)
+        destination._sources.append(source)
+        destination.setDirty()
+        self.invalidatePlan()
+        self.updatePrimPaths([destination])
+
+    def disconnect(self, source, destination):
+        self.setNodeUnsaved(source)
+        self.setNodeUnsaved(destination)
+        if source not in destination._sources:
+            return
+        source._destinations.remove(destination)
+        destination._sources.remove(source)
+        # the specs of destination were written by the cook of source, they go when it is cooked again
+        source.setDirty()
+        destination.setDirty()
+        self.invalidatePlan()
+        self.updatePrimPaths([destination])
+
+    def allNodes(self):
+        return list(self._allNodes.keys())
+
+    def getNode(self, nodeName):
+        nodes = self._nodesByName.get(nodeName)
+        if nodes:
+            return nodes[0]
+
+    def getNodes(self, type=None):
+        """
+        :param type: node type or list of node types, all nodes if None
+        :return: nodes in add order
+        """
+        if type is None:
+            return self.allNodes()
+        if not isinstance(type, (list, tuple)):
+            type = [type]
+        nodes = []
+        for nodeType in type:
+            nodes.extend(self._nodesByType.get(nodeType, {}).keys())
+        if len(type) > 1:
+            nodes.sort(key=self._nodesOrder.get)
+        return nodes
+
+    def getRootNode(self):
+        nodes = self.getNodes(type='Root')
+        if len(nodes) == 0:
+            return
+        return nodes[0]
+
+    # xml
+
+    def createParamFromXml(self, paramElement, node, specValues=None, sidecar=None):
+        paramName = paramElement.get('n')
+        if paramName in ['name']:
+            return
+
+        custom = paramElement.get('cus', '0')
+        parameterType = paramElement.get('t')
+        value = paramElement.get('val')
+        connect = paramElement.get('con')
+        samples = paramElement.findall('s')
+
+        if node.hasParameter(paramName):
+            parameter = node.parameter(paramName)
+        else:
+            parameter = node.addParameter(paramName, parameterType, custom=custom)
+        if parameter is None:
+            return
+
+        if connect is not None:
+            parameter.setConnectQuietly(connect)
+        specKey = paramElement.get('spec')
+        dataKey = paramElement.get('data')
+        if specKey is not None and specValues is not None:
+            parameter.setSpecValueQuietly(specValues[specKey])
+        elif dataKey is not None:
+            if sidecar is not None:
+                sidecar.readParameter(parameter, dataKey)
+            else:
+                logger.warning('No value sidecar for {}.{}'.format(node.name(), paramName))
+        elif len(samples) == 0:
+            parameter.setValueQuietly(parameter.convertValueFromPy(value))
+        else:
+            timeSamples = {}
+            for sampleElement in samples:
+                time = float(sampleElement.get('t'))
+                timeSamples[time] = parameter.convertValueFromPy(sampleElement.get('v'))
+            parameter.setTimeSamplesQuietly(timeSamples)
+
+        for metadataElement in paramElement.findall('m'):
+            parameter.setMetadata(metadataElement.get('k'), metadataElement.get('v'), valueType=metadataElement.get('t'))
+        for hintElement in paramElement.findall('h'):
+            parameter.setHint(hintElement.get('k'), hintElement.get('v'))
+
+    def createNodeFromXml(self, nodeElement, _newNodes, _nameConvertDict, specValues=None, sidecar=None):
+        oldNodeName = nodeElement.get('n')
+        nodeClass = nodeElement.get('c')
+        node = self.createNode(nodeClass, name=oldNodeName)
+        if node is None:
+            return
+
+        _newNodes.append(node)
+        _nameConvertDict.update({oldNodeName: node.name()})
+
+        for paramElement in nodeElement.findall('p'):
+            self.createParamFromXml(paramElement, node, specValues=specValues, sidecar=sidecar)
+
+        for metadataElement in nodeElement.findall('m'):
+            node.setMetadata(metadataElement.get('k'), metadataElement.get('v'), valueType=metadataElement.get('t'))
+
+        node.afterAddToGraph()
+
+    def createConnectFromXml(self, nodeElement, _nameConvertDict):
+        self.createConnects(nodeElement.get('n'), getConnections(nodeElement), _nameConvertDict)
+
+    def createConnects(self, oldNodeName, connections, _nameConvertDict):
+        """
+        :param connections: see getConnections
+        """
+        newNode = self.getNode(_nameConvertDict.get(oldNodeName))
+        if newNode is None:
+            return
+
+        for tag, portName, otherNodeName, otherPortName in connections:
+            # only the main input/output ports connect nodes, shader ports live on the parameters
+            if portName not in ['input', 'output'] or otherPortName not in ['input', 'output']:
+                continue
+            otherNode = self.getNode(_nameConvertDict.get(otherNodeName))
+            if otherNode is None:
+                otherNode = self.getNode(otherNodeName)
+                if otherNode is None:
+                    continue
+            if tag == 'o':
+                self.connect(newNode, otherNode)
+            else:
+                self.connect(otherNode, newNode)
+
+    def createNodesFromXml(self, rootElement, specValues=None, sidecar=None):
+        """
+        :param rootElement: root element, or an iterator of the node elements, each is read once
+        :param specValues: the SpecValues the elements refer to, see Parameter.toXmlElement
+        :param sidecar: ValueSidecar the big values of the elements are saved in
+        """
+        _nameConvertDict = {}
+        _newNodes = []
+        # the connections wait for the nodes they refer to, only they are kept of the elements
+        _connections = []
+        _strings = {}
+        with self.deferPrimPaths():
+            for nodeElement in rootElement:
+                self.createNodeFromXml(
+                    nodeElement, _newNodes, _nameConvertDict,
+                    specValues=specValues, sidecar=sidecar
+                )
+                connections = getConnections(nodeElement, _strings)
+                if len(connections) > 0:
+                    _connections.append((nodeElement.get('n'), connections))
+
+            for oldNodeName, connections in _connections:
+                self.createConnects(oldNodeName, connections, _nameConvertDict)
+
+        return _newNodes
+
+    def loadFromXml(self, xmlString, sidecar=None):
+        rootElement = ET.fromstring(xmlString)
+        return self.createNodesFromXml(rootElement, sidecar=sidecar)
+
+    def loadFromUng(self, ungFile):
+        """
+        :param ungFile: .ung, its journal is replayed on it
+        """
+        rootAttrib, nodeElements, sidecar = UngJournal(ungFile).stream()
+        return self.createNodesFromXml(nodeElements, sidecar=sidecar)
+
+    # save state
+
+    def _countNodeChange(self, node):
+        self._changeCount += 1
+        self._nodeChanges[node] = self._changeCount
+
+    def setNodeUnsaved(self, node):
+        if node in self._allNodes:
+            self._unsavedNodes[node] = None
+            self._countNodeChange(node)
+
+    def hasUnsavedChanges(self):
+        return len(self._unsavedNodes) > 0 or len(self._removedNodeNames) > 0
+
+    def getChangeCount(self):
+        return self._changeCount
+
+    def getNodesChangedSince(self, changeCount):
+        """
+        :param changeCount: a count getChangeCount returned before
+        :return: {node: None} of the nodes changed after it
+        """
+        return dict((node, None) for node, count in self._nodeChanges.items() if count > changeCount)
+
+    def getSaveChanges(self):
+        """
+        :return: the nodes changed since they were saved in add order,
+        and the names saved before which are gone, of the nodes removed or renamed
+        """
+        nodes = sorted(self._unsavedNodes, key=self._nodesOrder.get)
+        removedNames = set(self._removedNodeNames)
+        for node in nodes:
+            savedName = self._savedNodeNames.get(node)
+            if savedName is not None and savedName != node.name():
+                removedNames.add(savedName)
+        return nodes, sorted(removedNames)
+
+    def markSaved(self, nodes=None):
+        """
+        :param nodes: the nodes saved by an incremental save, None when the whole graph is saved
+        """
+        if nodes is None:
+            self._resetSaveState()
+            nodes = self.allNodes()
+        else:
+            self._removedNodeNames = set()
+        for node in nodes:
+            self._unsavedNodes.pop(node, None)
+            self._savedNodeNames[node] = node.name()
+
+    # prim paths
+
+    class PrimPathsDefer(object):
+        def __init__(self, graph):
+            self.graph = graph
+
+        def __enter__(self):
+            self.graph._primPathsDeferred += 1
+
+        def __exit__(self, *args):
+            self.graph._primPathsDeferred -= 1
+            if self.graph._primPathsDeferred == 0:
+                nodes = self.graph._primPathsDirtyNodes
+                self.graph._primPathsDirtyNodes = set()
+                self.graph.updatePrimPaths(nodes)
+
+    def deferPrimPaths(self):
+        """
+        update the prim paths once when leaving the context, for many connection changes
+        """
+        return self.PrimPathsDefer(self)
+
+    def _indexPrimPaths(self, node, primPaths):
+        for primPath in primPaths:
+            if primPath not in self._primPathNodes:
+                self._primPathNodes[primPath] = {}
+                self._primPathTrie.add(primPath)
+            self._primPathNodes[primPath][node] = None
+
+    def _unindexPrimPaths(self, node, primPaths):
+        for primPath in primPaths:
+            nodes = self._primPathNodes.get(primPath)
+            if nodes is None:
+                continue
+            nodes.pop(node, None)
+            if len(nodes) == 0:
+                self._primPathNodes.pop(primPath)
+                self._primPathTrie.remove(primPath)
+
+    def getNodesAtPath(self, primPath):
+        """
+        :param primPath: prim path, with variant selections for nodes inside a variant
+        :return: nodes with the prim path, sources get their paths before their destinations
+        """
+        return list(self._primPathNodes.get(Sdf.Path(primPath), {}).keys())
+
+    def getVariantPrimPaths(self, primPath):
+        """
+        :param primPath: prim path without variant selections
+        :return: the prim paths of nodes which are primPath with any variant selections
+        """
+        return self._primPathTrie.get(primPath)
+
+    def findNodesAbovePaths(self, paths):
+        """
+        find the deepest prim authored at or above each path, like for a stage selection
+        :param paths: prim paths without variant selections
+        :return: list of (found path, nodes) for each path, the first node of each prim path with any variant selections,
+        found path is None if no node authors any of it
+        """
+        results = []
+        for foundPath, primPaths in self._primPathTrie.findDeepestMany(paths):
+            nodes = [next(iter(self._primPathNodes[primPath])) for primPath in primPaths]
+            results.append((foundPath, nodes))
+        return results
+
+    def updatePrimPaths(self, nodes):
+        """
+        recompute the prim paths of nodes and their downstream nodes, every node after all of its sources
+        :param nodes: nodes whose sources or prim path parameters changed
+        """
+        if self._primPathsDeferred > 0:
+            self._primPathsDirtyNodes.update(nodes)
+            return
+
+        subtreeNodes = set()
+        for node in nodes:
+            if node not in subtreeNodes:
+                subtreeNodes.update(self._getSubtreeNodes(node))
+
+        sourceCounts = {}
+        for node in subtreeNodes:
+            sourceCounts[node] = len([n for n in node.getSources() if n in subtreeNodes])
+        readyNodes = [node for node, count in sourceCounts.items() if count == 0]
+        while readyNodes:
+            node = readyNodes.pop()
+            parentPaths = []
+            for source in node.getSources():
+                parentPaths.extend(source.getPrimPath())
+            oldPaths = node.getPrimPath()
+            node.reSyncPath(parentPaths)
+            if node in self._allNodes and node.getPrimPath() != oldPaths:
+                self._unindexPrimPaths(node, oldPaths)
+                self._indexPrimPaths(node, node.getPrimPath())
+            for destination in node.getDestinations():
+                sourceCounts[destination] -= 1
+                if sourceCounts[destination] == 0:
+                    readyNodes.append(destination)
+        # nodes in a cycle never get ready and keep their paths
+
+    def updateCollapsedSourcePaths(self):
+        """
+        after a cook is applied to the layer, collapsed prims are read from where they were cooked to
+        """
+        for node in self.getNodes(type=['PrimCollapsed', 'PrimPassThrough']):
+            primPaths = node.getPrimPath()
+            if len(primPaths) > 0:
+                node.parameter('sourcePath').setValueQuietly(primPaths[0].pathString)
+            if node.Class() == 'PrimPassThrough':
+                # the children of the nodes are in the layer by their current names
+                node.parameter('openedChildren').setValueQuietly(node.getChildNames())
+
+    # execute
+
+    def _getNodeY(self, node):
+        y = node.parameter('y').getValue()
+        return 0.0 if y is None else y
+
+    def invalidatePlan(self):
+        """
+        called when connections, node enable state or the nodes change
+        """
+        self._plan = None
+
+    def getExecutionPlan(self):
+        """
+        the cached plan, layer nodes are only re-sorted when one of them moved
+        :return: ExecutionPlan
+        """
+        layerNodes = self.getNodes(type='Layer')
+        layerKey = [(n, self._getNodeY(n)) for n in layerNodes]
+
+        if self._plan is None:
+            self._plan = ExecutionPlan(self.getRootNode())
+        if self._plan.layerKey != layerKey:
+            layerNodes.sort(key=self._getNodeY)
+            self._plan.layerNodes = layerNodes
+            self._plan.layerKey = layerKey
+        return self._plan
+
+    def executeToStage(self, cookedPaths=None, logError=None):
+        """
+        cook all nodes to a new in-memory stage
+        :param cookedPaths: if given, filled with the spec paths authored by each node
+        :param logError: called with the node execute errors, the logError function of GraphState if None
+        :return: the cooked stage
+        """
+        stage = Usd.Stage.CreateInMemory()
+
+        plan = self.getExecutionPlan()
+        stage = plan.executeLayers(stage, logError=logError)
+
+        if self.cookProcesses > 1 and self.cancelEvent is None:
+            branchStage = executeBranches(
+                plan, stage, cookedPaths, processes=self.cookProcesses, logError=logError
+            )
+            if branchStage is not None:
+                return branchStage
+
+        cache = self.fragmentCache
+        if cache is None:
+            return plan.execute(stage, cookedPaths, cancel=self.cancelEvent, logError=logError)
+
+        layerKey = [(layerPath, disable) for _, layerPath, disable in self._getLayerNodesKey()]
+        cacheKey = cache.chainKey(b'', repr(layerKey))
+        stage = plan.execute(
+            stage, cookedPaths, cache=cache, cacheKey=cacheKey, cancel=self.cancelEvent, logError=logError
+        )
+        logger.debug('fragment cache: {}'.format(cache.stats()))
+
+        return stage
+
+    def exportToString(self):
+        stage = self.executeToStage()
+        return stage.GetRootLayer().ExportToString()
+
+    # incremental cook
+
+    def setNodeDirty(self, node):
+        self._dirtyNodes.add(node)
+        # the changes which are not saved, like added parameters, still change the cook
+        if node in self._allNodes:
+            self._countNodeChange(node)
+        if self.fragmentCache is not None:
+            self.fragmentCache.discardNode(node)
+
+    def setCookDirty(self):
+        self._fullCookRequired = True
+        if self.fragmentCache is not None:
+            self.fragmentCache.clearSignatures()
+
+    def _getLayerNodesKey(self):
+        return [
+            (n, n.parameter('layerPath').getValue(), n.parameter('disable').getValue())
+            for n in self.getExecutionPlan().layerNodes
+        ]
+
+    def _getSubtreeNodes(self, node):
+        nodes = set()
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if current in nodes:
+                continue
+            nodes.add(current)
+            stack.extend(current.getDestinations())
+        return nodes
+
+    def _isCookOwner(self, node, sources):
+        # a prim node which authors exactly one spec outside of any variant
+        if not node.NodeTypes().isSubType('Prim'):
+            return False
+        if node.parameter('disable').getValue() or len(sources) != 1:
+            return False
+        paths = self._cookedPaths.get(node, [])
+        return len(paths) == 1 and not paths[0].ContainsPrimVariantSelection()
+
+    def _getCookOwner(self, node):
+        current = node
+        while True:
+            if current.Class() == 'Root':
+                return current
+            sources = current.getSources()
+            if self._isCookOwner(current, sources):
+                return current
+            if len(sources) == 0:
+                return None
+            if len(sources) > 1:
+                return self.getRootNode()
+            current = sources[0]
+
+    def _checkCookOwnerPath(self, owner):
+        source = owner.getSources()[0]
+        parentPaths = self._cookedPaths.get(source, [])
+        primName = owner.parameter('primName').getValue()
+        if len(parentPaths) != 1 or not Sdf.Path.IsValidIdentifier(primName):
+            return False
+        return parentPaths[0].AppendChild(primName) == self._cookedPaths[owner][0]
+
+    def _cookDirtyNodes(self, logError=None):
+        """
+        re-cook the subgraphs of dirty nodes on the last cooked stage
+        :param logError: see executeToStage
+        :return: changed spec paths, None if a full cook is needed
+        """
+        stage = self._cookStage
+        if stage is None or self._fullCookRequired:
+            return None
+        if self._getLayerNodesKey() != self._cookedLayerNodes:
+            return None
+        for node in self.allNodes():
+            if not node.incrementalCook:
+                return None
+
+        owners = set()
+        for node in self._dirtyNodes:
+            owner = self._getCookOwner(node)
+            if owner is None:
+                # disconnected, its old specs go with the old upstream owner
+                for n in self._getSubtreeNodes(node):
+                    if len(n.getSources()) > 1:
+                        return None
+                    self._cookedPaths.pop(n, None)
+                continue
+            if owner.Class() == 'Root':
+                return None
+            owners.add(owner)
+
+        # drop owners already covered by an upstream owner
+        for owner in list(owners):
+            sources = owner.getSources()
+            while len(sources) == 1:
+                if sources[0] in owners:
+                    owners.discard(owner)
+                    break
+                sources = sources[0].getSources()
+
+        plan = self.getExecutionPlan()
+        subtreeNodes = set()
+        ownerPaths = []
+        for owner in owners:
+            if not self._checkCookOwnerPath(owner) or plan.getNodeStep(owner) is None:
+                return None
+            nodes = self._getSubtreeNodes(owner)
+            for n in nodes:
+                if n is not owner and len(n.getSources()) > 1:
+                    return None
+            subtreeNodes.update(nodes)
+            ownerPaths.append(self._cookedPaths[owner][0])
+
+        # other nodes authoring under the owner paths need a full cook
+        for node, paths in self._cookedPaths.items():
+            if node in subtreeNodes:
+                continue
+            for path in paths:
+                for ownerPath in ownerPaths:
+                    if path.HasPrefix(ownerPath):
+                        return None
+
+        layer = stage.GetRootLayer()
+        cookedPaths = {}
+        for owner in owners:
+            ownerPath = self._cookedPaths[owner][0]
+            parentPath = self._cookedPaths[owner.getSources()[0]][0]
+            parentPrim = stage.GetPrimAtPath(parentPath)
+            if not parentPrim.IsValid() or layer.GetPrimAtPath(ownerPath) is None:
+                return None
+
+            self._clearPrimSpec(layer, ownerPath)
+            plan.executeNode(owner, stage, parentPrim, cookedPaths, logError=logError)
+
+        for node in subtreeNodes:
+            self._cookedPaths.pop(node, None)
+        self._cookedPaths.update(cookedPaths)
+
+        logger.debug('re-cooked {} prim(s), {} node(s)'.format(len(owners), len(subtreeNodes)))
+
+        return ownerPaths
+
+    def _clearPrimSpec(self, layer, path):
+        # empty the spec in place, so it keeps its position among its siblings
+        emptyLayer = Sdf.Layer.CreateAnonymous()
+        Sdf.CreatePrimInLayer(emptyLayer, path)
+        return Sdf.CopySpec(emptyLayer, path, layer, path)
+
+    def _cookAll(self, logError=None):
+        cookedPaths = {}
+        stage = self.executeToStage(cookedPaths, logError=logError)
+
+        self._cookStage = stage
+        self._cookedPaths = cookedPaths
+        self._cookedLayerNodes = self._getLayerNodesKey()
+        self._fullCookRequired = False
+        return stage
+
+    def getCookedPaths(self, node):
+        """
+        :return: the spec paths node authored in the last cook
+        """
+        return list(self._cookedPaths.get(node, []))
+
+    def inheritCookedPaths(self, node, paths):
+        """
+        node takes the place of a removed node which cooked paths, it is re-cooked there by an incremental cook
+        """
+        if paths:
+            self._cookedPaths[node] = list(paths)
+        node.setDirty()
+
+    def cookChanges(self, logError=None):
+        """
+        cook the dirty nodes on the last cooked stage, all nodes if they can't be cooked alone
+        :param logError: see executeToStage
+        :return: the changed spec paths, None if all nodes were cooked
+        """
+        changedPaths = self._cookDirtyNodes(logError=logError)
+        if changedPaths is None:
+            self._cookAll(logError=logError)
+        self._dirtyNodes = set()
+        return changedPaths
+
+    def applyCookedChanges(self, layer, changedPaths=None):
+        """
+        apply the last cook to layer
+        :param changedPaths: see cookChanges, the whole layer is diffed if None
+        """
+        cookedLayer = self._cookStage.GetRootLayer()
+        if changedPaths is None or not applyLayerDiff(cookedLayer, layer, changedPaths):
+            applyLayerDiff(cookedLayer, layer)
+
+    def applyChanges(self, layer):
+        """
+        cook the dirty nodes and apply the result to layer
+        :param layer: Sdf.Layer to edit
+        """
+        self.applyCookedChanges(layer, self.cookChanges())
@@ -0,0 +1,384 @@
+# -*- coding: utf-8 -*-
+
+import re
+import time
+from pxr import Sdf
+from usdNodeGraph.core.node import (
+    Node, TransformNode, AttributeSetNode, MetadataNode,
+    RelationshipSetNode, MaterialAssignNode, LIST_EDITOR_PROXY_OPS
+)
+from usdNodeGraph.core.state import GraphState
+
+
+VARIANT_PRIM_PATH_PATTERN = re.compile('.*{(?P<variantSet>.+)=(?P<variant>.+)}$')
+
+# source of the nodes connected to the node a prim is described under
+UP_NODE_INDEX = -1
+
+# check the cancel event every this many prims
+CANCEL_CHECK_PRIMS = 100
+
+
+# how a prim is imported by a PrimImportMask
+MASK_INCLUDED = 'included'
+MASK_ANCESTOR = 'ancestor'
+MASK_EXCLUDED = 'excluded'
+
+
+class ImportCancelled(Exception):
+    pass
+
+
+class PrimImportMask(object):
+    """
+    the prims of a layer opened as nodes, like a stage population mask.
+    the prims above them are PrimPassThrough nodes, which copy the children out of the mask unchanged.
+    """
+    def __init__(self, paths=None, maxDepth=None, primTypes=None):
+        """
+        :param paths: prim paths, the prims at or under them are opened, all the prims if None
+        :param maxDepth: number of prim levels opened under each path, None for no limit
+        :param primTypes: type names of the prims opened, the prims above them are passed through, None for any type
+        """
+        if paths:
+            self.paths = [Sdf.Path(path).StripAllVariantSelections() for path in paths]
+        else:
+            self.paths = [Sdf.Path.absoluteRootPath]
+        self.maxDepth = maxDepth
+        self.primTypes = set(primTypes) if primTypes else None
+
+    def isEmpty(self):
+        return self.paths == [Sdf.Path.absoluteRootPath] and self.maxDepth is None and self.primTypes is None
+
+    def getPathState(self, path):
+        """
+        :param path: prim path without variant selections
+        :return: MASK_INCLUDED if the prim may be opened, its type is not checked,
+        MASK_ANCESTOR if only prims under it are, MASK_EXCLUDED
+        """
+        isAncestor = False
+        for maskPath in self.paths:
+            if path.HasPrefix(maskPath):
+                depth = path.pathElementCount - maskPath.pathElementCount
+                if self.maxDepth is None or depth <= self.maxDepth:
+                    return MASK_INCLUDED
+            elif maskPath.HasPrefix(path):
+                isAncestor = True
+        return MASK_ANCESTOR if isAncestor else MASK_EXCLUDED
+
+    def isTypeIncluded(self, typeName):
+        return self.primTypes is None or typeName in self.primTypes
+
+
+class LayerDescription(object):
+    """
+    the nodes a layer opens as, without any node objects or items.
+    each node is a dict of:
+    nodeClass, name, primPath,
+    kwargs for the node object (prim specs are passed as they are, the nodes read their parameters from them),
+    params set on the node after it is created,
+    source, the index of the node it connects to, UP_NODE_INDEX or None,
+    pos, None to place it under its source
+    """
+    def __init__(self):
+        self.nodes = []
+        self.primCount = 0
+        # index of the last node of the described prim
+        self.lastIndex = None
+
+    def addNode(self, nodeClass, source=None, name=None, primPath=None, pos=None, **kwargs):
+        self.nodes.append({
+            'nodeClass': nodeClass,
+            'name': name,
+            'primPath': primPath,
+            'kwargs': kwargs,
+            'params': {},
+            'source': source,
+            'pos': pos,
+        })
+        return len(self.nodes) - 1
+
+    def getNodeCount(self):
+        return len(self.nodes)
+
+
+class LayerDescriber(object):
+    """
+    walk the specs of a layer to the nodes the scene creates for them, only reads the layer and the stage,
+    so it can run off the gui thread.
+    """
+    def __init__(self, layer, stage=None, lazyLoad=None, importMask=None, cancelEvent=None):
+        """
+        :param lazyLoad: see GraphState.getLazyLoad, the current one if None
+        :param importMask: PrimImportMask of the prims described, all the prims if None
+        :param cancelEvent: threading.Event, describing stops with ImportCancelled when it is set
+        """
+        self.layer = layer
+        self.stage = stage
+        self.lazyLoad = lazyLoad if lazyLoad is not None else GraphState.getLazyLoad()
+        self.importMask = importMask if importMask is not None and not importMask.isEmpty() else None
+        self.cancelEvent = cancelEvent
+
+        self.description = None
+        self.costTime = 0.0
+        # prim path: if any prim under it has a type of the mask
+        self._typedDescendants = {}
+
+    def describeLayer(self):
+        """
+        :return: LayerDescription of the Root node, the sublayer nodes and the prims
+        """
+        start = time.time()
+        self.description = LayerDescription()
+
+        rootIndex = self.description.addNode('Root')
+        for index, layerPath in enumerate(self.layer.subLayerPaths):
+            layerOffset = self.layer.subLayerOffsets[index]
+            self.description.addNode(
+                'Layer', pos=[-250, index * 150],
+                layerPath=layerPath, layerOffset=layerOffset
+            )
+        self._describeIntoPrim(self.layer.GetPrimAtPath('/'), rootIndex)
+
+        self.costTime = time.time() - start
+        return self.description
+
+    def describePrim(self, primSpec, depth=0, expand=True, skipChildren=None):
+        """
+        :param depth: number of prims above primSpec
+        :param expand: describe the nodes of primSpec even if it should be collapsed
+        :param skipChildren: names of the children of primSpec not described
+        :return: LayerDescription of the prim under UP_NODE_INDEX, its lastIndex is the last node of the prim
+        """
+        start = time.time()
+        self.description = LayerDescription()
+        self.description.lastIndex = self._describeIntoPrim(
+            primSpec, UP_NODE_INDEX, depth=depth, expand=expand, skipChildren=skipChildren
+        )
+        self.costTime = time.time() - start
+        return self.description
+
+    def _checkCancelled(self):
+        self.description.primCount += 1
+        if self.cancelEvent is None or self.description.primCount % CANCEL_CHECK_PRIMS != 0:
+            return
+        if self.cancelEvent.is_set():
+            raise ImportCancelled()
+
+    def _describeIntoPrim(self, primSpec, upIndex, depth=0, expand=False, skipChildren=None):
+        node = upIndex
+        children = primSpec.nameChildren.values()
+        if primSpec.path != Sdf.Path.absoluteRootPath:
+            self._checkCancelled()
+            maskState = MASK_INCLUDED if expand else self._getMaskState(primSpec)
+            if maskState == MASK_EXCLUDED or (
+                    maskState == MASK_INCLUDED and not expand and self._isPrimCollapsed(primSpec, depth)):
+                return self.description.addNode('PrimCollapsed', source=upIndex, sourcePath=primSpec.path)
+            if maskState == MASK_ANCESTOR:
+                # the children out of the mask are copied by the placeholder, not one node each
+                children = [child for child in children if self._getMaskState(child) != MASK_EXCLUDED]
+                node = self.description.addNode(
+                    'PrimPassThrough', source=upIndex, sourcePath=primSpec.path,
+                    openedChildren=[child.name for child in children]
+                )
+            else:
+                node = self._describePrim(primSpec, upIndex, depth=depth)
+        for child in children:
+            if skipChildren is None or child.name not in skipChildren:
+                self._describeIntoPrim(child, node, depth=depth + 1)
+        return node
+
+    def _getMaskState(self, primSpec):
+        if self.importMask is None or primSpec.path.IsPrimVariantSelectionPath():
+            return MASK_INCLUDED
+        maskState = self.importMask.getPathState(primSpec.path.StripAllVariantSelections())
+        if maskState != MASK_INCLUDED or self.importMask.isTypeIncluded(primSpec.typeName):
+            return maskState
+        if self._hasTypedDescendants(primSpec):
+            return MASK_ANCESTOR
+        return MASK_EXCLUDED
+
+    def _hasTypedDescendants(self, primSpec):
+        # each prim is visited once however deep the prims of the mask types are
+        path = primSpec.path
+        result = self._typedDescendants.get(path)
+        if result is not None:
+            return result
+        result = False
+        for child in primSpec.nameChildren.values():
+            if self.importMask.getPathState(child.path.StripAllVariantSelections()) != MASK_INCLUDED:
+                continue
+            if self.importMask.isTypeIncluded(child.typeName) or self._hasTypedDescendants(child):
+                result = True
+                break
+        self._typedDescendants[path] = result
+        return result
+
+    def _countPrims(self, primSpec, limit):
+        # stop counting once there are more than limit
+        count = 0
+        stack = [primSpec]
+        while stack and count <= limit:
+            spec = stack.pop()
+            count += 1
+            stack.extend(spec.nameChildren.values())
+            for variantSetSpec in spec.variantSets.values():
+                stack.extend([variantSpec.primSpec for variantSpec in variantSetSpec.variantList])
+        return count
+
+    def _isPrimCollapsed(self, primSpec, depth):
+        if primSpec.path.IsPrimVariantSelectionPath():
+            return False
+        maxDepth = self.lazyLoad.get('maxDepth')
+        if maxDepth is not None and depth > maxDepth:
+            return True
+        maxPrimCount = self.lazyLoad.get('maxPrimCount')
+        if maxPrimCount is not None and self._countPrims(primSpec, maxPrimCount) > maxPrimCount:
+            return True
+        return False
+
+    def _describePrim(self, primSpec, upIndex, depth=0):
+        description = self.description
+        skipAttribute = False
+
+        primPath = primSpec.path.pathString
+        match = re.match(VARIANT_PRIM_PATH_PATTERN, primPath)
+        if match:
+            upIndex = description.addNode(
+                'VariantSwitch', source=upIndex, primPath=primPath,
+                variantSetName=match.group('variantSet'),
+                variantSelected=match.group('variant')
+            )
+        else:
+            # prim define
+            specifier = primSpec.specifier
+            if specifier == Sdf.SpecifierDef:
+                typeName = primSpec.typeName
+                if typeName in ['Material', 'Shader']:
+                    primIndex = description.addNode(
+                        typeName, source=upIndex, name=primSpec.name, primPath=primPath,
+                        primSpec=primSpec
+                    )
+                    skipAttribute = True
+                elif typeName in Node.getAllNodeClassNames():
+                    primIndex = description.addNode(typeName, source=upIndex, primPath=primPath, primSpec=primSpec)
+                else:
+                    primIndex = description.addNode('PrimDefine', source=upIndex, primPath=primPath, primSpec=primSpec)
+            elif specifier == Sdf.SpecifierOver:
+                primIndex = description.addNode('PrimOverride', source=upIndex, primPath=primPath, primSpec=primSpec)
+            else:
+                return upIndex
+
+            upIndex = primIndex
+
+        # metadata
+        _tmpMetadataNodes = {}
+        _keys = [key for key in primSpec.ListInfoKeys() if key in MetadataNode.getIgnorePrimInfoKeys()]
+        for key in _keys:
+            nodeClass = MetadataNode.getMetadataNodeClass(key)
+            metadataIndex = _tmpMetadataNodes.get(nodeClass.nodeType)
+            if metadataIndex is None:
+                metadataIndex = description.addNode(nodeClass.nodeType, source=upIndex)
+                _tmpMetadataNodes.update({nodeClass.nodeType: metadataIndex})
+            description.nodes[metadataIndex]['params'][key] = primSpec.GetInfo(key)
+            upIndex = metadataIndex
+
+        # reference
+        referenceList = primSpec.referenceList
+        for op in LIST_EDITOR_PROXY_OPS:
+            items = getattr(referenceList, '{}Items'.format(op))
+            for reference in items:
+                upIndex = description.addNode('Reference', source=upIndex, primPath=primPath, reference=reference, op=op)
+
+        # payload
+        payloadList = primSpec.payloadList
+        for op in LIST_EDITOR_PROXY_OPS:
+            items = getattr(payloadList, '{}Items'.format(op))
+            for payload in items:
+                upIndex = description.addNode('Payload', source=upIndex, primPath=primPath, reference=payload, op=op)
+
+        # attribute
+        if not skipAttribute:
+            upIndex = self._describePrimAttributes(primSpec, upIndex)
+
+        # relationship
+        upIndex = self._describePrimRelationships(primSpec, upIndex)
+
+        # variant
+        selectedVariantDict = {}
+        variantSetNameList = primSpec.variantSetNameList
+        variantSetNameItems = variantSetNameList.GetAddedOrExplicitItems()
+        variantSelections = primSpec.variantSelections
+        if len(variantSetNameItems) > 0:
+            variantSets = primSpec.variantSets
+            for variantSetName, variantSetSpec in variantSets.items():
+                variantSetIndex = description.addNode(
+                    'VariantSet', source=upIndex,
+                    primPath=primPath,
+                    variantSetName=variantSetSpec.name,
+                    options=[v.name for v in variantSetSpec.variantList]
+                )
+
+                variantSelected = variantSelections.get(variantSetName)
+                variantSelectIndex = description.addNode(
+                    'VariantSelect', source=variantSetIndex, primPath=primPath,
+                    variantSetName=variantSetName,
+                    variantSelected=variantSelected,
+                    options=[v.name for v in variantSetSpec.variantList]
+                )
+                selectedVariantDict.update({variantSetName: variantSelected})
+
+                variantList = variantSetSpec.variantList
+                for i, variantSpec in enumerate(variantList):
+                    variantPrim = variantSpec.primSpec
+                    self._describeIntoPrim(variantPrim, variantSelectIndex, depth=depth)
+
+        for variantSetName, variantSelected in variantSelections.items():
+            if not variantSetName in selectedVariantDict:
+
+                variantNameList = None
+                # try to get variant list
+                if self.stage is not None:
+                    stagePrim = self.stage.GetPrimAtPath(primPath)
+                    if stagePrim.IsValid():
+                        variantSet = stagePrim.GetVariantSet(variantSetName)
+                        variantNameList = variantSet.GetVariantNames()
+
+                upIndex = description.addNode(
+                    'VariantSelect', source=upIndex, primPath=primPath,
+                    variantSetName=variantSetName,
+                    variantSelected=variantSelected,
+                    options=variantNameList
+                )
+
+        return upIndex
+
+    def _describePrimAttributes(self, primSpec, upIndex):
+        attrs = list(primSpec.attributes.keys())
+        if len(attrs) == 0:
+            return upIndex
+
+        if TransformNode._checkIsNodeNeeded(attrs):
+            upIndex = self.description.addNode(
+                'Transform', source=upIndex, primPath=primSpec.path.pathString, primSpec=primSpec
+            )
+        if AttributeSetNode._checkIsNodeNeeded(attrs):
+            upIndex = self.description.addNode(
+                'AttributeSet', source=upIndex, primPath=primSpec.path.pathString, primSpec=primSpec
+            )
+        return upIndex
+
+    def _describePrimRelationships(self, primSpec, upIndex):
+        attrs = list(primSpec.relationships.keys())
+        if len(attrs) == 0:
+            return upIndex
+
+        if MaterialAssignNode._checkIsNodeNeeded(attrs):
+            upIndex = self.description.addNode(
+                'MaterialAssign', source=upIndex, primPath=primSpec.path.pathString, primSpec=primSpec
+            )
+        if RelationshipSetNode._checkIsNodeNeeded(attrs):
+            upIndex = self.description.addNode(
+                'RelationshipSet', source=upIndex, primPath=primSpec.path.pathString, primSpec=primSpec
+            )
+        return upIndex
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+
+from usdNodeGraph.utils.log import get_logger
+
+logger = get_logger('usdNodeGraph.plan')
+
+
+STEP_EXECUTE = 0
+STEP_PASS = 1
+STEP_VARIANT_ENTER = 2
+STEP_VARIANT_EXIT = 3
+
+
+class CookCancelled(Exception):
+    pass
+
+
+class ExecutionPlan(object):
+    """
+    the graph flattened to a list of steps in cook order.
+    every step is (stepType, node, parentSlot, end):
+    parentSlot is the index of the step whose prim is the input of this step, -1 for no prim,
+    end is the index after the last step of the node subtree.
+    a node reached from several sources has one step per path, like the recursive cook.
+    """
+    def __init__(self, rootNode=None, layerNodes=None, layerKey=None):
+        self.steps = []
+        self.nodeSteps = {}
+        self.layerNodes = layerNodes or []
+        self.layerKey = layerKey
+
+        if rootNode is not None:
+            self._compile(rootNode)
+
+    def _addStep(self, stepType, node, parentSlot):
+        index = len(self.steps)
+        self.steps.append([stepType, node, parentSlot, index + 1])
+        return index
+
+    def _compile(self, rootNode):
+        # iterative depth first walk, so deep prim chains don't hit the recursion limit
+        path = set()
+        stack = [(rootNode, -1, None)]
+        while stack:
+            node, parentSlot, exitInfo = stack.pop()
+            if node is None:
+                # leaving a node: close its variant context and its subtree
+                index, variantParentSlot = exitInfo
+                if variantParentSlot is not None:
+                    self._addStep(STEP_VARIANT_EXIT, self.steps[index][1], variantParentSlot)
+                self.steps[index][3] = len(self.steps)
+                path.discard(self.steps[index][1])
+                continue
+
+            if node in path:
+                logger.warning('cycle found at node {}, skipped'.format(node.name()))
+                continue
+            path.add(node)
+
+            disable = node.hasParameter('disable') and node.parameter('disable').getValue()
+            index = self._addStep(STEP_PASS if disable else STEP_EXECUTE, node, parentSlot)
+            self.nodeSteps.setdefault(node, []).append(index)
+
+            variantParentSlot = None
+            if node.Class() == 'VariantSwitch':
+                self._addStep(STEP_VARIANT_ENTER, node, index)
+                variantParentSlot = index
+
+            stack.append((None, None, (index, variantParentSlot)))
+            for child in reversed(node.getDestinations()):
+                stack.append((child, index, None))
+
+    def getNodeStep(self, node):
+        """
+        :return: the step index of a node which is reached by only one path, None otherwise
+        """
+        indexs = self.nodeSteps.get(node, [])
+        if len(indexs) != 1:
+            return None
+        return indexs[0]
+
+    def executeLayers(self, stage, logError=None):
+        for node in self.layerNodes:
+            stage, _ = node.execute(stage, None, logError=logError)
+        return stage
+
+    def _getOutputSpecPath(self, node, stage, prim):
+        # the spec a node is expected to author, its own prim path or the one of its input
+        primPaths = node.getPrimPath() if hasattr(node, 'getPrimPath') else []
+        if len(primPaths) == 1:
+            path = primPaths[0]
+        elif prim is not None:
+            path = prim.GetPath()
+        else:
+            return None
+        return stage.GetEditTarget().MapToSpecPath(path)
+
+    def _executeStep(self, node, stage, prim, cache, cacheKey, specPath, logError):
+        if cache is not None and node.fragmentCache and specPath is not None:
+            layer = stage.GetEditTarget().GetLayer()
+            fragment = cache.replay(cacheKey, layer, specPath)
+            if fragment is not None:
+                node._beforeExecute(stage, prim)
+                return stage, stage.GetPrimAtPath(fragment.primPath)
+
+            stage, newPrim = node.execute(stage, prim, logError=logError)
+            if node.getExecuteError() is None and newPrim is not None and len(node.getPrimPath()) <= 1:
+                newSpecPath = stage.GetEditTarget().MapToSpecPath(newPrim.GetPath())
+                if newSpecPath == specPath:
+                    cache.store(cacheKey, layer, specPath, newPrim.GetPath())
+            return stage, newPrim
+
+        return node.execute(stage, prim, logError=logError)
+
+    def _updatePathKeys(self, pathKeys, specPath, key, cache):
+        # the key of a spec path covers the steps which authored it or a spec under it
+        pathKeys[specPath] = key
+        for path in specPath.GetParentPath().GetPrefixes():
+            pathKeys[path] = cache.chainKey(pathKeys.get(path, b'') + key)
+
+    def execute(
+            self, stage, cookedPaths=None, start=0, end=None, prim=None, cache=None, cacheKey=b'', cancel=None,
+            logError=None
+    ):
+        """
+        run the steps in [start, end)
+        :param prim: input prim of the first step
+        :param cookedPaths: if given, filled with the spec paths authored by each node
+        :param cache: FragmentCache to replay unchanged nodes from
+        :param cacheKey: key of the input prim of the first step
+        :param cancel: threading.Event checked before every step, raises CookCancelled when set
+        :param logError: called with the node execute errors, the logError function of GraphState if None
+        :return: the stage
+        """
+        if end is None:
+            end = len(self.steps)
+        prims = {-1: None}
+        if start < end:
+            prims[self.steps[start][2]] = prim
+        # step index: cache key of its output, spec path: key of the steps which authored at it
+        keys = {-1: cacheKey}
+        if start < end:
+            keys[self.steps[start][2]] = cacheKey
+        pathKeys = {}
+
+        variantContexts = []
+        try:
+            for index in range(start, end):
+                if cancel is not None and cancel.is_set():
+                    raise CookCancelled()
+                stepType, node, parentSlot, _ = self.steps[index]
+                specPath = None
+                if cache is not None and stepType in [STEP_EXECUTE, STEP_PASS]:
+                    # the upstream chain of the step and the earlier specs at its output decide what it authors,
+                    # the steps of other branches don't change its key. the spec path has the variant context.
+                    specPath = self._getOutputSpecPath(node, stage, prims[parentSlot])
+                    stepKey = keys[parentSlot] + pathKeys.get(specPath, b'')
+                    keys[index] = cache.chainKey(
+                        stepKey, str(stepType), str(specPath), cache.getNodeSignature(node)
+                    )
+
+                if stepType == STEP_EXECUTE:
+                    stage, newPrim = self._executeStep(
+                        node, stage, prims[parentSlot], cache, keys.get(index), specPath, logError
+                    )
+                    if cache is not None and newPrim is not None:
+                        newSpecPath = stage.GetEditTarget().MapToSpecPath(newPrim.GetPath())
+                        self._updatePathKeys(pathKeys, newSpecPath, keys[index], cache)
+                elif stepType == STEP_PASS:
+                    newPrim = prims[parentSlot]
+                elif stepType == STEP_VARIANT_ENTER:
+                    variantSet = node.getVariantSet(prims[parentSlot])
+                    currentSelected = variantSet.GetVariantSelection()
+                    variantSet.SetVariantSelection(node.getVariantSelection())
+                    editContext = variantSet.GetVariantEditContext()
+                    editContext.__enter__()
+                    variantContexts.append((variantSet, currentSelected, editContext))
+                    continue
+                else:
+                    variantSet, currentSelected, editContext = variantContexts.pop()
+                    editContext.__exit__(None, None, None)
+                    variantSet.SetVariantSelection(currentSelected)
+                    continue
+
+                prims[index] = newPrim
+                if cookedPaths is not None and newPrim is not None:
+                    specPath = stage.GetEditTarget().MapToSpecPath(newPrim.GetPath())
+                    cookedPaths.setdefault(node, []).append(specPath)
+        finally:
+            while variantContexts:
+                variantSet, currentSelected, editContext = variantContexts.pop()
+                editContext.__exit__(None, None, None)
+                variantSet.SetVariantSelection(currentSelected)
+
+        return stage
+
+    def executeNode(self, node, stage, prim, cookedPaths=None, logError=None):
+        """
+        run the subtree of a node which is reached by only one path
+        :param logError: see execute
+        :return: the stage, None if the node has no single step
+        """
+        index = self.getNodeStep(node)
+        if index is None:
+            return None
+        return self.execute(stage, cookedPaths, start=index, end=self.steps[index][3], prim=prim, logError=logError)
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+from pxr import Sdf
+
+
+class _TrieEntry(object):
+    __slots__ = ['children', 'primPaths']
+
+    def __init__(self):
+        # prim name: _TrieEntry
+        self.children = {}
+        # the prim paths with variant selections which strip to this entry, {Sdf.Path: None}
+        self.primPaths = {}
+
+
+class PrimPathTrie(object):
+    """
+    prim paths keyed on the names of their path without variant selections,
+    so a composed prim path from the stage finds the prim paths authoring it in O(depth).
+    """
+    def __init__(self):
+        self._root = _TrieEntry()
+
+    def clear(self):
+        self._root = _TrieEntry()
+
+    def _getNames(self, path):
+        path = Sdf.Path(path)
+        if path.ContainsPrimVariantSelection():
+            path = path.StripAllVariantSelections()
+        return [name for name in path.pathString.split('/') if name != '']
+
+    def add(self, primPath):
+        """
+        :param primPath: Sdf.Path, may have variant selections
+        """
+        entry = self._root
+        for name in self._getNames(primPath):
+            child = entry.children.get(name)
+            if child is None:
+                child = _TrieEntry()
+                entry.children[name] = child
+            entry = child
+        entry.primPaths[primPath] = None
+
+    def remove(self, primPath):
+        """
+        :param primPath: Sdf.Path, may have variant selections
+        """
+        entries = [self._root]
+        names = self._getNames(primPath)
+        for name in names:
+            entry = entries[-1].children.get(name)
+            if entry is None:
+                return
+            entries.append(entry)
+        entries[-1].primPaths.pop(primPath, None)
+
+        # drop the entries left without paths and children
+        for index in range(len(names), 0, -1):
+            entry = entries[index]
+            if len(entry.primPaths) > 0 or len(entry.children) > 0:
+                break
+            entries[index - 1].children.pop(names[index - 1])
+
+    def get(self, path):
+        """
+        :param path: prim path, variant selections are ignored
+        :return: the prim paths with any variant selections of path
+        """
+        entry = self._root
+        for name in self._getNames(path):
+            entry = entry.children.get(name)
+            if entry is None:
+                return []
+        return list(entry.primPaths.keys())
+
+    def findDeepest(self, path):
+        """
+        :param path: prim path, variant selections are ignored
+        :return: the deepest path at or above path with prim paths (without variant selections) and its prim paths,
+        (None, []) if there is none
+        """
+        names = self._getNames(path)
+        entry = self._root
+        depth = 0
+        foundDepth = None
+        foundEntry = None
+        while True:
+            if len(entry.primPaths) > 0:
+                foundDepth = depth
+                foundEntry = entry
+            if depth == len(names):
+                break
+            entry = entry.children.get(names[depth])
+            if entry is None:
+                break
+            depth += 1
+
+        if foundEntry is None:
+            return None, []
+        foundPath = Sdf.Path('/' + '/'.join(names[:foundDepth]))
+        return foundPath, list(foundEntry.primPaths.keys())
+
+    def findDeepestMany(self, paths):
+        """
+        :param paths: prim paths, like a multi-prim selection
+        :return: list of (found path, prim paths) for each path, see findDeepest
+        """
+        results = {}
+        for path in paths:
+            key = str(path)
+            if key not in results:
+                results[key] = self.findDeepest(path)
+        return [results[str(path)] for path in paths]
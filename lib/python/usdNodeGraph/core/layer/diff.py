@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+
+from pxr import Sdf
+from usdNodeGraph.utils.log import get_logger
+
+logger = get_logger('usdNodeGraph.layerDiff')
+
+
+LAYER_SUBLAYER_KEYS = ['subLayers', 'subLayerOffsets']
+PROPERTY_REQUIRED_KEYS = ['typeName']
+# read-only fields, only editable through the list editors, so the property is copied again
+PROPERTY_PATH_LIST_KEYS = ['connectionPaths', 'targetPaths']
+TIME_SAMPLES_KEY = 'timeSamples'
+DEFAULT_KEY = 'default'
+
+
+class LayerDiffApplier(object):
+    """
+    apply the difference of srcLayer to dstLayer spec by spec,
+    so dstLayer ends up with the same content as srcLayer
+    """
+    def __init__(self, srcLayer, dstLayer):
+        self.srcLayer = srcLayer
+        self.dstLayer = dstLayer
+        self.editCount = 0
+
+    def apply(self, primPaths=None):
+        with Sdf.ChangeBlock():
+            if primPaths is None:
+                self._diffLayerInfo()
+                self._diffSpecInfo(self.srcLayer.pseudoRoot, self.dstLayer.pseudoRoot, ignoreKeys=LAYER_SUBLAYER_KEYS)
+                self._diffPrimChildren(self.srcLayer.pseudoRoot, self.dstLayer.pseudoRoot)
+            else:
+                for primPath in primPaths:
+                    if not self._diffPrimAtPath(Sdf.Path(primPath)):
+                        return False
+        return True
+
+    def _diffPrimAtPath(self, path):
+        srcSpec = self.srcLayer.GetPrimAtPath(path)
+        dstSpec = self.dstLayer.GetPrimAtPath(path)
+        if srcSpec is None:
+            if dstSpec is not None:
+                parentSpec = self.dstLayer.GetPrimAtPath(path.GetParentPath())
+                del parentSpec.nameChildren[path.name]
+                self.editCount += 1
+            return True
+        if dstSpec is None:
+            if self.dstLayer.GetPrimAtPath(path.GetParentPath()) is None:
+                return False
+            self._copySpec(path)
+            return True
+        self._diffPrim(srcSpec, dstSpec)
+        return True
+
+    def _copySpec(self, path):
+        Sdf.CopySpec(self.srcLayer, path, self.dstLayer, path)
+        self.editCount += 1
+
+    def _diffLayerInfo(self):
+        srcPaths = list(self.srcLayer.subLayerPaths)
+        srcOffsets = list(self.srcLayer.subLayerOffsets)
+        if srcPaths != list(self.dstLayer.subLayerPaths):
+            self.dstLayer.subLayerPaths = srcPaths
+            self.editCount += 1
+        if srcOffsets != list(self.dstLayer.subLayerOffsets):
+            dstOffsets = self.dstLayer.subLayerOffsets
+            for index, offset in enumerate(srcOffsets):
+                dstOffsets[index] = offset
+            self.editCount += 1
+
+    def _isSameValue(self, srcValue, dstValue):
+        try:
+            return bool(srcValue == dstValue)
+        except Exception:
+            return False
+
+    def _diffSpecInfo(self, srcSpec, dstSpec, ignoreKeys=None):
+        ignoreKeys = ignoreKeys or []
+        srcKeys = [key for key in srcSpec.ListInfoKeys() if key not in ignoreKeys]
+        dstKeys = [key for key in dstSpec.ListInfoKeys() if key not in ignoreKeys]
+
+        for key in dstKeys:
+            if key not in srcKeys:
+                dstSpec.ClearInfo(key)
+                self.editCount += 1
+
+        for key in srcKeys:
+            if key == TIME_SAMPLES_KEY:
+                # SetInfo doesn't take time samples, they are set one by one
+                self._diffTimeSamples(srcSpec.path)
+                continue
+            srcValue = srcSpec.GetInfo(key)
+            if key not in dstKeys or not self._isSameValue(srcValue, dstSpec.GetInfo(key)):
+                self._setInfo(dstSpec, key, srcValue)
+                self.editCount += 1
+
+    def _setInfo(self, spec, key, value):
+        if key == DEFAULT_KEY and isinstance(spec, Sdf.AttributeSpec):
+            # cast to the type of the attribute, SetInfo would keep a python float as a double
+            spec.default = value
+        else:
+            spec.SetInfo(key, value)
+
+    def _diffTimeSamples(self, path):
+        srcTimes = self.srcLayer.ListTimeSamplesForPath(path)
+        dstTimes = self.dstLayer.ListTimeSamplesForPath(path)
+        for time in dstTimes:
+            if time not in srcTimes:
+                self.dstLayer.EraseTimeSample(path, time)
+                self.editCount += 1
+        for time in srcTimes:
+            srcValue = self.srcLayer.QueryTimeSample(path, time)
+            if time in dstTimes and self._isSameValue(srcValue, self.dstLayer.QueryTimeSample(path, time)):
+                continue
+            self.dstLayer.SetTimeSample(path, time, srcValue)
+            self.editCount += 1
+
+    def _removeChild(self, children, name):
+        del children[name]
+
+    def _diffChildren(self, srcChildren, dstChildren, diffFunc, removeFunc=None):
+        """
+        diff one kind of children, keep the children order of srcChildren.
+        children after the first out of order one are copied again from srcLayer.
+        """
+        if removeFunc is None:
+            removeFunc = lambda name: self._removeChild(dstChildren, name)
+        srcNames = list(srcChildren.keys())
+
+        for name in list(dstChildren.keys()):
+            if name not in srcChildren:
+                removeFunc(name)
+                self.editCount += 1
+
+        dstNames = list(dstChildren.keys())
+        index = 0
+        for srcIndex, name in enumerate(srcNames):
+            if index < len(dstNames) and dstNames[index] == name:
+                diffFunc(srcChildren[name], dstChildren[name])
+                index += 1
+            elif index == len(dstNames):
+                self._copySpec(srcChildren[name].path)
+            else:
+                for tailName in srcNames[srcIndex:]:
+                    if tailName in dstChildren:
+                        removeFunc(tailName)
+                    self._copySpec(srcChildren[tailName].path)
+                return
+
+    def _diffPrim(self, srcSpec, dstSpec):
+        self._diffSpecInfo(srcSpec, dstSpec)
+        self._diffChildren(srcSpec.properties, dstSpec.properties, self._diffProperty)
+        self._diffChildren(srcSpec.variantSets, dstSpec.variantSets, self._diffVariantSet)
+        self._diffPrimChildren(srcSpec, dstSpec)
+
+    def _diffPrimChildren(self, srcSpec, dstSpec):
+        self._diffChildren(srcSpec.nameChildren, dstSpec.nameChildren, self._diffPrim)
+
+    def _diffProperty(self, srcSpec, dstSpec):
+        sameType = type(srcSpec) is type(dstSpec)
+        for key in PROPERTY_REQUIRED_KEYS:
+            if not sameType or srcSpec.GetInfo(key) != dstSpec.GetInfo(key):
+                sameType = False
+        for key in PROPERTY_PATH_LIST_KEYS:
+            if not sameType:
+                break
+            if srcSpec.HasInfo(key) != dstSpec.HasInfo(key) or srcSpec.GetInfo(key) != dstSpec.GetInfo(key):
+                sameType = False
+        if not sameType:
+            dstSpec.owner.RemoveProperty(dstSpec)
+            self._copySpec(srcSpec.path)
+            return
+        self._diffSpecInfo(srcSpec, dstSpec, ignoreKeys=PROPERTY_PATH_LIST_KEYS)
+
+    def _diffVariantSet(self, srcSpec, dstSpec):
+        self._diffChildren(
+            srcSpec.variants, dstSpec.variants, self._diffVariant,
+            removeFunc=lambda name: dstSpec.RemoveVariant(dstSpec.variants[name])
+        )
+
+    def _diffVariant(self, srcSpec, dstSpec):
+        self._diffSpecInfo(srcSpec, dstSpec)
+        self._diffPrim(srcSpec.primSpec, dstSpec.primSpec)
+
+
+def applyLayerDiff(srcLayer, dstLayer, primPaths=None):
+    """
+    :param srcLayer: layer with the wanted content
+    :param dstLayer: layer to edit
+    :param primPaths: only diff the prim specs at these paths
+    :return: False if a prim path can't be diffed
+    """
+    applier = LayerDiffApplier(srcLayer, dstLayer)
+    result = applier.apply(primPaths)
+    logger.debug('layer diff applied, {} edit(s)'.format(applier.editCount))
+    return result
@@ -10,6 +10,8 @@ class CollectionCreateNode(UsdNode):
     nodeGroup = 'Custom'
     fillNormalColor = (7, 100, 50)
     borderNormalColor = (220, 250, 150)
+    incrementalCook = False
+    fragmentCache = False
 
     def _initParameters(self):
         super(CollectionCreateNode, self)._initParameters()
@@ -39,6 +41,8 @@ class MaterialAssign2Node(MaterialAssignNode):
     nodeGroup = 'Custom'
     borderNormalColor = (220, 250, 150)
     _ignoreExecuteParamNames = ['CEL']
+    incrementalCook = False
+    fragmentCache = False
 
     def _initParameters(self):
         super(MaterialAssign2Node, self)._initParameters()
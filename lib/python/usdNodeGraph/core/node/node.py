@@ -1,12 +1,10 @@
 # -*- coding: utf-8 -*-
 
-from usdNodeGraph.module.sqt import *
-from usdNodeGraph.ui.graph.const import *
 from usdNodeGraph.core.parameter import (
     Parameter, StringParameter, TextParameter, FloatParameter, BoolParameter, Color4fParameter
 )
 from usdNodeGraph.utils.log import get_logger
-from usdNodeGraph.ui.utils.log import LogWindow
+from usdNodeGraph.utils.signal import Signal
 from usdNodeGraph.core.state.core import GraphState
 
 logger = get_logger('usdNodeGraph.node')
@@ -22,11 +20,11 @@ class NodeTypes(object):
         return nodeType in self.parentNodeTypes
 
 
-class Node(QtCore.QObject):
-    parameterValueChanged = QtCore.Signal(object)
-    parameterAdded = QtCore.Signal(object)
-    parameterRemoved = QtCore.Signal(object)
-    parameterPagesCleared = QtCore.Signal()
+class Node(object):
+    parameterValueChanged = Signal(object)
+    parameterAdded = Signal(object)
+    parameterRemoved = Signal(object)
+    parameterPagesCleared = Signal()
 
     _nodeTypes = {}
 
@@ -42,6 +40,10 @@ class Node(QtCore.QObject):
     _expressionMap = {}
 
     liveUpdateParameterNames = []
+    typeTagVisible = False
+    cookIgnoreParameterNames = ['name', 'label', 'x', 'y', 'locked', 'fillColor', 'borderColor']
+    incrementalCook = True
+    fragmentCache = True
 
     @classmethod
     def convertColorToFloat(cls, color):
@@ -102,12 +104,20 @@ class Node(QtCore.QObject):
 
     @classmethod
     def NodeTypes(cls):
-        return NodeTypes(cls)
+        # one per class, not inherited from the parent class
+        nodeTypes = cls.__dict__.get('_nodeTypesObject')
+        if nodeTypes is None:
+            nodeTypes = NodeTypes(cls)
+            cls._nodeTypesObject = nodeTypes
+        return nodeTypes
 
     def __init__(self, item=None):
         super(Node, self).__init__()
 
         self.item = item
+        self.graph = None
+        self._sources = []
+        self._destinations = []
         self._parameters = {}
         self._parametersName = []
         self._updateToDated = False
@@ -158,7 +168,7 @@ class Node(QtCore.QObject):
 
     def hasProperty(self, name):
         if name in ['x', 'y']:
-            return True
+            return self.item is not None
         return False
 
     def getProperty(self, name):
@@ -169,6 +179,9 @@ class Node(QtCore.QObject):
 
     def _paramterValueChanged(self, parameter):
         logger.debug('{}, {}'.format(parameter.name(), parameter.getValue()))
+        if parameter.name() not in self.cookIgnoreParameterNames:
+            self.setDirty()
+        self.setUnsaved()
         self.parameterValueChanged.emit(parameter)
         self._whenParamterValueChanged(parameter)
         GraphState.executeCallbacks(
@@ -177,13 +190,46 @@ class Node(QtCore.QObject):
         )
 
     def _whenParamterValueChanged(self, parameter):
-        if parameter.name() == 'name':
-            self.item.scene()._afterNodeNameChanged(self.item)
+        if parameter.name() == 'name' and self.graph is not None:
+            self.graph._afterNodeNameChanged(self)
+        if parameter.name() == 'disable' and self.graph is not None:
+            self.graph.invalidatePlan()
         if parameter.name() in self.getLiveUpdateParameterNames():
             self._liveUpdateRequired()
 
     def _liveUpdateRequired(self):
-        self.item.scene().liveUpdateRequired()
+        if self.item is not None and self.item.scene() is not None:
+            self.item.scene().liveUpdateRequired()
+
+    def setDirty(self):
+        if self.graph is not None:
+            self.graph.setNodeDirty(self)
+
+    def setUnsaved(self):
+        """
+        the node is saved with the next incremental save
+        """
+        if self.graph is not None:
+            self.graph.setNodeUnsaved(self)
+
+    def afterAddToGraph(self):
+        pass
+
+    def getSources(self):
+        return list(self._sources)
+
+    def getDestinations(self):
+        return list(self._destinations)
+
+    def _setConnections(self, sources, destinations):
+        sourcesChanged = list(sources) != self._sources
+        self._sources = list(sources)
+        self._destinations = list(destinations)
+        if self.graph is not None:
+            self.graph.invalidatePlan()
+            # new destinations update their own paths when their sources change
+            if sourcesChanged:
+                self.graph.updatePrimPaths([self])
 
     def addParameter(self, parameterName, parameterType, defaultValue=None, **kwargs):
         """
@@ -200,7 +246,7 @@ class Node(QtCore.QObject):
         parameterClass = Parameter.getParameter(parameterType)
         if parameterClass is None:
             message = 'Un-Support Parameter Type in addParameter! {}: {}'.format(parameterName, parameterType)
-            LogWindow.warning(message)
+            GraphState.executeFunction('logWarning', message)
             logger.warning(message)
             return
 
@@ -213,6 +259,7 @@ class Node(QtCore.QObject):
         self._parameters.update({parameterName: parameter})
         self._parametersName.append(parameterName)
 
+        self.setDirty()
         self.parameterAdded.emit(parameter)
 
         return parameter
@@ -222,6 +269,7 @@ class Node(QtCore.QObject):
             # parameter = self.parameter(parameterName)
             self._parameters.pop(parameterName)
             self._parametersName.remove(parameterName)
+            self.setDirty()
             self.parameterRemoved.emit(parameterName)
 
     def clearPages(self):
@@ -1,7 +1,6 @@
 # -*- coding: utf-8 -*-
 
 from pxr import Sdf
-from usdNodeGraph.module.sqt import *
 from .node import Node
 from .usdNode import UsdNode, _AttributeNode, _PrimAttributeNode
 from ..parameter.params import TokenParameter
@@ -47,7 +46,7 @@ class _UsdShadeNode(_PrimAttributeNode):
         validConnectionTypes = kwargs.get('hints', {}).get('validConnectionTypes', '')
         if page != '':
             portLabel = '>'.join(page.split('.')) + '>' + portLabel
-        if parameter is not None and connectable:
+        if parameter is not None and connectable and self.item is not None:
             if parameterName.startswith(INPUT_ATTRIBUTE_PREFIX):
                 self.item.addShaderInputPort(
                     parameterName, label=portLabel,
@@ -69,6 +68,9 @@ class _UsdShadeNode(_PrimAttributeNode):
     def connectShader(self, parameter, emitSignal=False):
         paramName = parameter.name()
         paramPrefix = INPUT_ATTRIBUTE_PREFIX if self.Class() == 'Shader' else OUTPUT_ATTRIBUTE_PREFIX
+        if self.item is None:
+            # without ports, the connection only lives on the parameter
+            return
         if paramName.startswith(paramPrefix):
             if parameter.hasConnect():
                 connectPath = parameter.getConnect()
@@ -102,6 +104,10 @@ class ShaderNode(_UsdShadeNode):
     def __init__(self, *args, **kwargs):
         super(ShaderNode, self).__init__(*args, **kwargs)
 
+    def afterAddToGraph(self):
+        super(ShaderNode, self).afterAddToGraph()
+        self.resetParameters()
+
     def _syncParameters(self):
         super(ShaderNode, self)._syncParameters()
 
@@ -121,9 +127,10 @@ class ShaderNode(_UsdShadeNode):
         super(ShaderNode, self)._whenParamterValueChanged(parameter)
 
         if parameter.name() == 'info:id':
-            if self.item.scene() is not None:
+            if self.graph is not None:
                 self.resetParameters()
-                self.item.forceUpdatePanelUI()
+                if self.item is not None:
+                    self.item.forceUpdatePanelUI()
 
     def _clearParameters(self):
         self._oldShaderParameters = {}
@@ -136,9 +143,10 @@ class ShaderNode(_UsdShadeNode):
             param = self.parameter(name)
             self._oldShaderParameters.update({name: param})
             self.removeParameter(name)
-            port = self.item.getPort(name)
-            if port is not None:
-                port.destroy()
+            if self.item is not None:
+                port = self.item.getPort(name)
+                if port is not None:
+                    port.destroy()
 
         self.clearPages()
 
@@ -180,6 +188,7 @@ class ShaderNode(_UsdShadeNode):
             oldParam = self._oldShaderParameters.get(paramName)
             if oldParam is not None:
                 param._metadata = oldParam._metadata
+                param._metadataTypes = oldParam._metadataTypes
                 if oldParam.isOverride():
                     if oldParam.hasConnect():
                         param.setConnectQuietly(oldParam.getConnect())
@@ -203,8 +212,9 @@ class ShaderNode(_UsdShadeNode):
             paramName = '{}{}'.format(OUTPUT_ATTRIBUTE_PREFIX, outputName)
             self._addParameterFromProperty(paramName, output)
 
-        self.item.setLabelVisible(True)
-        self.item.setPortsLabelVisible(True)
+        if self.item is not None:
+            self.item.setLabelVisible(True)
+            self.item.setPortsLabelVisible(True)
 
     def resetParameters(self):
         shaderName = self.parameter('info:id').getValue()
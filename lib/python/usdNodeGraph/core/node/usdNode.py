@@ -4,13 +4,16 @@ import json
 import traceback
 from pxr import Usd, Sdf, Kind, UsdGeom, Vt
 from .node import Node
-from usdNodeGraph.ui.graph.other.tag import PixmapTag
-from usdNodeGraph.core.parameter import Vec3fParameter, TokenArrayParameter
+from usdNodeGraph.core.parameter import Vec3fParameter, TokenArrayParameter, SpecValue
+from usdNodeGraph.core.parameter.codec import encodeValue, decodeValue
 from usdNodeGraph.utils.const import consts
 from usdNodeGraph.core.state.core import GraphState
-from usdNodeGraph.ui.utils.log import LogWindow
 from usdNodeGraph.utils.pyversion import *
 
+
+# parameters which change the prim paths of a node and its downstream nodes
+PRIM_PATH_PARAMETER_NAMES = ['primName', 'variantSetName', 'variantSelected']
+
 ATTR_CHECK_OP = consts(
     EXACT='exact',
     START='start',
@@ -59,11 +62,14 @@ class UsdNode(Node):
         self._primSpec = primSpec
         self._name = name
         self._metadata = {}
+        self._metadataTypes = {}
         self._defaultMetadata = {}
 
+        self._executeError = None
+        self._executeLogError = None
         self._primPaths = []
         if primPath is not None:
-            self._primPaths.append(primPath)
+            self._primPaths.append(Sdf.Path(primPath))
 
         super(UsdNode, self).__init__(*args, **kwargs)
 
@@ -73,16 +79,26 @@ class UsdNode(Node):
     def hasMetadata(self, key):
         return key in self._metadata
 
-    def setMetadata(self, key, value):
-        self._metadata[key] = str(value)
+    def setMetadata(self, key, value, valueType=None):
+        """
+        :param valueType: type value is encoded with if it is a string already, like the type saved in the .ung
+        """
+        if valueType is None:
+            value, valueType = encodeValue(value)
+        self._metadata[key] = value
+        if valueType is None:
+            self._metadataTypes.pop(key, None)
+        else:
+            self._metadataTypes[key] = valueType
+        self.setDirty()
 
     def getMetadataValue(self, key, default=None):
-        strValue = self._metadata.get(key, default)
-        try:
-            value = eval(strValue)
-        except:
-            value = strValue
-        return value
+        if key not in self._metadata:
+            return default
+        return decodeValue(self._metadata[key], self._metadataTypes.get(key))
+
+    def getMetadataType(self, key):
+        return self._metadataTypes.get(key)
 
     def getMetadataKeys(self):
         return list(self._metadata.keys())
@@ -103,24 +119,45 @@ class UsdNode(Node):
     def getStage(self):
         return self._stage
 
-    def execute(self, stage, prim):
+    def execute(self, stage, prim, logError=None):
+        """
+        :param logError: called with the message of an execute error, the logError function of GraphState if None
+        """
+        self._executeError = None
         if not self.parameter('disable').getValue():
+            self._executeLogError = logError
             self._beforeExecute(stage, prim)
             try:
                 stage, prim = self._execute(stage, prim)
             except(Exception) as e:
+                self._executeError = e
                 traceback.print_exc()
-                LogWindow.error('Node Execute Error: {}\n{}'.format(self.name(), e))
+                self._logError('Node Execute Error: {}\n{}'.format(self.name(), e))
+            finally:
+                self._executeLogError = None
             self._afterExecute(stage, prim)
             return stage, prim
         else:
             return stage, prim
 
+    def getExecuteError(self):
+        return self._executeError
+
+    def _logError(self, message):
+        # to the logError of the running execute
+        if self._executeLogError is None:
+            GraphState.executeFunction('logError', message)
+        else:
+            self._executeLogError(message)
+
     def _beforeExecute(self, stage, prim):
+        if self.graph is not None:
+            # kept up to date by the graph
+            return
         parentPaths = []
-        parentNodes = self.item.getSources()
+        parentNodes = self.getSources()
         for n in parentNodes:
-            parentPaths.extend(n.nodeObject.getPrimPath())
+            parentPaths.extend(n.getPrimPath())
         self.reSyncPath(parentPaths)
 
     def _afterExecute(self, stage, prim):
@@ -139,9 +176,10 @@ class UsdNode(Node):
 
     def addPrimPath(self, primPath):
         if primPath is not None:
-            self._primPaths.append(primPath)
+            self._primPaths.append(Sdf.Path(primPath))
 
     def removePrimPath(self, primPath):
+        primPath = Sdf.Path(primPath)
         if primPath in self._primPaths:
             self._primPaths.remove(primPath)
 
@@ -161,40 +199,52 @@ class UsdNode(Node):
         ]
         return params
 
-    def _combinePaths(self, parentPath, path):
-        if parentPath[-1] == '}' and path[0] == '{':
-            last_variant_set_name = parentPath.split('{')[-1].split('=')[0]
-            current_variant_set_name = path.split('{')[-1].split('=')[0]
-            if last_variant_set_name == current_variant_set_name:
-                return '{'.join(parentPath.split('{')[:-1]) + '{' + path[1:]
-            else:
-                return parentPath + path
-        elif parentPath[-1] in ['/', '}'] or path[0] == '{':
-            return parentPath + path
-        else:
-            return parentPath + '/' + path
+    def _whenParamterValueChanged(self, parameter):
+        super(UsdNode, self)._whenParamterValueChanged(parameter)
+        if parameter.name() in PRIM_PATH_PARAMETER_NAMES and self.graph is not None:
+            self.graph.updatePrimPaths([self])
+
+    def _appendPrimName(self, parentPath, primName):
+        if not primName:
+            return None
+        relativePath = Sdf.Path(primName)
+        if relativePath.isEmpty or relativePath.IsAbsolutePath():
+            return None
+        return parentPath.AppendPath(relativePath)
+
+    def _appendVariantSelection(self, parentPath, variantSetName, variantSelected):
+        if parentPath.IsPrimVariantSelectionPath():
+            lastVariantSetName, lastVariantSelected = parentPath.GetVariantSelection()
+            if lastVariantSetName == variantSetName:
+                if lastVariantSelected == variantSelected:
+                    return parentPath
+                # switch the last selection of the same variant set
+                parentPath = parentPath.GetParentPath()
+        if parentPath == Sdf.Path.absoluteRootPath or not variantSetName:
+            return None
+        return parentPath.AppendVariantSelection(variantSetName, variantSelected or '')
 
     def reSyncPath(self, parentPaths=None):
+        """
+        set the prim paths from the paths of the source nodes
+        :param parentPaths: list of Sdf.Path
+        """
         self.clearPrimPath()
+        parentPaths = [Sdf.Path(parentPath) for parentPath in parentPaths or []]
 
         if self.Class() == 'Root':
-            self.addPrimPath('/')
+            self._primPaths.append(Sdf.Path.absoluteRootPath)
+        elif self.NodeTypes().isSubType('Prim'):
+            primName = self.parameter('primName').getValue()
+            for parentPath in parentPaths:
+                self.addPrimPath(self._appendPrimName(parentPath, primName))
+        elif self.Class() in ['VariantSelect', 'VariantSwitch']:
+            variantSetName = self.parameter('variantSetName').getValue()
+            variantSelected = self.parameter('variantSelected').getValue()
+            for parentPath in parentPaths:
+                self.addPrimPath(self._appendVariantSelection(parentPath, variantSetName, variantSelected))
         else:
-            if self.NodeTypes().isSubType('Prim'):
-                for parentPath in parentPaths:
-                    self.addPrimPath(self._combinePaths(parentPath, self.parameter('primName').getValue()))
-            elif self.Class() in ['VariantSelect', 'VariantSwitch']:
-                for parentPath in parentPaths:
-                    variantSetName = self.parameter('variantSetName').getValue()
-                    variantSelected = self.parameter('variantSelected').getValue()
-                    current = '{%s=%s}' % (variantSetName, variantSelected)
-                    if parentPath.endswith(current):
-                        self.addPrimPath(parentPath)
-                    else:
-                        self.addPrimPath(self._combinePaths(parentPath, current))
-            else:
-                for parentPath in parentPaths:
-                    self.addPrimPath(parentPath)
+            self._primPaths.extend(parentPaths)
 
 
 class MetadataNode(UsdNode):
@@ -358,6 +408,7 @@ class LayerNode(UsdNode):
 class RootNode(UsdNode):
     nodeType = 'Root'
     fillNormalColor = (50, 60, 70)
+    fragmentCache = False
     borderNormalColor = (250, 250, 250, 200)
     liveUpdateParameterNames = [
         'defaultPrim', 'upAxis',
@@ -428,6 +479,119 @@ class PrimOverrideNode(_PrimOnlyNode):
     borderNormalColor = (200, 200, 250, 200)
 
 
+class PrimCollapsedNode(_PrimNode):
+    """
+    placeholder of a prim subtree which is not expanded into nodes,
+    cooks by copying the subtree from the layer the graph is opened from
+    """
+    nodeType = 'PrimCollapsed'
+    nodeGroup = 'Prim'
+    nodeItemType = 'PrimCollapsedNodeItem'
+    fragmentCache = False
+    fillNormalColor = (50, 60, 70)
+    borderNormalColor = (150, 150, 150, 200)
+    _ignoreExecuteParamNames = ['primName', 'sourcePath']
+    liveUpdateParameterNames = ['primName', 'sourcePath']
+
+    def __init__(self, sourcePath=None, *args, **kwargs):
+        super(PrimCollapsedNode, self).__init__(*args, **kwargs)
+
+        if sourcePath is not None:
+            sourcePath = Sdf.Path(sourcePath)
+            self.parameter('sourcePath').setValueQuietly(sourcePath.pathString)
+            self.parameter('primName').setValueQuietly(sourcePath.name)
+
+    def _initParameters(self):
+        super(PrimCollapsedNode, self)._initParameters()
+        self.addParameter('sourcePath', 'string', builtIn=True)
+
+    def getSourcePrimSpec(self):
+        sourcePath = self.parameter('sourcePath').getValue()
+        if self._layer is None or not sourcePath:
+            return None
+        return self._layer.GetPrimAtPath(sourcePath)
+
+    def _execute(self, stage, prim):
+        primSpec = self.getSourcePrimSpec()
+        if primSpec is None:
+            raise Exception('collapsed prim not found in layer: {}'.format(self.parameter('sourcePath').getValue()))
+
+        newPrim = stage.OverridePrim(self._getCurrentExecutePrimPath(prim))
+        editTarget = stage.GetEditTarget()
+        Sdf.CopySpec(
+            self._layer, primSpec.path,
+            editTarget.GetLayer(), editTarget.MapToSpecPath(newPrim.GetPath())
+        )
+        for key in self.getMetadataKeys():
+            newPrim.SetMetadata(key, self.getMetadataValue(key))
+
+        return stage, newPrim
+
+
+class PrimPassThroughNode(PrimCollapsedNode):
+    """
+    placeholder of a prim above the prims a layer is partially opened with,
+    cooks by copying the subtree like PrimCollapsed, the opened children are emptied in place
+    for the destination nodes to author them
+    """
+    nodeType = 'PrimPassThrough'
+    _ignoreExecuteParamNames = ['primName', 'sourcePath', 'openedChildren']
+
+    def __init__(self, sourcePath=None, openedChildren=None, *args, **kwargs):
+        super(PrimPassThroughNode, self).__init__(sourcePath, *args, **kwargs)
+
+        if openedChildren is not None:
+            self.parameter('openedChildren').setValueQuietly(list(openedChildren))
+
+    def _initParameters(self):
+        super(PrimPassThroughNode, self)._initParameters()
+        self.addParameter('openedChildren', 'token[]', builtIn=True)
+
+    def getOpenedChildren(self):
+        """
+        :return: names of the source children which are made by the destination nodes
+        """
+        return list(self.parameter('openedChildren').getValue() or [])
+
+    def getChildNames(self):
+        return [
+            node.parameter('primName').getValue() for node in self.getDestinations()
+            if node.NodeTypes().isSubType('Prim') and not node.parameter('disable').getValue()
+        ]
+
+    def _execute(self, stage, prim):
+        stage, newPrim = super(PrimPassThroughNode, self)._execute(stage, prim)
+
+        editTarget = stage.GetEditTarget()
+        layer = editTarget.GetLayer()
+        primSpec = layer.GetPrimAtPath(editTarget.MapToSpecPath(newPrim.GetPath()))
+        childNames = self.getChildNames()
+        openedChildren = self.getOpenedChildren()
+        # children renamed from an opened child take its place, in order
+        newNames = [
+            name for name in childNames
+            if name not in openedChildren and primSpec.nameChildren.get(name) is None
+        ]
+        emptyLayer = None
+        for childName in openedChildren:
+            childSpec = primSpec.nameChildren.get(childName)
+            if childSpec is None:
+                continue
+            if childName not in childNames:
+                if len(newNames) == 0:
+                    # deleted or disabled
+                    del primSpec.nameChildren[childName]
+                    continue
+                childSpec.name = newNames.pop(0)
+            # an empty spec keeps the position of the prim among its siblings
+            if emptyLayer is None:
+                emptyLayer = Sdf.Layer.CreateAnonymous()
+            Sdf.CreatePrimInLayer(emptyLayer, childSpec.path)
+            Sdf.CopySpec(emptyLayer, childSpec.path, layer, childSpec.path)
+
+        return stage, newPrim
+
+
 class _RefNode(UsdNode):
     nodeType = '_Ref'
     nodeGroup = 'Meta'
@@ -437,6 +601,7 @@ class _RefNode(UsdNode):
         'assetPath', 'primPath'
         'layerOffset', 'layerScale'
     ]
+    typeTagVisible = True
 
     def _initParameters(self):
         super(_RefNode, self)._initParameters()
@@ -459,10 +624,6 @@ class _RefNode(UsdNode):
         if self._op is not None:
             self.parameter('op').setValueQuietly(self._op)
 
-    def _setTags(self):
-        super(_RefNode, self)._setTags()
-        self.item.addTag(self.nodeType, PixmapTag('{}.png'.format(self.nodeType)), position=0.25)
-
     def _setParametersFromRef(self, reference):
         if reference.assetPath != '':
             self.parameter('assetPath').setValueQuietly(reference.assetPath)
@@ -589,6 +750,10 @@ class _AttributeNode(UsdNode):
                 param.setConnectQuietly(connect.pathString)
             elif attribute.HasInfo('timeSamples'):
                 param.setTimeSamplesQuietly(attribute.GetInfo('timeSamples'))
+            elif param.lazyValue and attribute.HasInfo('default'):
+                # points, normals and primvars are not read to open the layer,
+                # they are copied off it as the layer is edited by the live update
+                param.setSpecValueQuietly(SpecValue.copyFrom(attribute))
             else:
                 value = attribute.default
                 param.setValueQuietly(value)
@@ -608,14 +773,57 @@ class _AttributeNode(UsdNode):
         if parameter.hasConnect():
             attribute.SetConnections([parameter.getConnect()])
         elif parameter.hasKey():
-            for time, value in parameter.getTimeSamples().items():
-                attribute.Set(value, time)
+            self._setAttributeTimeSamples(attribute, parameter.getTimeSamples())
+        elif parameter.hasSpecValue():
+            self._copyAttributeDefault(attribute, parameter.getSpecValue())
         else:
             value = parameter.getValue()
             if value is not None:
                 attribute.Set(value)
 
+    def _copyAttributeDefault(self, attribute, specValue):
+        # spec to spec, the array is shared and never converted on the way
+        editTarget = attribute.GetStage().GetEditTarget()
+        layer = editTarget.GetLayer()
+        attributeSpec = layer.GetAttributeAtPath(editTarget.MapToSpecPath(attribute.GetPath()))
+        sourceSpec = specValue.getSpec()
+        if specValue.isLoaded() or attributeSpec is None or sourceSpec is None:
+            value = specValue.getValue()
+            if value is not None:
+                attribute.Set(value)
+            return
+        value = sourceSpec.default
+        if value is not None:
+            attributeSpec.default = value
+
+    def _setAttributeTimeSamples(self, attribute, timeSamples):
+        # write the keys to the attribute spec in one change block, a Usd Set per key is much slower
+        editTarget = attribute.GetStage().GetEditTarget()
+        layer = editTarget.GetLayer()
+        specPath = editTarget.MapToSpecPath(attribute.GetPath())
+        if layer.GetAttributeAtPath(specPath) is None:
+            for time, value in timeSamples.items():
+                attribute.Set(value, time)
+            return
+
+        # Sdf casts to the attribute type too, building the Gf/Vt value first is faster
+        valueClass = attribute.GetTypeName().type.pythonClass
+        with Sdf.ChangeBlock():
+            for time, value in timeSamples.items():
+                if valueClass is not None and not isinstance(value, valueClass):
+                    try:
+                        value = valueClass(value)
+                    except(TypeError, ValueError) as e:
+                        self._logError('Time Sample Error: {}.{} at {}\n{}'.format(
+                            self.name(), attribute.GetName(), time, e
+                        ))
+                        continue
+                layer.SetTimeSample(specPath, time, value)
+
     def _attrParamChanged(self, parameter):
+        if self._stage is None:
+            # a graph without a stage cooks the dirty nodes instead
+            return
         if parameter.name() not in self.getIgnoreExecuteParamNames():
             attrName = parameter.name()
             for primPath in self._primPaths:
@@ -811,6 +1019,7 @@ class _VariantNode(UsdNode):
     nodeGroup = 'Variant'
     fillNormalColor = (50, 60, 70)
     borderNormalColor = (200, 200, 150)
+    typeTagVisible = True
 
 
 class VariantSetNode(_VariantNode):
@@ -822,8 +1031,6 @@ class VariantSetNode(_VariantNode):
     def __init__(self, variantSetName=None, options=None, *args, **kwargs):
         super(VariantSetNode, self).__init__(*args, **kwargs)
 
-        self.item.addTag('VariantSet', PixmapTag('VariantSet.png'), position=0.25)
-
         if variantSetName is not None:
             self.parameter('variantSetName').setValueQuietly(variantSetName)
         if options is not None:
@@ -854,8 +1061,6 @@ class VariantSelectNode(_VariantNode):
     def __init__(self, variantSetName='', variantSelected='', options=None, *args, **kwargs):
         super(VariantSelectNode, self).__init__(*args, **kwargs)
 
-        self.item.addTag('VariantSelect', PixmapTag('VariantSelect.png'), position=0.25)
-
         self.parameter('variantSetName').setValueQuietly(variantSetName)
         self.parameter('variantSelected').setValueQuietly(variantSelected)
         if options is not None:
@@ -868,7 +1073,7 @@ class VariantSelectNode(_VariantNode):
 
     def _whenParamterValueChanged(self, parameter):
         super(VariantSelectNode, self)._whenParamterValueChanged(parameter)
-        if parameter.name() == 'variantSelected':
+        if parameter.name() == 'variantSelected' and self._stage is not None:
             variantSetName = self.parameter('variantSetName').getValue()
             for primPath in self._primPaths:
                 prim = self._stage.GetPrimAtPath(primPath)
@@ -890,6 +1095,7 @@ class VariantSelectNode(_VariantNode):
 
 class VariantSwitchNode(_VariantNode):
     nodeType = 'VariantSwitch'
+    fragmentCache = False
     liveUpdateParameterNames = [
         'variantSetName', 'variantSelected',
     ]
@@ -897,8 +1103,6 @@ class VariantSwitchNode(_VariantNode):
     def __init__(self, variantSetName='', variantSelected='', *args, **kwargs):
         super(VariantSwitchNode, self).__init__(*args, **kwargs)
 
-        self.item.addTag('VariantSwitch', PixmapTag('VariantSwitch.png'), position=0.25)
-
         self.parameter('variantSetName').setValueQuietly(variantSetName)
         self.parameter('variantSelected').setValueQuietly(variantSelected)
 
@@ -929,6 +1133,8 @@ Node.registerNode(LayerNode)
 Node.registerNode(RootNode)
 Node.registerNode(PrimDefineNode)
 Node.registerNode(PrimOverrideNode)
+Node.registerNode(PrimCollapsedNode)
+Node.registerNode(PrimPassThroughNode)
 Node.registerNode(ReferenceNode)
 Node.registerNode(PayloadNode)
 
@@ -945,6 +1151,8 @@ Node.setParamDefault(LayerNode.nodeType, 'label', '[python os.path.basename("[va
 Node.setParamDefault(RootNode.nodeType, 'label', '/')
 Node.setParamDefault(PrimDefineNode.nodeType, 'label', '/[value primName]')
 Node.setParamDefault(PrimOverrideNode.nodeType, 'label', '/[value primName]')
+Node.setParamDefault(PrimCollapsedNode.nodeType, 'label', '/[value primName]/...')
+Node.setParamDefault(PrimPassThroughNode.nodeType, 'label', '/[value primName]/..')
 Node.setParamDefault(ReferenceNode.nodeType, 'label', '[python os.path.basename("[value assetPath]")]')
 Node.setParamDefault(PayloadNode.nodeType, 'label', '[python os.path.basename("[value assetPath]")]')
 
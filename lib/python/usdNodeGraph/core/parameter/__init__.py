@@ -1,4 +1,4 @@
 
-from .basic import Parameter
+from .basic import Parameter, SpecValue
 from .params import *
 
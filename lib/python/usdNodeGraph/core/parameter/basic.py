@@ -3,15 +3,71 @@
 import copy
 import json
 from pxr import Gf, Sdf
-from usdNodeGraph.module.sqt import QtCore
+from usdNodeGraph.utils.signal import Signal
+from .codec import encodeValue, decodeValue
 
 
-class Parameter(QtCore.QObject):
+# imported specs are copied to a private layer, a new one is started after this many
+SPEC_LAYER_MAX_COUNT = 10000
+SPEC_ATTRIBUTE_NAME = 'value'
+
+
+class SpecValue(object):
+    """
+    the default value of an attribute spec, read from the layer only when it is asked for
+    """
+    _specLayer = None
+    _specCount = 0
+
+    def __init__(self, attributeSpec):
+        self.layer = attributeSpec.layer
+        self.path = attributeSpec.path
+        self._value = None
+        self._loaded = False
+
+    @classmethod
+    def copyFrom(cls, attributeSpec):
+        """
+        copy attributeSpec to a private anonymous layer, the copy doesn't change when its layer is edited.
+        the array is shared with the source spec, it is not read to python.
+        :return: SpecValue of the copy
+        """
+        if cls._specLayer is None or cls._specCount >= SPEC_LAYER_MAX_COUNT:
+            # the layer lives as long as a SpecValue of it does
+            cls._specLayer = Sdf.Layer.CreateAnonymous('specValues')
+            cls._specCount = 0
+        layer = cls._specLayer
+        primSpec = Sdf.PrimSpec(layer, 's{}'.format(cls._specCount), Sdf.SpecifierDef)
+        cls._specCount += 1
+        path = primSpec.path.AppendProperty(SPEC_ATTRIBUTE_NAME)
+        Sdf.CopySpec(attributeSpec.layer, attributeSpec.path, layer, path)
+        return cls(layer.GetAttributeAtPath(path))
+
+    def getSpec(self):
+        return self.layer.GetAttributeAtPath(self.path)
+
+    def isLoaded(self):
+        return self._loaded
+
+    def getValue(self):
+        if not self._loaded:
+            spec = self.getSpec()
+            self._value = spec.default if spec is not None else None
+            self._loaded = True
+        return self._value
+
+    def __repr__(self):
+        return 'SpecValue({}, {})'.format(self.layer.identifier, self.path)
+
+
+class Parameter(object):
     parameterTypeString = None
     parameterWidgetString = None
     valueTypeName = None
     valueDefault = None
-    valueChanged = QtCore.Signal(object)
+    # the value from a layer is kept as a SpecValue until it is edited
+    lazyValue = False
+    valueChanged = Signal(object)
 
     _parametersMap = {}
     _parameterWidgetsMap = {}
@@ -130,6 +186,7 @@ class Parameter(QtCore.QObject):
         self._overrideValue = defaultValue
         self._overrideTimeSamples = None
         self._overrideConnect = None
+        self._specValue = None
 
         self._valueOverride = False
         self._inheritValue = defaultValue
@@ -137,6 +194,7 @@ class Parameter(QtCore.QObject):
         self._inheritConnect = None
 
         self._metadata = {}
+        self._metadataTypes = {}
         self._defaultMetadata = {}
 
         self._hints = {} if hints is None else hints
@@ -162,7 +220,8 @@ class Parameter(QtCore.QObject):
             self._paramWidgets.append(w)
 
     def removeParamWidget(self, w):
-        self._paramWidgets.remove(w)
+        if w in self._paramWidgets:
+            self._paramWidgets.remove(w)
 
     def _breakSignal(self):
         if self._signalConnected:
@@ -221,8 +280,16 @@ class Parameter(QtCore.QObject):
         return self._getValue(self._inheritValue, self._inheritTimeSamples, time)
 
     def getOverrideValue(self, time=None):
+        if self._specValue is not None and self._overrideTimeSamples is None:
+            return self._specValue.getValue()
         return self._getValue(self._overrideValue, self._overrideTimeSamples, time)
 
+    def hasSpecValue(self):
+        return self._specValue is not None
+
+    def getSpecValue(self):
+        return self._specValue
+
     def getValue(self, time=None):
         if self._node.hasProperty(self._name):
             return self._node.getProperty(self._name)
@@ -263,12 +330,12 @@ class Parameter(QtCore.QObject):
         return list(self._metadata.keys())
 
     def getMetadataValue(self, key, default=None):
-        strValue = self._metadata.get(key, default)
-        try:
-            value = eval(strValue)
-        except:
-            value = strValue
-        return value
+        if key not in self._metadata:
+            return default
+        return decodeValue(self._metadata[key], self._metadataTypes.get(key))
+
+    def getMetadataType(self, key):
+        return self._metadataTypes.get(key)
 
     def getMetadatas(self):
         return self._metadata
@@ -289,12 +356,9 @@ class Parameter(QtCore.QObject):
         return self._defaultHints
 
     def getHintValue(self, key, defaultValue=None):
-        strValue = self._hints.get(key, defaultValue)
-        try:
-            value = eval(strValue)
-        except:
-            value = strValue
-        return value
+        if key not in self._hints:
+            return defaultValue
+        return decodeValue(self._hints[key])
 
     def getParameterWidgetClass(self):
         typeName = self.getHintValue('widget')
@@ -302,12 +366,23 @@ class Parameter(QtCore.QObject):
         return widgetClass
 
     # --------------------set value--------------------
-    def setMetadata(self, key, value):
+    def setMetadata(self, key, value, valueType=None):
+        """
+        :param valueType: type value is encoded with if it is a string already, like the type saved in the .ung
+        """
         if key == 'custom' and value in [False, 'False']:
             return
         if key == 'variability' and value in [Sdf.VariabilityVarying, 'Sdf.VariabilityVarying']:
             return
-        self._metadata[key] = str(value)
+        if valueType is None:
+            value, valueType = encodeValue(value)
+        self._metadata[key] = value
+        if valueType is None:
+            self._metadataTypes.pop(key, None)
+        else:
+            self._metadataTypes[key] = valueType
+        if self._node is not None:
+            self._node.setDirty()
 
     def setHint(self, key, value):
         self._hints[key] = str(value)
@@ -345,6 +420,7 @@ class Parameter(QtCore.QObject):
         self._beforeSetValue()
         self._valueOverride = override
         self._overrideValue = value
+        self._specValue = None
         if emitSignal:
             self.valueChanged.emit(self)
         self._afterSetValue()
@@ -365,6 +441,7 @@ class Parameter(QtCore.QObject):
         self._beforeSetValue()
         self._valueOverride = override
         self._overrideTimeSamples = timeSamples
+        self._specValue = None
         if emitSignal:
             self.valueChanged.emit(self)
         self._afterSetValue()
@@ -373,6 +450,7 @@ class Parameter(QtCore.QObject):
         self._beforeSetValue()
         self._valueOverride = override
         self._overrideConnect = connect
+        self._specValue = None
         if emitSignal:
             self.valueChanged.emit(self)
         self._afterSetValue()
@@ -395,6 +473,16 @@ class Parameter(QtCore.QObject):
     def setConnectQuietly(self, connect, **kwargs):
         self.setConnect(connect, emitSignal=False, **kwargs)
 
+    def setSpecValueQuietly(self, specValue):
+        """
+        take the value of an attribute spec without reading it, it is read when the value is asked for.
+        the layer is expected not to change under it, see SpecValue.copyFrom.
+        :param specValue: SpecValue
+        """
+        self._valueOverride = True
+        self._overrideValue = None
+        self._specValue = specValue
+
     def breakConnect(self):
         self._overrideConnect = None
         self.valueChanged.emit(self)
@@ -423,7 +511,14 @@ class Parameter(QtCore.QObject):
     def isOverride(self):
         return self._valueOverride
 
-    def toXmlElement(self):
+    def toXmlElement(self, specValues=None, sidecar=None, typed=False):
+        """
+        :param specValues: dict to keep the SpecValues in, the element refers to them by key instead of the value,
+        for an element read back in the same session
+        :param sidecar: ValueSidecar to save a big value to instead of the element
+        :param typed: keep the python values in the element instead of their strings,
+        they are formatted when the element is written or read back as they are
+        """
         from usdNodeGraph.core.parse._xml import ET
 
         custom = self.isCustom()
@@ -433,14 +528,21 @@ class Parameter(QtCore.QObject):
         timeSamplesDict = None
         value = None
         connect = None
+        specKey = None
+        dataKey = None
 
         if self.hasConnect():
             connect = self.getConnect()
-        if self.hasKey():
+        if sidecar is not None and sidecar.isLargeParameter(self):
+            dataKey = sidecar.writeParameter(self)
+        elif self.hasKey():
             timeSamples = self.getTimeSamples()
             timeSamplesDict = {}
             for t, v in timeSamples.items():
                 timeSamplesDict.update({t: self.convertValueToPy(v)})
+        elif specValues is not None and self.hasSpecValue():
+            specKey = str(len(specValues))
+            specValues[specKey] = self.getSpecValue()
         else:
             value = self.convertValueToPy(self.getValue())
 
@@ -453,14 +555,19 @@ class Parameter(QtCore.QObject):
                 paramElement.set('vis', '0')
         if custom:
             paramElement.set('cus', str(custom))
-        paramElement.set('val', str(value))
+        if specKey is not None:
+            paramElement.set('spec', specKey)
+        elif dataKey is not None:
+            paramElement.set('data', dataKey)
+        else:
+            paramElement.set('val', value if typed else str(value))
         if connect is not None:
             paramElement.set('con', connect)
         if timeSamplesDict is not None:
             for t, v in timeSamplesDict.items():
                 sample = ET.Element('s')
                 sample.set('t', str(t))
-                sample.set('v', str(v))
+                sample.set('v', v if typed else str(v))
                 paramElement.append(sample)
 
         for key, value in self.getMetadatas().items():
@@ -469,6 +576,8 @@ class Parameter(QtCore.QObject):
             metadataElement = ET.Element('m')
             metadataElement.set('k', key)
             metadataElement.set('v', value)
+            if self.getMetadataType(key) is not None:
+                metadataElement.set('t', self.getMetadataType(key))
             paramElement.append(metadataElement)
 
         for key, value in self.getHints().items():
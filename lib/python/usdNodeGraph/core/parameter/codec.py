@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+"""
+metadata, hints and the values of the .ung are kept as strings, they are read back here instead of with eval.
+a typed string is decoded by the codec of its type, an untyped one as a python literal,
+where the pxr values their repr prints are allowed too.
+"""
+
+import ast
+from pxr import Gf, Sdf, Vt
+from usdNodeGraph.utils.pyversion import *
+
+
+# decoded values kept for the strings read again, the cache starts over when it is full
+DECODE_CACHE_MAX_SIZE = 100000
+
+_PXR_MODULES = {
+    'Gf': Gf,
+    'Sdf': Sdf,
+    'Vt': Vt,
+}
+_LITERAL_NAMES = {
+    'True': True,
+    'False': False,
+    'None': None,
+}
+if hasattr(ast, 'Constant'):
+    _CONSTANT_NODES = (ast.Constant, )
+else:
+    _CONSTANT_NODES = (ast.Num, ast.Str, getattr(ast, 'NameConstant', ast.Num))
+
+_NUMBER_STARTS = frozenset('0123456789+-.')
+
+_decodeCache = {}
+
+
+def _isPxrClass(name):
+    module, _, className = name.partition('.')
+    if module == 'Gf':
+        return className.startswith(('Vec', 'Matrix', 'Quat', 'Range', 'Rect'))
+    if module == 'Vt':
+        return className.endswith('Array')
+    if module == 'Sdf':
+        return className in ('AssetPath', 'Path', 'ValueBlock')
+    return False
+
+
+def _decodeNode(node):
+    if isinstance(node, _CONSTANT_NODES):
+        for attr in ('value', 'n', 's'):
+            if hasattr(node, attr):
+                return getattr(node, attr)
+    elif isinstance(node, ast.Name):
+        if node.id in _LITERAL_NAMES:
+            return _LITERAL_NAMES[node.id]
+    elif isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        value = _decodeNode(node.operand)
+        if isinstance(value, (int, long, float)) and not isinstance(value, bool):
+            return -value if isinstance(node.op, ast.USub) else value
+    elif isinstance(node, ast.List):
+        return [_decodeNode(item) for item in node.elts]
+    elif isinstance(node, ast.Tuple):
+        return tuple(_decodeNode(item) for item in node.elts)
+    elif isinstance(node, ast.Set):
+        return set(_decodeNode(item) for item in node.elts)
+    elif isinstance(node, ast.Dict):
+        return dict((_decodeNode(key), _decodeNode(value)) for key, value in zip(node.keys, node.values))
+    elif isinstance(node, ast.Attribute):
+        # Sdf.VariabilityUniform and the like, not the classes
+        name = _getPxrName(node)
+        if name is not None and not _isPxrClass(name):
+            value = getattr(_PXR_MODULES[node.value.id], node.attr, None)
+            if value is not None and not callable(value):
+                return value
+    elif isinstance(node, ast.Call) and not node.keywords:
+        name = _getPxrName(node.func)
+        if name is not None and _isPxrClass(name):
+            cls = getattr(_PXR_MODULES[node.func.value.id], node.func.attr)
+            return cls(*[_decodeNode(arg) for arg in node.args])
+    raise ValueError('Not a literal: {}'.format(ast.dump(node)))
+
+
+def _getPxrName(node):
+    if (
+        isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name)
+        and node.value.id in _PXR_MODULES and not node.attr.startswith('_')
+    ):
+        return '{}.{}'.format(node.value.id, node.attr)
+
+
+def decodeLiteral(string):
+    """
+    :return: the value string is the python literal of, string itself if it is none
+    """
+    try:
+        return _decodeNode(ast.parse(string.strip(), mode='eval').body)
+    except Exception:
+        return string
+
+
+def _decodeNumber(string):
+    try:
+        return int(string)
+    except ValueError:
+        return float(string)
+
+
+def decodeNumbers(string, numberType=float):
+    """
+    fast path of a list, tuple or vector of numbers, nested or not, they are returned flat
+    """
+    for bracket in '()[]':
+        string = string.replace(bracket, ' ')
+    if string.strip() == '':
+        return []
+    return [numberType(item) for item in string.split(',')]
+
+
+class ValueCodec(object):
+    """
+    encodes the values of some python types to strings and decodes them back
+    """
+    valueType = None
+    pyTypes = ()
+    # values of the cache are handed out as copies
+    mutable = False
+
+    def encode(self, value):
+        return str(value)
+
+    def decode(self, string):
+        return decodeLiteral(string)
+
+
+class _BoolCodec(ValueCodec):
+    valueType = 'bool'
+    pyTypes = (bool, )
+
+    def decode(self, string):
+        return string == 'True'
+
+
+class _IntCodec(ValueCodec):
+    valueType = 'int'
+    pyTypes = (int, long)
+
+    def decode(self, string):
+        return int(string)
+
+
+class _FloatCodec(ValueCodec):
+    valueType = 'float'
+    pyTypes = (float, )
+
+    def decode(self, string):
+        return float(string)
+
+
+class _VecCodec(ValueCodec):
+    """
+    Gf vectors, quaternions and matrices, their strings are only numbers
+    """
+    mutable = True
+
+    def __init__(self, pyType):
+        self.pyTypes = (pyType, )
+        self.valueType = 'Gf.{}'.format(pyType.__name__)
+
+    def decode(self, string):
+        return self.pyTypes[0](*decodeNumbers(string))
+
+
+class _NumberArrayCodec(ValueCodec):
+    mutable = True
+
+    def __init__(self, pyType, itemSize=1, numberType=float):
+        self.pyTypes = (pyType, )
+        self.valueType = 'Vt.{}'.format(pyType.__name__)
+        self.itemSize = itemSize
+        self.numberType = numberType
+
+    def decode(self, string):
+        numbers = decodeNumbers(string, self.numberType)
+        if self.itemSize > 1:
+            numbers = list(zip(*[iter(numbers)] * self.itemSize))
+        return self.pyTypes[0](numbers)
+
+
+class _StringArrayCodec(ValueCodec):
+    mutable = True
+
+    def __init__(self, pyType):
+        self.pyTypes = (pyType, )
+        self.valueType = 'Vt.{}'.format(pyType.__name__)
+
+    def encode(self, value):
+        # the str of a token array has no quotes
+        return str(list(value))
+
+    def decode(self, string):
+        return self.pyTypes[0](decodeLiteral(string))
+
+
+class _AssetPathCodec(ValueCodec):
+    valueType = 'Sdf.AssetPath'
+    pyTypes = (Sdf.AssetPath, )
+
+    def encode(self, value):
+        return value.path
+
+    def decode(self, string):
+        return Sdf.AssetPath(string)
+
+
+class _PathCodec(ValueCodec):
+    valueType = 'Sdf.Path'
+    pyTypes = (Sdf.Path, )
+
+    def encode(self, value):
+        return value.pathString
+
+    def decode(self, string):
+        return Sdf.Path(string)
+
+
+class _EnumCodec(ValueCodec):
+    """
+    Sdf.Variability, Sdf.Specifier and Sdf.Permission, their strings are their names
+    """
+    def __init__(self, pyType):
+        self.pyTypes = (pyType, )
+        self.valueType = 'Sdf.{}'.format(pyType.__name__)
+
+    def decode(self, string):
+        value = getattr(Sdf, string.replace('Sdf.', '', 1), None)
+        if not isinstance(value, self.pyTypes[0]):
+            raise ValueError('Not a {}: {}'.format(self.valueType, string))
+        return value
+
+
+_codecs = {}
+_pyTypeCodecs = {}
+_mutablePyTypes = set()
+
+
+def registerCodec(codec):
+    _codecs[codec.valueType] = codec
+    for pyType in codec.pyTypes:
+        _pyTypeCodecs[pyType] = codec
+        if codec.mutable:
+            _mutablePyTypes.add(pyType)
+
+
+for _codec in [_BoolCodec(), _IntCodec(), _FloatCodec(), _AssetPathCodec(), _PathCodec()]:
+    registerCodec(_codec)
+for _name in [
+    'Vec2f', 'Vec3f', 'Vec4f', 'Vec2d', 'Vec3d', 'Vec4d', 'Vec2h', 'Vec3h', 'Vec4h', 'Vec2i', 'Vec3i', 'Vec4i',
+    'Quatf', 'Quatd', 'Quath', 'Matrix2d', 'Matrix3d', 'Matrix4d',
+]:
+    registerCodec(_VecCodec(getattr(Gf, _name)))
+for _name in ['Int', 'UInt', 'Int64', 'UInt64', 'Float', 'Double', 'Half']:
+    registerCodec(_NumberArrayCodec(
+        getattr(Vt, '{}Array'.format(_name)), numberType=int if 'Int' in _name else float
+    ))
+for _name in ['Vec2f', 'Vec3f', 'Vec4f', 'Vec2d', 'Vec3d', 'Vec4d', 'Vec2h', 'Vec3h', 'Vec4h', 'Vec2i', 'Vec3i', 'Vec4i']:
+    registerCodec(_NumberArrayCodec(
+        getattr(Vt, '{}Array'.format(_name)), itemSize=int(_name[3]), numberType=int if _name.endswith('i') else float
+    ))
+for _name in ['Token', 'String']:
+    registerCodec(_StringArrayCodec(getattr(Vt, '{}Array'.format(_name))))
+for _pyType in [Sdf.Variability, Sdf.Specifier, Sdf.Permission]:
+    registerCodec(_EnumCodec(_pyType))
+
+
+def getCodec(valueType):
+    return _codecs.get(valueType)
+
+
+def getPyTypeCodec(pyType):
+    return _pyTypeCodecs.get(pyType)
+
+
+def encodeValue(value):
+    """
+    :return: the string of value and its type, strings and the values without a codec are untyped
+    """
+    if isinstance(value, basestring):
+        return value, None
+    codec = _pyTypeCodecs.get(type(value))
+    if codec is None:
+        return str(value), None
+    return codec.encode(value), codec.valueType
+
+
+def _copyValue(value):
+    # callers may edit the lists and vectors they get
+    if isinstance(value, list):
+        return [_copyValue(item) for item in value]
+    if isinstance(value, dict):
+        return dict((key, _copyValue(item)) for key, item in value.items())
+    if isinstance(value, set):
+        return set(value)
+    if type(value) in _mutablePyTypes:
+        return type(value)(value)
+    return value
+
+
+def decodeValue(string, valueType=None):
+    """
+    :param valueType: type the string was encoded with, None to read it as a python literal
+    :return: the value of string, string itself if it is no value
+    """
+    if not isinstance(string, basestring):
+        return string
+    if valueType is None and string[:1] in _NUMBER_STARTS and string[-1:].isdigit():
+        # plain numbers are most of the values and mostly different, they skip the cache
+        try:
+            return _decodeNumber(string)
+        except ValueError:
+            pass
+    key = (valueType, string)
+    if key in _decodeCache:
+        return _copyValue(_decodeCache[key])
+
+    codec = _codecs.get(valueType)
+    if codec is None:
+        value = decodeLiteral(string)
+    else:
+        try:
+            value = codec.decode(string)
+        except Exception:
+            value = decodeLiteral(string)
+
+    if len(_decodeCache) >= DECODE_CACHE_MAX_SIZE:
+        _decodeCache.clear()
+    _decodeCache[key] = value
+    return _copyValue(value)
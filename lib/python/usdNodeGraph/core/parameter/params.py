@@ -1,5 +1,7 @@
 from .basic import Parameter
+from .codec import decodeValue, getPyTypeCodec
 from pxr import Vt, Gf, Sdf
+from usdNodeGraph.utils.pyversion import *
 
 
 class _StringParameter(Parameter):
@@ -55,10 +57,14 @@ class ChooseParameter(_StringParameter):
 
 
 class _NonStringParameter(Parameter):
+    _usdValueClass = None
+
     @classmethod
     def _convertValueFromPy(cls, pyValue):
-        if isinstance(pyValue, str):
-            pyValue = eval(pyValue)
+        if isinstance(pyValue, basestring):
+            # vectors and arrays of numbers are parsed by the codec of their usd type in one go
+            codec = getPyTypeCodec(cls._usdValueClass)
+            pyValue = decodeValue(pyValue, None if codec is None else codec.valueType)
         return pyValue
 
 
@@ -105,6 +111,8 @@ class _VecParamter(_NonStringParameter):
     @classmethod
     def _convertValueFromPy(cls, pyValue):
         pyValue = super(_VecParamter, cls)._convertValueFromPy(pyValue)
+        if isinstance(pyValue, cls._usdValueClass):
+            return pyValue
         if pyValue is not None:
             return cls._usdValueClass(*pyValue)
 
@@ -297,6 +305,7 @@ class Matrix4dParameter(_MatrixParamter):
 # --------------------------------------- array ----------------------------------
 class _ArrayParameter(_NonStringParameter):
     _usdValueClass = None
+    lazyValue = True
 
     @classmethod
     def getValueDefault(cls):
@@ -319,6 +328,8 @@ class _ArrayParameter(_NonStringParameter):
     @classmethod
     def _convertValueFromPy(cls, pyValue):
         pyValue = super(_ArrayParameter, cls)._convertValueFromPy(pyValue)
+        if isinstance(pyValue, cls._usdValueClass):
+            return pyValue
         childParamClass = cls.getChildParamClass()
         return cls._usdValueClass([childParamClass.convertValueFromPy(i) for i in pyValue])
 
@@ -504,3 +515,63 @@ class TexCoord2hArrayParameter(_ArrayParameter):
     valueTypeName = Sdf.ValueTypeNames.TexCoord2hArray
     _usdValueClass = Vt.Vec2hArray
 
+
+Parameter.registerParameter(StringParameter)
+Parameter.registerParameter(ChooseParameter)
+Parameter.registerParameter(TokenParameter)
+Parameter.registerParameter(FilePathParameter)
+Parameter.registerParameter(AssetParameter)
+Parameter.registerParameter(TextParameter)
+Parameter.registerParameter(BoolParameter)
+Parameter.registerParameter(IntParameter)
+Parameter.registerParameter(FloatParameter)
+Parameter.registerParameter(DoubleParameter)
+Parameter.registerParameter(Vec2fParameter)
+Parameter.registerParameter(Vec3fParameter)
+Parameter.registerParameter(Vec4fParameter)
+Parameter.registerParameter(Vec2dParameter)
+Parameter.registerParameter(Vec3dParameter)
+Parameter.registerParameter(Vec4dParameter)
+Parameter.registerParameter(Vec2hParameter)
+Parameter.registerParameter(Vec3hParameter)
+Parameter.registerParameter(Vec4hParameter)
+Parameter.registerParameter(Color3fParameter)
+Parameter.registerParameter(Color4fParameter)
+Parameter.registerParameter(Point3fParameter)
+Parameter.registerParameter(Normal3fParameter)
+Parameter.registerParameter(Vector3fParameter)
+Parameter.registerParameter(QuatdParameter)
+Parameter.registerParameter(QuatfParameter)
+Parameter.registerParameter(QuathParameter)
+Parameter.registerParameter(Matrix2dParameter)
+Parameter.registerParameter(Matrix3dParameter)
+Parameter.registerParameter(Matrix4dParameter)
+Parameter.registerParameter(TexCoord2fParameter)
+Parameter.registerParameter(TexCoord2dParameter)
+Parameter.registerParameter(TexCoord2hParameter)
+Parameter.registerParameter(StringArrayParameter)
+Parameter.registerParameter(TokenArrayParameter)
+Parameter.registerParameter(IntArrayParameter)
+Parameter.registerParameter(FloatArrayParameter)
+Parameter.registerParameter(DoubleArrayParameter)
+Parameter.registerParameter(Vec2fArrayParameter)
+Parameter.registerParameter(Vec3fArrayParameter)
+Parameter.registerParameter(Vec4fArrayParameter)
+Parameter.registerParameter(Vec2dArrayParameter)
+Parameter.registerParameter(Vec3dArrayParameter)
+Parameter.registerParameter(Vec4dArrayParameter)
+Parameter.registerParameter(Vec2hArrayParameter)
+Parameter.registerParameter(Vec3hArrayParameter)
+Parameter.registerParameter(Vec4hArrayParameter)
+Parameter.registerParameter(Color3fArrayParameter)
+Parameter.registerParameter(Point3fArrayParameter)
+Parameter.registerParameter(Normal3fArrayParameter)
+Parameter.registerParameter(QuatdArrayParameter)
+Parameter.registerParameter(QuatfArrayParameter)
+Parameter.registerParameter(QuathArrayParameter)
+Parameter.registerParameter(Matrix2dArrayParameter)
+Parameter.registerParameter(Matrix3dArrayParameter)
+Parameter.registerParameter(Matrix4dArrayParameter)
+Parameter.registerParameter(TexCoord2fArrayParameter)
+Parameter.registerParameter(TexCoord2dArrayParameter)
+Parameter.registerParameter(TexCoord2hArrayParameter)
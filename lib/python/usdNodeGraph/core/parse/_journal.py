@@ -0,0 +1,414 @@
+# -*- coding: utf-8 -*-
+"""
+append-only change journal saved next to a .ung, so a save writes only the nodes changed since the save before it:
+
+header      magic 'UNGJ', uint16 version, uint16 flags, the 32 character token of the .ung it goes with
+records     uint32 byte length, uint32 crc32 of the bytes, then the xml of a .ung
+
+a record has an 'r' element for each node name which is not saved any more, then the elements of the nodes saved.
+the root of the .ung keeps the token in its 'journal' attribute, a journal with another token is left over from
+an older save and is not read. a record cut by a crash fails its crc, it is dropped with the records after it.
+the big values of the records go to the sidecar of the journal.
+"""
+
+import os
+import uuid
+import zlib
+import struct
+import threading
+from collections import OrderedDict
+from pxr import Sdf
+from ._xml import ET, XmlWriter, iterXmlFile
+from ._sidecar import ValueSidecar, getSidecarFile
+from usdNodeGraph.utils.log import get_logger
+
+logger = get_logger('usdNodeGraph.journal')
+
+
+JOURNAL_EXT = '.journal'
+JOURNAL_MAGIC = b'UNGJ'
+JOURNAL_VERSION = 1
+# the journal is folded into the .ung in the background once it and its sidecar grow past this
+JOURNAL_COMPACT_SIZE = 8 * 1024 * 1024
+JOURNAL_TOKEN_ATTRIBUTE = 'journal'
+JOURNAL_SIDECAR_PREFIX = 'j'
+REMOVE_TAG = 'r'
+
+_HEADER = struct.Struct('<4sHH32s')
+_RECORD = struct.Struct('<II')
+
+
+def getJournalFile(ungFile):
+    return ungFile + JOURNAL_EXT
+
+
+def _newToken():
+    return uuid.uuid4().hex
+
+
+def _getFileSize(fileName):
+    return os.path.getsize(fileName) if os.path.exists(fileName) else 0
+
+
+def _getFileStat(fileName):
+    if not os.path.exists(fileName):
+        return
+    stat = os.stat(fileName)
+    return stat.st_size, stat.st_mtime
+
+
+def _removeFile(fileName):
+    if os.path.exists(fileName):
+        os.remove(fileName)
+
+
+def replaceFile(source, target):
+    if hasattr(os, 'replace'):
+        os.replace(source, target)
+    else:
+        _removeFile(target)
+        os.rename(source, target)
+
+
+def _crc32(data):
+    return zlib.crc32(data) & 0xFFFFFFFF
+
+
+def readJournalRecords(journalFile, token, end=None):
+    """
+    :param token: token of the .ung, the journal of another one has no records
+    :param end: byte offset the records are read to, the end of the file if None
+    :return: the root elements of the records, the byte offset after the last good one
+    """
+    if not os.path.exists(journalFile):
+        return [], 0
+    with open(journalFile, 'rb') as f:
+        data = f.read() if end is None else f.read(end)
+    if len(data) < _HEADER.size:
+        return [], 0
+    magic, version, flags, journalToken = _HEADER.unpack_from(data, 0)
+    if magic != JOURNAL_MAGIC or version > JOURNAL_VERSION or journalToken.decode('ascii') != token:
+        return [], 0
+
+    records = []
+    offset = _HEADER.size
+    while offset + _RECORD.size <= len(data):
+        length, crc = _RECORD.unpack_from(data, offset)
+        recordData = data[offset + _RECORD.size:offset + _RECORD.size + length]
+        if len(recordData) != length or _crc32(recordData) != crc:
+            logger.warning('Journal {} is cut at byte {}, the records after it are dropped'.format(journalFile, offset))
+            break
+        records.append(ET.fromstring(recordData))
+        offset += _RECORD.size + length
+    return records, offset
+
+
+def _getNodePosition(nodeElement, name):
+    for paramElement in nodeElement.findall('p'):
+        if paramElement.get('n') == name:
+            return float(paramElement.get('val'))
+
+
+def iterReplayedElements(nodeElements, records):
+    """
+    :param nodeElements: node elements of the .ung, iterated once
+    :return: iterator of the node elements with the changes of the records on them
+    """
+    # the last element of the names saved by the records, in the order they were first saved after a removal
+    savedElements = OrderedDict()
+    removedNames = set()
+    for record in records:
+        for element in record:
+            name = element.get('n')
+            if element.tag == REMOVE_TAG:
+                savedElements.pop(name, None)
+                removedNames.add(name)
+            else:
+                # a node saved again keeps its place
+                savedElements[name] = element
+
+    for element in nodeElements:
+        name = element.get('n')
+        if name not in removedNames:
+            yield savedElements.pop(name, element)
+    for element in savedElements.values():
+        yield element
+
+
+def replayRecords(rootElement, records):
+    """
+    :return: a root element with the nodes of rootElement and the changes of the records on them
+    """
+    newRootElement = ET.Element(rootElement.tag, dict(rootElement.attrib))
+    newRootElement.extend(iterReplayedElements(list(rootElement), records))
+    # the top left of the nodes, like a full save has it
+    for key in ['x', 'y']:
+        positions = [_getNodePosition(element, key) for element in newRootElement]
+        positions = [position for position in positions if position is not None]
+        if len(positions) > 0:
+            newRootElement.set(key, str(min(positions)))
+    return newRootElement
+
+
+def _getSidecarKeys(rootElement):
+    return [paramElement.get('data') for paramElement in rootElement.iter('p') if paramElement.get('data') is not None]
+
+
+def _copyJournalValues(rootElement, journalLayer, sidecar):
+    """
+    copy the values the elements refer to from journalLayer to sidecar, the elements refer to the copies after it.
+    the keys sidecar has already are kept.
+    """
+    for paramElement in rootElement.iter('p'):
+        key = paramElement.get('data')
+        if key is None or sidecar.layer.GetPrimAtPath(Sdf.Path(key).GetPrimPath()) is not None:
+            continue
+        newKey = sidecar.copyValue(journalLayer, key)
+        if newKey is not None:
+            paramElement.set('data', newKey)
+
+
+class UngJournal(object):
+    """
+    the journal of a .ung for the session which loaded or saved it.
+    saveBase writes the whole .ung and starts an empty journal, append writes the changes after it.
+    """
+    def __init__(self, ungFile):
+        self.ungFile = ungFile
+        self.journalFile = getJournalFile(ungFile)
+        self.token = None
+        self.compactSize = JOURNAL_COMPACT_SIZE
+
+        self._lock = threading.Lock()
+        self._sidecar = None
+        self._ungStat = None
+        self._journalSize = 0
+        self._compactThread = None
+
+    def _openSidecar(self):
+        if self._sidecar is None:
+            sidecar = ValueSidecar.openForXml(self.journalFile, prefix=JOURNAL_SIDECAR_PREFIX)
+            self._sidecar = sidecar if sidecar is not None else ValueSidecar.new(prefix=JOURNAL_SIDECAR_PREFIX)
+        return self._sidecar
+
+    def _open(self, stream):
+        if stream:
+            rootAttrib, nodeElements = iterXmlFile(self.ungFile)
+        else:
+            with open(self.ungFile, 'rb') as f:
+                rootElement = ET.fromstring(f.read())
+            rootAttrib, nodeElements = rootElement.attrib, list(rootElement)
+        self.token = rootAttrib.get(JOURNAL_TOKEN_ATTRIBUTE)
+        self._ungStat = _getFileStat(self.ungFile)
+        self._journalSize = _getFileSize(self.journalFile)
+
+        sidecar = ValueSidecar.openForXml(self.ungFile)
+        if self.token is None:
+            return rootAttrib, nodeElements, sidecar, []
+
+        records, end = readJournalRecords(self.journalFile, self.token)
+        if end != self._journalSize:
+            # a journal of another .ung or cut by a crash, the next save writes all the nodes again
+            self.token = None
+        if len(records) == 0:
+            return rootAttrib, nodeElements, sidecar, records
+
+        journalSidecar = self._openSidecar()
+        if not journalSidecar.isEmpty():
+            if sidecar is None:
+                sidecar = ValueSidecar.new()
+            for primSpec in journalSidecar.layer.rootPrims:
+                Sdf.CopySpec(journalSidecar.layer, primSpec.path, sidecar.layer, primSpec.path)
+        return rootAttrib, nodeElements, sidecar, records
+
+    def load(self):
+        """
+        :return: the root element of the .ung with the journal replayed on it, the ValueSidecar of both
+        """
+        with self._lock:
+            rootAttrib, nodeElements, sidecar, records = self._open(stream=False)
+        rootElement = ET.Element('usdnodegraph', rootAttrib)
+        rootElement.extend(nodeElements)
+        if len(records) > 0:
+            rootElement = replayRecords(rootElement, records)
+        return rootElement, sidecar
+
+    def stream(self):
+        """
+        like load, with the node elements read one at a time from the .ung when they are asked for.
+        the root attributes are the ones of the .ung, without the journal on them.
+        :return: the attributes of the root element, an iterator of the node elements, the ValueSidecar
+        """
+        with self._lock:
+            rootAttrib, nodeElements, sidecar, records = self._open(stream=True)
+        if len(records) > 0:
+            nodeElements = iterReplayedElements(nodeElements, records)
+        return rootAttrib, nodeElements, sidecar
+
+    def canAppend(self):
+        """
+        :return: False if the .ung or its journal were written by something else since this session saw them
+        """
+        with self._lock:
+            return (
+                self.token is not None
+                and _getFileStat(self.ungFile) == self._ungStat
+                and _getFileSize(self.journalFile) == self._journalSize
+            )
+
+    def saveBase(self, writeUng):
+        """
+        write the whole .ung and start an empty journal
+        :param writeUng: function writing the .ung with the token given to it as its root 'journal' attribute
+        """
+        with self._lock:
+            self.token = _newToken()
+            writeUng(self.token)
+            _removeFile(self.journalFile)
+            _removeFile(getSidecarFile(self.journalFile))
+            self._sidecar = None
+            self._ungStat = _getFileStat(self.ungFile)
+            self._journalSize = 0
+
+    def _writeRecord(self, elements, removedNames):
+        parts = []
+        writer = XmlWriter(parts.append)
+        writer.writeDeclaration()
+        writer.startElement('usdnodegraph')
+        for name in removedNames:
+            writer.writeElement(ET.Element(REMOVE_TAG, {'n': name}))
+        for element in elements:
+            writer.writeElement(element)
+        writer.endElement()
+        return ''.join(parts).encode('utf-8')
+
+    def append(self, nodes, removedNames):
+        """
+        :param nodes: the nodes changed since the save before, with toXmlElement like NodeItem
+        :param removedNames: the names saved before which are gone
+        """
+        with self._lock:
+            sidecar = self._openSidecar()
+            valueCount = sidecar.getCount()
+            elements = [node.toXmlElement(sidecar=sidecar) for node in nodes]
+            if sidecar.getCount() != valueCount:
+                # the values are on disk before the record refers to them
+                sidecar.saveForXml(self.journalFile)
+
+            data = self._writeRecord(elements, removedNames)
+            with open(self.journalFile, 'ab') as f:
+                if self._journalSize == 0:
+                    f.write(_HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION, 0, self.token.encode('ascii')))
+                f.write(_RECORD.pack(len(data), _crc32(data)))
+                f.write(data)
+            self._journalSize = _getFileSize(self.journalFile)
+
+        if self.needsCompact():
+            self.compactInBackground()
+
+    def needsCompact(self):
+        return self._journalSize + _getFileSize(getSidecarFile(self.journalFile)) > self.compactSize
+
+    def isCompacting(self):
+        return self._compactThread is not None and self._compactThread.is_alive()
+
+    def compactInBackground(self):
+        """
+        fold the journal into the .ung on a worker thread, saves go on meanwhile
+        """
+        if self.isCompacting():
+            return
+        self._compactThread = threading.Thread(target=self._compactSafely)
+        self._compactThread.daemon = True
+        self._compactThread.start()
+
+    def waitForCompact(self):
+        if self._compactThread is not None:
+            self._compactThread.join()
+
+    def _compactSafely(self):
+        try:
+            self.compact()
+        except Exception as e:
+            logger.warning('Journal {} is not compacted: {}'.format(self.journalFile, e))
+
+    def compact(self):
+        """
+        write the .ung with the records replayed on it and a journal with the records appended meanwhile.
+        the values of the .ung keep their keys, the ones of the journal are added to its sidecar under new keys.
+        the sidecar with both is saved before the .ung is replaced, so the old and the new .ung both find their
+        values in it if a crash stops the compaction, the values no longer used are dropped after it.
+        """
+        with self._lock:
+            token = self.token
+            if token is None or self._journalSize == 0:
+                return
+            with open(self.ungFile, 'rb') as f:
+                rootElement = ET.fromstring(f.read())
+            records, end = readJournalRecords(self.journalFile, token, end=self._journalSize)
+            ungSidecar = ValueSidecar.openForXml(self.ungFile)
+            journalSidecar = ValueSidecar.openForXml(self.journalFile)
+
+        rootElement = replayRecords(rootElement, records)
+        grownSidecar = ungSidecar if ungSidecar is not None else ValueSidecar.new()
+        valueCount = grownSidecar.getCount()
+        if journalSidecar is not None:
+            _copyJournalValues(rootElement, journalSidecar.layer, grownSidecar)
+        keptSidecar = ValueSidecar.new()
+        keptSidecar.keepValues(grownSidecar.layer, _getSidecarKeys(rootElement))
+        newToken = _newToken()
+        rootElement.set(JOURNAL_TOKEN_ATTRIBUTE, newToken)
+
+        sidecarFile = getSidecarFile(self.ungFile)
+        tempUngFile = self.ungFile + '.compact'
+        tempGrownFile = getSidecarFile(self.ungFile + '.grown')
+        tempKeptFile = getSidecarFile(tempUngFile)
+        with open(tempUngFile, 'w') as f:
+            writer = XmlWriter(f.write)
+            writer.writeDeclaration()
+            writer.startElement(rootElement.tag, rootElement.attrib)
+            for nodeElement in rootElement:
+                writer.writeElement(nodeElement)
+            writer.endElement()
+        grown = grownSidecar.getCount() != valueCount
+        trimmed = len(keptSidecar.layer.rootPrims) != len(grownSidecar.layer.rootPrims)
+        if grown:
+            grownSidecar.layer.Export(tempGrownFile)
+        if trimmed and not keptSidecar.isEmpty():
+            keptSidecar.layer.Export(tempKeptFile)
+
+        with self._lock:
+            if self.token != token or _getFileStat(self.ungFile) != self._ungStat:
+                # saved again from the start meanwhile
+                for fileName in [tempUngFile, tempGrownFile, tempKeptFile]:
+                    _removeFile(fileName)
+                return
+            with open(self.journalFile, 'rb') as f:
+                f.seek(end)
+                tail = f.read()
+            tempJournalFile = self.journalFile + '.compact'
+            with open(tempJournalFile, 'wb') as f:
+                if len(tail) > 0:
+                    f.write(_HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION, 0, newToken.encode('ascii')))
+                    f.write(tail)
+
+            if grown:
+                replaceFile(tempGrownFile, sidecarFile)
+            replaceFile(tempUngFile, self.ungFile)
+            if trimmed and keptSidecar.isEmpty():
+                _removeFile(sidecarFile)
+            elif trimmed:
+                replaceFile(tempKeptFile, sidecarFile)
+            if len(tail) > 0:
+                # the records appended meanwhile still use the values of the journal sidecar
+                replaceFile(tempJournalFile, self.journalFile)
+            else:
+                _removeFile(tempJournalFile)
+                _removeFile(self.journalFile)
+                _removeFile(getSidecarFile(self.journalFile))
+                self._sidecar = None
+
+            self.token = newToken
+            self._ungStat = _getFileStat(self.ungFile)
+            self._journalSize = _getFileSize(self.journalFile)
+            logger.debug('journal {} compacted, {} records'.format(self.journalFile, len(records)))
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+import os
+from pxr import Sdf
+from usdNodeGraph.core.parameter import SpecValue
+
+SIDECAR_EXT = '.usdc'
+# array values with more items than this are saved to the sidecar instead of the xml
+SIDECAR_MIN_SIZE = 100
+SIDECAR_ATTRIBUTE_NAME = 'value'
+SIDECAR_PRIM_PREFIX = 'v'
+
+
+def getSidecarFile(xmlFile):
+    return xmlFile + SIDECAR_EXT
+
+
+def _getValueSize(value):
+    if value is None or isinstance(value, Sdf.ValueBlock):
+        return 0
+    return len(value)
+
+
+class ValueSidecar(object):
+    """
+    binary layer saved next to a .ung file, it keeps the big array values of the parameters.
+    the xml refers to a value by its attribute path, the value is only read when it is asked for.
+    """
+    def __init__(self, layer, prefix=SIDECAR_PRIM_PREFIX):
+        """
+        :param prefix: name prefix of the prims of the values, sidecars merged in one layer have different ones
+        """
+        self.layer = layer
+        self.prefix = prefix
+        self._count = self._getNextIndex()
+
+    def _getNextIndex(self):
+        # the values a compaction dropped leave gaps in the names
+        index = 0
+        for primSpec in self.layer.rootPrims:
+            name = primSpec.name
+            if name.startswith(self.prefix) and name[len(self.prefix):].isdigit():
+                index = max(index, int(name[len(self.prefix):]) + 1)
+        return index
+
+    @classmethod
+    def new(cls, prefix=SIDECAR_PRIM_PREFIX):
+        return cls(Sdf.Layer.CreateAnonymous(SIDECAR_EXT), prefix=prefix)
+
+    @classmethod
+    def openForXml(cls, xmlFile, prefix=SIDECAR_PRIM_PREFIX):
+        """
+        :return: the sidecar of xmlFile, None if it has none
+        """
+        sidecarFile = getSidecarFile(xmlFile)
+        if not os.path.exists(sidecarFile):
+            return
+        # opened anonymous, the sidecar saved again in this session is another layer
+        return cls(Sdf.Layer.OpenAsAnonymous(sidecarFile), prefix=prefix)
+
+    def isEmpty(self):
+        return len(self.layer.rootPrims) == 0
+
+    def getCount(self):
+        """
+        :return: the index of the next value, it grows with each value written
+        """
+        return self._count
+
+    def saveForXml(self, xmlFile):
+        sidecarFile = getSidecarFile(xmlFile)
+        if self.isEmpty():
+            # the values of an older save are not used any more
+            if os.path.exists(sidecarFile):
+                os.remove(sidecarFile)
+            return
+        self.layer.Export(sidecarFile)
+
+    def copyValue(self, layer, key):
+        """
+        :param layer: layer of another sidecar
+        :return: key of the copy of the value saved at key in layer, None if it has none
+        """
+        path = Sdf.Path(key)
+        primPath = path.GetPrimPath()
+        if layer.GetPrimAtPath(primPath) is None:
+            return
+        newPrimPath = Sdf.Path.absoluteRootPath.AppendChild('{}{}'.format(self.prefix, self._count))
+        self._count += 1
+        Sdf.CopySpec(layer, primPath, self.layer, newPrimPath)
+        return path.ReplacePrefix(primPath, newPrimPath).pathString
+
+    def keepValues(self, layer, keys):
+        """
+        copy the values saved at keys in layer to the same keys of this sidecar
+        :param layer: layer of another sidecar
+        """
+        for primPath in set(Sdf.Path(key).GetPrimPath() for key in keys):
+            if layer.GetPrimAtPath(primPath) is not None and self.layer.GetPrimAtPath(primPath) is None:
+                Sdf.CopySpec(layer, primPath, self.layer, primPath)
+        self._count = max(self._count, self._getNextIndex())
+
+    def isLargeParameter(self, parameter):
+        if not parameter.lazyValue or parameter.hasConnect():
+            return False
+        if parameter.hasKey():
+            values = parameter.getTimeSamples().values()
+            return sum(_getValueSize(value) for value in values) > SIDECAR_MIN_SIZE
+        specValue = parameter.getSpecValue()
+        if specValue is not None and not specValue.isLoaded():
+            # the array of the spec is measured without converting it
+            spec = specValue.getSpec()
+            return spec is not None and _getValueSize(spec.default) > SIDECAR_MIN_SIZE
+        return _getValueSize(parameter.getValue()) > SIDECAR_MIN_SIZE
+
+    def _newAttributeSpec(self, valueTypeName):
+        primSpec = Sdf.PrimSpec(self.layer, '{}{}'.format(self.prefix, self._count), Sdf.SpecifierDef)
+        self._count += 1
+        return Sdf.AttributeSpec(primSpec, SIDECAR_ATTRIBUTE_NAME, valueTypeName)
+
+    def writeParameter(self, parameter):
+        """
+        :return: key of the value in the sidecar
+        """
+        attributeSpec = self._newAttributeSpec(parameter.valueTypeName)
+        if parameter.hasKey():
+            for time, value in parameter.getTimeSamples().items():
+                self.layer.SetTimeSample(attributeSpec.path, time, value)
+        elif parameter.hasSpecValue() and not parameter.getSpecValue().isLoaded():
+            # spec to spec, the array is not read to python
+            attributeSpec.default = parameter.getSpecValue().getSpec().default
+        else:
+            attributeSpec.default = parameter.getValue()
+        return attributeSpec.path.pathString
+
+    def writeSpecValue(self, specValue):
+        """
+        :param specValue: SpecValue of a parameter, its value if it is loaded, else its spec
+        :return: key of the value in the sidecar, None if the spec is gone
+        """
+        spec = specValue.getSpec()
+        if spec is None:
+            return
+        if specValue.isLoaded():
+            attributeSpec = self._newAttributeSpec(spec.typeName)
+            attributeSpec.default = specValue.getValue()
+            return attributeSpec.path.pathString
+        # spec to spec, the array is not read to python
+        primSpec = Sdf.PrimSpec(self.layer, '{}{}'.format(self.prefix, self._count), Sdf.SpecifierDef)
+        self._count += 1
+        path = primSpec.path.AppendProperty(SIDECAR_ATTRIBUTE_NAME)
+        Sdf.CopySpec(spec.layer, spec.path, self.layer, path)
+        return path.pathString
+
+    def readParameter(self, parameter, key):
+        path = Sdf.Path(key)
+        times = self.layer.ListTimeSamplesForPath(path)
+        if len(times) > 0:
+            timeSamples = {}
+            for time in times:
+                timeSamples[time] = self.layer.QueryTimeSample(path, time)
+            parameter.setTimeSamplesQuietly(timeSamples)
+        else:
+            parameter.setSpecValueQuietly(SpecValue(self.layer.GetAttributeAtPath(path)))
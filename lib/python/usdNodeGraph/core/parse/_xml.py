@@ -1,53 +1,126 @@
-import tempfile
 import xml.etree.ElementTree as ET
-import xml.dom.minidom as minidom
+from usdNodeGraph.utils.pyversion import *
 
+XML_DECLARATION = '<?xml version="1.0" encoding="utf-8"?>'
+XML_INDENT = '\t'
+XML_NEWLINE = '\n'
 
-def fixedWritexml(self, writer, indent="", addindent="", newl=""):
+
+def _escape(data):
+    if not isinstance(data, basestring):
+        # a python value of a typed element, see Parameter.toXmlElement
+        data = str(data)
+    if '\r' in data:
+        # line ends as the text files the xml used to go through made them
+        data = data.replace('\r\n', '\n').replace('\r', '\n')
+    return data.replace('&', '&amp;').replace('<', '&lt;').replace('"', '&quot;').replace('>', '&gt;')
+
+
+class XmlWriter(object):
     """
-    :param indent:
-    :param addindent:
-    :param newl:
-    :return:
+    writes elements indented and with their attributes sorted in one pass, straight to a file or a buffer.
+    text is only kept in elements without children and tails are dropped.
     """
+    def __init__(self, write, indent=XML_INDENT, newl=XML_NEWLINE):
+        """
+        :param write: function the xml text goes to, like file.write
+        """
+        self.write = write
+        self.indent = indent
+        self.newl = newl
+        self._openTags = []
 
-    writer.write(indent+"<" + self.tagName)
+    def _currentIndent(self):
+        return self.indent * len(self._openTags)
 
-    attrs = self._get_attributes()
-    a_names = list(attrs.keys())
-    a_names.sort()
+    def _startTag(self, tag, attrib):
+        parts = ['<', tag]
+        for key in sorted(attrib):
+            parts.extend([' ', key, '="', _escape(attrib[key]), '"'])
+        return ''.join(parts)
 
-    for a_name in a_names:
-        writer.write(" %s=\"" % a_name)
-        minidom._write_data(writer, attrs[a_name].value)
-        writer.write("\"")
-    if self.childNodes:
-        if len(self.childNodes) == 1 \
-          and self.childNodes[0].nodeType == minidom.Node.TEXT_NODE:
-            writer.write(">")
-            self.childNodes[0].writexml(writer, "", "", "")
-            writer.write("</%s>%s" % (self.tagName, newl))
-            return
-        writer.write(">%s" % (newl, ))
-        for node in self.childNodes:
-            if node.nodeType is not minidom.Node.TEXT_NODE:
-                node.writexml(writer, indent+addindent, addindent, newl)
-        writer.write("%s</%s>%s" % (indent, self.tagName, newl))
-    else:
-        writer.write("/>%s" % (newl, ))
+    def writeDeclaration(self):
+        self.write(XML_DECLARATION + self.newl)
 
+    def startElement(self, tag, attrib=None):
+        """
+        open an element, the elements written until endElement go in it
+        """
+        self.write(self._currentIndent() + self._startTag(tag, attrib or {}) + '>' + self.newl)
+        self._openTags.append(tag)
 
-minidom.Element.writexml = fixedWritexml
+    def endElement(self):
+        tag = self._openTags.pop()
+        self.write(self._currentIndent() + '</' + tag + '>' + self.newl)
+
+    def writeElement(self, element):
+        indent = self._currentIndent()
+        parts = []
+        # element, depth of its indent, children were written
+        stack = [(element, indent, False)]
+        while stack:
+            element, indent, closing = stack.pop()
+            if closing:
+                parts.append(indent + '</' + element.tag + '>' + self.newl)
+                continue
+            startTag = indent + self._startTag(element.tag, element.attrib)
+            if len(element) > 0:
+                parts.append(startTag + '>' + self.newl)
+                stack.append((element, indent, True))
+                childIndent = indent + self.indent
+                for child in reversed(element):
+                    stack.append((child, childIndent, False))
+            elif element.text:
+                parts.append(startTag + '>' + _escape(element.text) + '</' + element.tag + '>' + self.newl)
+            else:
+                parts.append(startTag + '/>' + self.newl)
+        self.write(''.join(parts))
 
 
 def convertToString(element):
-    string = ET.tostring(element)
-    document = minidom.parseString(string)
-    tmpFile = tempfile.mktemp(suffix='.xml')
-    with open(tmpFile, 'w') as f:
-        document.writexml(f, addindent='\t', newl='\n', encoding='utf-8')
-    with open(tmpFile, 'r') as f:
-        txt = f.read()
-    return txt
+    parts = []
+    writer = XmlWriter(parts.append)
+    writer.writeDeclaration()
+    writer.writeElement(element)
+    return ''.join(parts)
+
+
+def iterXmlFile(xmlFile):
+    """
+    parse an xml file a child of the root at a time, the children are dropped from the root once they are read
+    :return: the attributes of the root element, an iterator of its children
+    """
+    events = ET.iterparse(xmlFile, events=('start', 'end'))
+    _, rootElement = next(events)
+    rootAttrib = dict(rootElement.attrib)
+
+    def iterChildren():
+        depth = 0
+        for event, element in events:
+            if event == 'start':
+                depth += 1
+                continue
+            depth -= 1
+            if depth == 0:
+                yield element
+                # the root would keep every child read so far
+                rootElement.clear()
 
+    return rootAttrib, iterChildren()
 
+
+def getConnections(nodeElement, strings=None):
+    """
+    :param strings: dict the names are shared through, most of them are the same over the nodes
+    :return: (tag, port name, other node name, other port name) of the 'o' then the 'i' children of a node element,
+    kept instead of the element to connect the nodes at the end
+    """
+    if strings is None:
+        strings = {}
+    connections = []
+    for tag in ('o', 'i'):
+        for child in nodeElement.findall(tag):
+            connections.append(tuple(
+                [tag] + [strings.setdefault(child.get(key), child.get(key)) for key in ('n', 'conN', 'conP')]
+            ))
+    return connections
@@ -1,17 +1,25 @@
-from usdNodeGraph.module.sqt import QtCore
+from usdNodeGraph.utils.signal import Signal
 
 
-class GraphState(QtCore.QObject):
-    currentTimeChanged = QtCore.Signal(float)
-    liveUpdateModeChanged = QtCore.Signal(bool)
+class GraphState(object):
+    currentTimeChanged = Signal(float)
+    liveUpdateModeChanged = Signal(bool)
 
     _callbacks = {}
     _functions = {}
+    # [callbackType, kwargs] executed when the callbacks are not deferred any more
+    _deferredCallbacks = []
+    _callbacksDeferred = 0
 
     _state = None
     _times = {}
 
     _liveUpdate = False
+    # open layers with the prims deeper than maxDepth or with more than maxPrimCount prims collapsed, None for no limit
+    _lazyLoad = {
+        'maxDepth': None,
+        'maxPrimCount': None,
+    }
 
     @classmethod
     def getState(cls):
@@ -74,15 +82,51 @@ class GraphState(QtCore.QObject):
 
     @classmethod
     def executeCallbacks(cls, callbackType, **kwargs):
+        if cls._callbacksDeferred > 0:
+            cls._deferredCallbacks.append([callbackType, kwargs])
+            return
         funcs = cls._callbacks.get(callbackType, [])
         kwargs.update({'type': callbackType})
         for func in funcs:
             func(**kwargs)
 
+    class CallbacksDefer(object):
+        def __enter__(self):
+            GraphState._callbacksDeferred += 1
+
+        def __exit__(self, *args):
+            GraphState._callbacksDeferred -= 1
+            if GraphState._callbacksDeferred == 0:
+                GraphState._executeDeferredCallbacks()
+
+    @classmethod
+    def deferCallbacks(cls):
+        """
+        execute the callbacks when leaving the context, in order and once for the same arguments
+        """
+        return cls.CallbacksDefer()
+
+    @classmethod
+    def _executeDeferredCallbacks(cls):
+        deferredCallbacks = cls._deferredCallbacks
+        cls._deferredCallbacks = []
+        executed = set()
+        for callbackType, kwargs in deferredCallbacks:
+            # the arguments are alive in the list, their ids are not reused
+            key = (callbackType, tuple(sorted([(k, id(v)) for k, v in kwargs.items()])))
+            if key in executed:
+                continue
+            executed.add(key)
+            cls.executeCallbacks(callbackType, **kwargs)
+
     @classmethod
     def setFunction(cls, funcName, func):
         cls._functions[funcName] = func
 
+    @classmethod
+    def getFunction(cls, funcName):
+        return cls._functions.get(funcName)
+
     @classmethod
     def hasFunction(cls, funcName):
         return funcName in cls._functions
@@ -115,3 +159,14 @@ class GraphState(QtCore.QObject):
     def stopLiveUpdate(cls):
         return cls.LiveUpdateStop()
 
+    @classmethod
+    def setLazyLoad(cls, maxDepth=None, maxPrimCount=None):
+        cls._lazyLoad = {
+            'maxDepth': maxDepth,
+            'maxPrimCount': maxPrimCount,
+        }
+
+    @classmethod
+    def getLazyLoad(cls):
+        return dict(cls._lazyLoad)
+
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import hashlib
+import threading
+import traceback
+from usdNodeGraph.module.sqt import *
+from usdNodeGraph.utils.const import AUTOSAVE_INTERVAL, AUTOSAVE_DIR
+from usdNodeGraph.core.parse._xml import ET, XmlWriter
+from usdNodeGraph.core.parse._sidecar import ValueSidecar, getSidecarFile
+from usdNodeGraph.core.parse._journal import getJournalFile, replaceFile
+from usdNodeGraph.utils.log import get_logger
+
+logger = get_logger('usdNodeGraph.autosave')
+
+
+# recovery snapshots kept for a layer, the oldest one is written over
+AUTOSAVE_FILE_COUNT = 3
+# seconds of taking node elements before the events are processed again
+AUTOSAVE_SLICE_TIME = 0.05
+RECOVERY_EXT = '.ung'
+
+
+def getRecoveryFiles(layerFile, recoveryDir=None):
+    """
+    :return: the recovery snapshot files of a layer, existing or not
+    """
+    recoveryDir = recoveryDir or AUTOSAVE_DIR
+    layerFile = os.path.abspath(layerFile)
+    key = hashlib.md5(layerFile.encode('utf-8')).hexdigest()[:8]
+    name = os.path.splitext(os.path.basename(layerFile))[0]
+    return [
+        os.path.join(recoveryDir, '{}_{}.{}{}'.format(name, key, index, RECOVERY_EXT))
+        for index in range(AUTOSAVE_FILE_COUNT)
+    ]
+
+
+def _getModifyTime(fileName):
+    return os.path.getmtime(fileName) if os.path.exists(fileName) else 0
+
+
+def findRecoveryFile(layerFile, recoveryDir=None):
+    """
+    :return: the latest recovery snapshot of a layer written after the layer and its .ung were saved, None if none
+    """
+    ungFile = os.path.splitext(layerFile)[0] + '.ung'
+    savedTime = max(_getModifyTime(f) for f in [layerFile, ungFile, getJournalFile(ungFile)])
+    recoveryFiles = [f for f in getRecoveryFiles(layerFile, recoveryDir) if _getModifyTime(f) > savedTime]
+    if len(recoveryFiles) == 0:
+        return
+    return max(recoveryFiles, key=_getModifyTime)
+
+
+def _getNodePosition(nodeElement, name):
+    for paramElement in nodeElement.findall('p'):
+        if paramElement.get('n') == name:
+            return paramElement.get('val')
+
+
+class AutosaveJob(object):
+    def __init__(self, items, changedNodes, changeCount, specValues):
+        # node items left to take, the nodes changed since the snapshot before, None for all
+        self.items = items
+        self.changedNodes = changedNodes
+        self.changeCount = changeCount
+        self.specValues = specValues
+        # node: element, the elements are shared with the snapshots after it, so only read
+        self.elements = {}
+        # the spec values are copied to the sidecar on the gui thread, the worker doesn't read their layers
+        self.sidecar = ValueSidecar.new()
+        # spec key: key of its copy in the sidecar
+        self.dataKeys = {}
+
+        self.recoveryFile = None
+        self.writing = False
+        self.error = None
+        self.cost = 0
+
+
+class AutosaveService(QtCore.QObject):
+    """
+    autosave a changed scene to recovery snapshots on a timer.
+    the node elements are taken on the gui thread in time slices, only for the nodes changed since the snapshot before,
+    and written to a .ung on a worker thread.
+    """
+    saveFinished = QtCore.Signal(object)
+
+    def __init__(self, scene, interval=AUTOSAVE_INTERVAL, recoveryDir=None):
+        """
+        :param interval: seconds between the autosaves, 0 for none
+        :param recoveryDir: folder of the recovery snapshots, AUTOSAVE_DIR if None
+        """
+        super(AutosaveService, self).__init__(scene)
+
+        self.scene = scene
+        self.interval = interval
+        self.recoveryDir = recoveryDir
+
+        self._runningJob = None
+        self._fileIndex = None
+        self._changeCount = None
+        # node: its element in the snapshots, the keys of specValues go on over the snapshots
+        self._elements = {}
+        self._specValues = {}
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.timeout.connect(self.autosave)
+
+        self._sliceTimer = QtCore.QTimer(self)
+        self._sliceTimer.setSingleShot(True)
+        self._sliceTimer.setInterval(0)
+        self._sliceTimer.timeout.connect(self._takeNextElements)
+
+        self.saveFinished.connect(self._afterSave)
+
+    def start(self):
+        self.reset()
+        if self.interval > 0 and self.scene.layer is not None:
+            self._timer.start(int(self.interval * 1000))
+
+    def stop(self):
+        self._timer.stop()
+        self.reset()
+
+    def reset(self):
+        """
+        forget the snapshots of the nodes, a new scene starts over
+        """
+        job = self._runningJob
+        if job is not None and not job.writing:
+            # the elements being taken are of the old scene
+            self._sliceTimer.stop()
+            self._runningJob = None
+        self._fileIndex = None
+        self._changeCount = None
+        self._elements = {}
+        self._specValues = {}
+
+    def isBusy(self):
+        return self._runningJob is not None
+
+    def getRecoveryFiles(self):
+        return getRecoveryFiles(self.scene.layer.realPath, self.recoveryDir)
+
+    def clearRecovery(self):
+        """
+        remove the recovery snapshots of the layer, they are older than a save
+        """
+        if self.scene.layer is None:
+            return
+        for recoveryFile in self.getRecoveryFiles():
+            for fileName in [recoveryFile, getSidecarFile(recoveryFile)]:
+                if os.path.exists(fileName):
+                    os.remove(fileName)
+
+    def _nextRecoveryFile(self):
+        recoveryFiles = self.getRecoveryFiles()
+        if self._fileIndex is None:
+            # after the latest snapshot of an earlier session
+            latest = max(recoveryFiles, key=_getModifyTime)
+            self._fileIndex = recoveryFiles.index(latest) if os.path.exists(latest) else -1
+        self._fileIndex = (self._fileIndex + 1) % len(recoveryFiles)
+        return recoveryFiles[self._fileIndex]
+
+    def autosave(self):
+        """
+        write a recovery snapshot if the scene changed since the snapshot before and since it was saved
+        """
+        graph = self.scene.graph
+        if self._runningJob is not None or self.scene.layer is None:
+            return
+        if not graph.hasUnsavedChanges() or graph.getChangeCount() == self._changeCount:
+            return
+
+        if self._changeCount is None:
+            changedNodes = None
+        else:
+            changedNodes = graph.getNodesChangedSince(self._changeCount)
+        items = self.scene.allNodes()
+        items.reverse()
+        self._runningJob = AutosaveJob(items, changedNodes, graph.getChangeCount(), self._specValues)
+        self._takeNextElements()
+
+    def _takeNextElements(self):
+        job = self._runningJob
+        if job is None:
+            return
+        start = time.time()
+        while len(job.items) > 0 and time.time() - start < AUTOSAVE_SLICE_TIME:
+            item = job.items.pop()
+            node = item.nodeObject
+            if node.graph is None:
+                continue
+            element = None
+            if job.changedNodes is not None and node not in job.changedNodes:
+                element = self._elements.get(node)
+            if element is None:
+                # no strings are formatted here, the values go to the worker as they are
+                element = item.toXmlElement(specValues=job.specValues, typed=True)
+            job.elements[node] = element
+            self._copySpecValues(job, element)
+        if len(job.items) > 0:
+            self._sliceTimer.start()
+            return
+
+        # the nodes changed while the elements were taken are taken again next time
+        self._elements = job.elements
+        self._changeCount = job.changeCount
+        if len(job.elements) == 0:
+            self._runningJob = None
+            return
+        job.recoveryFile = self._nextRecoveryFile()
+        job.writing = True
+        thread = threading.Thread(target=self._write, args=(job, ))
+        thread.daemon = True
+        thread.start()
+
+    def waitForSave(self):
+        """
+        wait for the running autosave and its finish on the gui thread
+        """
+        while self._runningJob is not None:
+            QtCore.QCoreApplication.processEvents(QtCore.QEventLoop.AllEvents, 50)
+
+    def _copySpecValues(self, job, element):
+        for paramElement in element.findall('p'):
+            specKey = paramElement.get('spec')
+            if specKey is not None and specKey not in job.dataKeys:
+                job.dataKeys[specKey] = job.sidecar.writeSpecValue(job.specValues[specKey])
+
+    def _resolveSpecValues(self, element, dataKeys):
+        # the element is copied to refer to the copies of its spec values in the sidecar
+        if all(p.get('spec') is None for p in element.findall('p')):
+            return element
+        newElement = ET.Element(element.tag, dict(element.attrib))
+        for child in element:
+            if child.tag == 'p' and child.get('spec') is not None:
+                specKey = child.get('spec')
+                if dataKeys[specKey] is None:
+                    continue
+                attrib = dict(child.attrib)
+                attrib.pop('spec')
+                attrib['data'] = dataKeys[specKey]
+                newChild = ET.Element(child.tag, attrib)
+                newChild.extend(list(child))
+                child = newChild
+            newElement.append(child)
+        return newElement
+
+    def _write(self, job):
+        start = time.time()
+        recoveryFile = job.recoveryFile
+        tempFile = recoveryFile + '.tmp'
+        try:
+            recoveryDir = os.path.dirname(recoveryFile)
+            if not os.path.isdir(recoveryDir):
+                os.makedirs(recoveryDir)
+
+            sidecar = job.sidecar
+            elements = [self._resolveSpecValues(e, job.dataKeys) for e in job.elements.values()]
+            positions = [
+                [_getNodePosition(e, 'x') for e in elements],
+                [_getNodePosition(e, 'y') for e in elements],
+            ]
+            rootAttrib = dict(
+                (key, str(min(float(p) for p in values if p is not None)))
+                for key, values in zip(['x', 'y'], positions)
+            )
+
+            with open(tempFile, 'w') as f:
+                writer = XmlWriter(f.write)
+                writer.writeDeclaration()
+                writer.startElement('usdnodegraph', rootAttrib)
+                for element in elements:
+                    writer.writeElement(element)
+                writer.endElement()
+
+            # the sidecar goes first, the snapshot refers to it
+            sidecarFile = getSidecarFile(recoveryFile)
+            if sidecar.isEmpty():
+                if os.path.exists(sidecarFile):
+                    os.remove(sidecarFile)
+            else:
+                tempSidecarFile = getSidecarFile(tempFile)
+                sidecar.layer.Export(tempSidecarFile)
+                replaceFile(tempSidecarFile, sidecarFile)
+            replaceFile(tempFile, recoveryFile)
+        except Exception:
+            job.error = 'Autosave Error:\n{}'.format(traceback.format_exc())
+        job.cost = time.time() - start
+        self.saveFinished.emit(job)
+
+    def _afterSave(self, job):
+        if job is self._runningJob:
+            self._runningJob = None
+        if job.error is not None:
+            logger.warning(job.error)
+            # the nodes are all taken again next time
+            self._changeCount = None
+            return
+        logger.debug('autosave to {} {:.3f}s'.format(job.recoveryFile, job.cost))
@@ -13,4 +13,6 @@ PADDING_Y = 100
 DEFAULT_COLOR = [210, 210, 210]
 DEFAULT_LABEL_COLOR = QtGui.QColor(200, 200, 200)
 PORT_SPACING = 20
+# part of the nodes of a scene placed or created at once, above which the scene index is built again instead of updated
+REINDEX_RATIO = 0.4
 
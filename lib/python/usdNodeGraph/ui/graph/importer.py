@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import threading
+import traceback
+from usdNodeGraph.module.sqt import *
+from usdNodeGraph.core.graph.describe import LayerDescriber, ImportCancelled
+from usdNodeGraph.core.state import GraphState
+from usdNodeGraph.utils.const import IMPORT_CANCEL_COLLAPSED
+from usdNodeGraph.utils.log import get_logger
+
+logger = get_logger('usdNodeGraph.importer')
+
+
+# seconds of node creation before the events are processed again
+IMPORT_SLICE_TIME = 0.05
+# nodes created between the connection updates
+IMPORT_CHUNK_NODES = 50
+# ms before the progress dialog shows up
+IMPORT_PROGRESS_DELAY = 500
+# with collapseOnCancel, a cancelled import opens the prims collapsed, they still cook to the whole layer
+CANCELLED_LAZY_LOAD = {
+    'maxDepth': 0,
+    'maxPrimCount': None,
+}
+
+
+class LayerImportJob(object):
+    def __init__(self, generation, layer, stage, importMask=None, background=False):
+        self.generation = generation
+        self.layer = layer
+        self.stage = stage
+        self.importMask = importMask
+        self.background = background
+        self.cancelEvent = threading.Event()
+
+        self.description = None
+        self.createdNodes = []
+        self.error = None
+        self.cancelled = False
+        # the nodes are created in one bulkCreate of the scene over all the slices
+        self.bulkCreating = False
+        # live update mode to restore when the job finishes
+        self.liveUpdate = False
+        # [phase, seconds]
+        self.timings = []
+
+
+class LayerImporter(QtCore.QObject):
+    """
+    import a layer to the nodes of a scene in two phases:
+    describe, walk the layer specs to a LayerDescription on a worker thread,
+    create, make the node items of the description on the gui thread in time slices.
+    a cancelled or failed import leaves the scene empty, or with its top prims collapsed with collapseOnCancel.
+    """
+    describeFinished = QtCore.Signal(object)
+    importFinished = QtCore.Signal(object)
+
+    def __init__(self, scene):
+        super(LayerImporter, self).__init__(scene)
+
+        self.scene = scene
+        self.lastTimings = []
+        self.collapseOnCancel = IMPORT_CANCEL_COLLAPSED
+
+        self._generation = 0
+        self._job = None
+        self._progressDialog = None
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self._createNextNodes)
+
+        self.describeFinished.connect(self._startCreate)
+
+    def isBusy(self):
+        return self._job is not None
+
+    def importLayer(self):
+        """
+        import the layer of the scene and wait for it
+        """
+        job = self._newJob(background=False)
+        try:
+            with GraphState.stopLiveUpdate():
+                self._describe(job)
+                start = time.time()
+                self._beginBulkCreate(job)
+                self._createNodes(job)
+                self._addTiming(job, 'create', start)
+                self._finishJob(job)
+        finally:
+            self._job = None
+            self._endBulkCreate(job)
+
+    def start(self):
+        """
+        import the layer of the scene on a worker thread, with a progress dialog to cancel it.
+        the scene is reset when importFinished is emitted.
+        """
+        self.cancel()
+
+        job = self._newJob(background=True)
+        job.liveUpdate = GraphState.isLiveUpdate()
+        GraphState.setLiveUpdate(False)
+        self._setViewUpdates(False)
+        self._showProgress(job)
+
+        thread = threading.Thread(target=self._describe, args=(job, ))
+        thread.daemon = True
+        thread.start()
+
+    def cancel(self):
+        """
+        drop the running import, the nodes created so far are kept for the scene to clear
+        """
+        job = self._job
+        if job is None:
+            return
+        self._generation += 1
+        self._job = None
+        self._timer.stop()
+        job.cancelEvent.set()
+        self._endBulkCreate(job)
+        self._closeProgress()
+        self._setViewUpdates(True)
+        GraphState.setLiveUpdate(job.liveUpdate)
+
+    def _newJob(self, background=False):
+        self._generation += 1
+        job = LayerImportJob(
+            self._generation, self.scene.layer, self.scene.stage,
+            importMask=self.scene.importMask, background=background
+        )
+        self._job = job
+        return job
+
+    def _beginBulkCreate(self, job):
+        if not job.bulkCreating:
+            job.bulkCreating = True
+            self.scene.beginBulkCreate()
+
+    def _endBulkCreate(self, job):
+        if job.bulkCreating:
+            job.bulkCreating = False
+            self.scene.endBulkCreate()
+
+    def _addTiming(self, job, phase, start):
+        job.timings.append([phase, time.time() - start])
+
+    def _describe(self, job):
+        start = time.time()
+        describer = LayerDescriber(job.layer, stage=job.stage, importMask=job.importMask, cancelEvent=job.cancelEvent)
+        try:
+            job.description = describer.describeLayer()
+        except ImportCancelled:
+            job.cancelled = True
+        except Exception:
+            if not job.background:
+                raise
+            job.error = 'Import Layer Error:\n{}'.format(traceback.format_exc())
+        self._addTiming(job, 'describe', start)
+        if job.background:
+            self.describeFinished.emit(job)
+
+    def _createNodes(self, job, count=None):
+        """
+        :param count: number of nodes to create, None for all the rest
+        """
+        description = job.description
+        stop = description.getNodeCount()
+        if count is not None:
+            stop = min(stop, len(job.createdNodes) + count)
+        while len(job.createdNodes) < stop:
+            self.scene.createNodesFromDescription(
+                description, job.createdNodes,
+                stop=min(stop, len(job.createdNodes) + IMPORT_CHUNK_NODES)
+            )
+
+    def _startCreate(self, job):
+        if job is not self._job:
+            return
+        if job.cancelled or job.error is not None:
+            self._finishJob(job)
+            return
+
+        if self._progressDialog is not None:
+            self._progressDialog.setRange(0, job.description.getNodeCount())
+        job.timings.append(['create', 0.0])
+        self._beginBulkCreate(job)
+        self._timer.start()
+
+    def _createNextNodes(self):
+        job = self._job
+        if job is None:
+            return
+        start = time.time()
+        nodeCount = job.description.getNodeCount()
+        while len(job.createdNodes) < nodeCount and time.time() - start < IMPORT_SLICE_TIME:
+            self._createNodes(job, count=IMPORT_CHUNK_NODES)
+        job.timings[-1][1] += time.time() - start
+
+        if len(job.createdNodes) < nodeCount:
+            if self._progressDialog is not None:
+                self._progressDialog.setLabelText('Creating nodes {}/{}...'.format(len(job.createdNodes), nodeCount))
+                # a modal dialog processes the events, the job may be cancelled in there
+                self._progressDialog.setValue(len(job.createdNodes))
+            if job is self._job:
+                self._timer.start()
+        else:
+            self._finishJob(job)
+
+    def _cancelRequested(self):
+        job = self._job
+        if job is None:
+            return
+        job.cancelled = True
+        job.cancelEvent.set()
+        if job.description is not None:
+            # not waiting for the worker any more
+            self._timer.stop()
+            self._finishJob(job)
+
+    def _dropCreatedNodes(self, job):
+        self.scene.clear()
+        self.scene.graph.clear()
+        job.createdNodes = []
+
+    def _importCollapsed(self, job):
+        # the nodes of the cancelled import are dropped for the top prims collapsed
+        start = time.time()
+        self._dropCreatedNodes(job)
+        job.description = LayerDescriber(
+            job.layer, stage=job.stage, lazyLoad=CANCELLED_LAZY_LOAD, importMask=job.importMask
+        ).describeLayer()
+        self._beginBulkCreate(job)
+        self._createNodes(job)
+        self._addTiming(job, 'collapse', start)
+
+    def _finishJob(self, job):
+        if job.error is not None:
+            GraphState.executeFunction('logError', job.error)
+            logger.error(job.error)
+        if job.cancelled or job.error is not None:
+            if self.collapseOnCancel:
+                logger.warning('import of {} stopped, prims are collapsed'.format(job.layer.identifier))
+                self._importCollapsed(job)
+            else:
+                logger.warning('import of {} stopped, the scene is left empty'.format(job.layer.identifier))
+                self._dropCreatedNodes(job)
+
+        start = time.time()
+        # the shaders find their connections by the prim paths, synced at the end
+        self._endBulkCreate(job)
+        self._addTiming(job, 'sync', start)
+
+        start = time.time()
+        self.scene._connectShadeNodes()
+        self._addTiming(job, 'connectShaders', start)
+
+        start = time.time()
+        self.scene.layoutNodes()
+        self._addTiming(job, 'layout', start)
+
+        self._job = None
+        self._closeProgress()
+        if job.background:
+            self._setViewUpdates(True)
+            GraphState.setLiveUpdate(job.liveUpdate)
+
+        self.lastTimings = job.timings
+        logger.debug('import {}, {} nodes: {}'.format(
+            job.layer.identifier, len(job.createdNodes),
+            ', '.join(['{} {:.3f}s'.format(phase, cost) for phase, cost in job.timings])
+        ))
+        self.importFinished.emit(job)
+
+    def _setViewUpdates(self, enabled):
+        # repainting the scene between the slices costs more than creating the nodes
+        if self.scene.view is not None:
+            self.scene.view.viewport().setUpdatesEnabled(enabled)
+
+    def _showProgress(self, job):
+        if self.scene.view is None:
+            return
+        dialog = QtWidgets.QProgressDialog(self.scene.view)
+        dialog.setWindowTitle('Import Layer')
+        dialog.setLabelText('Reading {}...'.format(os.path.basename(job.layer.realPath or job.layer.identifier)))
+        dialog.setWindowModality(QtCore.Qt.WindowModal)
+        dialog.setMinimumDuration(IMPORT_PROGRESS_DELAY)
+        dialog.setAutoClose(False)
+        dialog.setAutoReset(False)
+        dialog.setRange(0, 0)
+        dialog.canceled.connect(self._cancelRequested)
+        dialog.setValue(0)
+        self._progressDialog = dialog
+
+    def _closeProgress(self):
+        dialog = self._progressDialog
+        if dialog is None:
+            return
+        self._progressDialog = None
+        # closing emits canceled
+        dialog.canceled.disconnect(self._cancelRequested)
+        dialog.close()
+        dialog.deleteLater()
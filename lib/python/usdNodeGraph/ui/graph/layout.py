@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+
+# space between the nodes next to each other
+LAYOUT_SPACING_X = 50
+# space between a node and its children
+LAYOUT_SPACING_Y = 100
+
+
+class TreeLayout(object):
+    """
+    tidy tree layout in linear time (Walker's algorithm as improved by Buchheim, Juenger and Leipert),
+    parents are centered above their children and subtrees are packed as close as they fit.
+    the tree is walked without recursion, the positions go to arrays indexed in depth first order.
+    """
+    def __init__(self, root, getChildren, getSize, spacingX=LAYOUT_SPACING_X, spacingY=LAYOUT_SPACING_Y):
+        """
+        :param root: node the tree hangs from
+        :param getChildren: function of a node to its children in order
+        :param getSize: function of a node to its (width, height)
+        """
+        self.root = root
+        self.getChildren = getChildren
+        self.getSize = getSize
+        self.spacingX = spacingX
+        self.spacingY = spacingY
+
+        self.nodes = []
+        self.children = []
+        self.parent = []
+        # index among the siblings
+        self.number = []
+        self.width = []
+        self.height = []
+
+        self.prelim = []
+        self.mod = []
+        self.shift = []
+        self.change = []
+        self.thread = []
+        self.ancestor = []
+        self.midpoint = []
+
+        # centers of the nodes and tops of the rows, relative to the root
+        self.x = []
+        self.y = []
+
+    def _addNode(self, node, parent, number):
+        index = len(self.nodes)
+        width, height = self.getSize(node)
+        self.nodes.append(node)
+        self.children.append([])
+        self.parent.append(parent)
+        self.number.append(number)
+        self.width.append(width)
+        self.height.append(height)
+        return index
+
+    def _buildTree(self):
+        # a node with several sources is laid out under the first one found
+        visited = set([self.root])
+        self._addNode(self.root, -1, 0)
+        stack = [0]
+        while stack:
+            index = stack.pop()
+            childIndices = self.children[index]
+            for child in self.getChildren(self.nodes[index]):
+                if child in visited:
+                    continue
+                visited.add(child)
+                childIndices.append(self._addNode(child, index, len(childIndices)))
+            stack.extend(reversed(childIndices))
+
+        count = len(self.nodes)
+        self.prelim = [0.0] * count
+        self.mod = [0.0] * count
+        self.shift = [0.0] * count
+        self.change = [0.0] * count
+        self.thread = [-1] * count
+        self.ancestor = list(range(count))
+        self.midpoint = [0.0] * count
+
+    def _distance(self, left, right):
+        return (self.width[left] + self.width[right]) / 2.0 + self.spacingX
+
+    def _nextLeft(self, index):
+        children = self.children[index]
+        return children[0] if children else self.thread[index]
+
+    def _nextRight(self, index):
+        children = self.children[index]
+        return children[-1] if children else self.thread[index]
+
+    def _moveSubtree(self, left, right, shift):
+        subtrees = float(self.number[right] - self.number[left])
+        self.change[right] -= shift / subtrees
+        self.shift[right] += shift
+        self.change[left] += shift / subtrees
+        self.prelim[right] += shift
+        self.mod[right] += shift
+
+    def _apportion(self, index, defaultAncestor):
+        # push the subtree of index right of the subtrees of its left siblings
+        number = self.number[index]
+        if number == 0:
+            return defaultAncestor
+        siblings = self.children[self.parent[index]]
+        mod = self.mod
+        prelim = self.prelim
+
+        insideRight = outsideRight = index
+        insideLeft = siblings[number - 1]
+        outsideLeft = siblings[0]
+        sumInsideRight = sumOutsideRight = mod[index]
+        sumInsideLeft = mod[insideLeft]
+        sumOutsideLeft = mod[outsideLeft]
+
+        nextRight = self._nextRight(insideLeft)
+        nextLeft = self._nextLeft(insideRight)
+        while nextRight != -1 and nextLeft != -1:
+            insideLeft = nextRight
+            insideRight = nextLeft
+            outsideLeft = self._nextLeft(outsideLeft)
+            outsideRight = self._nextRight(outsideRight)
+            self.ancestor[outsideRight] = index
+            shift = (prelim[insideLeft] + sumInsideLeft) - (prelim[insideRight] + sumInsideRight) \
+                + self._distance(insideLeft, insideRight)
+            if shift > 0:
+                ancestor = self.ancestor[insideLeft]
+                if self.parent[ancestor] != self.parent[index]:
+                    ancestor = defaultAncestor
+                self._moveSubtree(ancestor, index, shift)
+                sumInsideRight += shift
+                sumOutsideRight += shift
+            sumInsideLeft += mod[insideLeft]
+            sumInsideRight += mod[insideRight]
+            sumOutsideLeft += mod[outsideLeft]
+            sumOutsideRight += mod[outsideRight]
+            nextRight = self._nextRight(insideLeft)
+            nextLeft = self._nextLeft(insideRight)
+
+        if nextRight != -1 and self._nextRight(outsideRight) == -1:
+            self.thread[outsideRight] = nextRight
+            mod[outsideRight] += sumInsideLeft - sumOutsideRight
+        if nextLeft != -1 and self._nextLeft(outsideLeft) == -1:
+            self.thread[outsideLeft] = nextLeft
+            mod[outsideLeft] += sumInsideRight - sumOutsideLeft
+            defaultAncestor = index
+        return defaultAncestor
+
+    def _executeShifts(self, index):
+        shift = 0.0
+        change = 0.0
+        for child in reversed(self.children[index]):
+            self.prelim[child] += shift
+            self.mod[child] += shift
+            change += self.change[child]
+            shift += self.shift[child] + change
+
+    def _placeChildren(self, index):
+        # the children of index are laid out already, place them next to each other
+        children = self.children[index]
+        defaultAncestor = children[0]
+        for number, child in enumerate(children):
+            if number == 0:
+                self.prelim[child] = self.midpoint[child]
+            else:
+                left = children[number - 1]
+                self.prelim[child] = self.prelim[left] + self._distance(left, child)
+                if self.children[child]:
+                    self.mod[child] = self.prelim[child] - self.midpoint[child]
+            defaultAncestor = self._apportion(child, defaultAncestor)
+        self._executeShifts(index)
+        self.midpoint[index] = (self.prelim[children[0]] + self.prelim[children[-1]]) / 2.0
+
+    def _firstWalk(self):
+        # children before their parents, the depth first order reversed
+        for index in range(len(self.nodes) - 1, -1, -1):
+            if self.children[index]:
+                self._placeChildren(index)
+        self.prelim[0] = self.midpoint[0]
+
+    def _secondWalk(self):
+        count = len(self.nodes)
+        self.x = [0.0] * count
+        self.y = [0.0] * count
+        modSums = [0.0] * count
+        for index in range(count):
+            parent = self.parent[index]
+            if parent != -1:
+                modSums[index] = modSums[parent] + self.mod[parent]
+                self.y[index] = self.y[parent] + self.height[parent] + self.spacingY
+            self.x[index] = self.prelim[index] + modSums[index]
+
+    def run(self):
+        """
+        :return: list of (node, x, y), the left top corners of the nodes with the root at (0, 0)
+        """
+        self._buildTree()
+        self._firstWalk()
+        self._secondWalk()
+
+        rootLeft = self.x[0] - self.width[0] / 2.0
+        return [
+            (node, self.x[index] - self.width[index] / 2.0 - rootLeft, self.y[index])
+            for index, node in enumerate(self.nodes)
+        ]
@@ -51,6 +51,8 @@ class _BaseNodeItem(QtWidgets.QGraphicsItem):
         self._initUI()
 
         self.nodeObject = nodeObjectClass(item=self, **kwargs)
+        # x and y are read from the position, a moved node is saved again
+        self.setFlag(QtWidgets.QGraphicsItem.ItemSendsGeometryChanges, True)
 
         self.fillColor = QtGui.QColor(*self.getParamColor('fillColor'))
         self.borderColor = QtGui.QColor(*self.getParamColor('borderColor'))
@@ -100,7 +102,12 @@ class _BaseNodeItem(QtWidgets.QGraphicsItem):
                     outputs.append([outputPort.name, node.name(), inputPort.name])
         return outputs
 
-    def toXmlElement(self):
+    def toXmlElement(self, specValues=None, sidecar=None, typed=False):
+        """
+        :param specValues: see Parameter.toXmlElement
+        :param sidecar: see Parameter.toXmlElement
+        :param typed: see Parameter.toXmlElement
+        """
         from usdNodeGraph.core.parse._xml import ET
 
         nodeElement = ET.Element('n')
@@ -115,7 +122,7 @@ class _BaseNodeItem(QtWidgets.QGraphicsItem):
                 if not (override or custom) and paramName not in ['x', 'y']:
                     continue
 
-                paramElement = param.toXmlElement()
+                paramElement = param.toXmlElement(specValues=specValues, sidecar=sidecar, typed=typed)
                 nodeElement.append(paramElement)
 
         inputs = self._getInputsList()
@@ -139,6 +146,8 @@ class _BaseNodeItem(QtWidgets.QGraphicsItem):
             metadataElement = ET.Element('m')
             metadataElement.set('k', key)
             metadataElement.set('v', value)
+            if self.nodeObject.getMetadataType(key) is not None:
+                metadataElement.set('t', self.nodeObject.getMetadataType(key))
             nodeElement.append(metadataElement)
 
         return nodeElement
@@ -226,7 +235,8 @@ class _BaseNodeItem(QtWidgets.QGraphicsItem):
             self.panel.updateUI()
 
     def _portConnectionChanged(self, port):
-        pass
+        self.nodeObject.setDirty()
+        self.nodeObject.setUnsaved()
 
     def connectSource(self, node, inputName='input', outputName='output'):
         """
@@ -348,6 +358,11 @@ class _BaseNodeItem(QtWidgets.QGraphicsItem):
 
         painter.drawRoundedRect(self.x, self.y, self.w, self.h, self.roundness, self.roundness)
 
+    def itemChange(self, change, value):
+        if change == QtWidgets.QGraphicsItem.ItemPositionHasChanged:
+            self.nodeObject.setUnsaved()
+        return super(_BaseNodeItem, self).itemChange(change, value)
+
     def mouseMoveEvent(self, event):
         self.scene().updateSelectedNodesPipe()
         super(_BaseNodeItem, self).mouseMoveEvent(event)
@@ -458,6 +473,14 @@ class NodeItem(_BaseNodeItem):
         self._updateNameText()
         self._updateLabelText()
 
+    def _portConnectionChanged(self, port):
+        # keep the connections of the node object synced with the ports
+        self.nodeObject._setConnections(
+            [n.nodeObject for n in self.getSources()],
+            [n.nodeObject for n in self.getDestinations()]
+        )
+        super(NodeItem, self)._portConnectionChanged(port)
+
     def getSources(self):
         ports = []
         ports.extend(self.inputPort.getConnections())
@@ -502,7 +525,7 @@ class NodeItem(_BaseNodeItem):
         return '{}/{}'.format(upPrimPath, primName)
 
     def afterAddToScene(self):
-        pass
+        self.nodeObject.afterAddToGraph()
 
     def _findPipeToConnect(self):
         findPipes = [
@@ -150,9 +150,6 @@ class MaterialNodeItem(_UsdShadeNodeItem):
 class ShaderNodeItem(_UsdShadeNodeItem):
     nodeItemType = 'ShaderNodeItem'
 
-    def afterAddToScene(self):
-        self.nodeObject.resetParameters()
-
 
 NodeItem.registerNodeItem(MaterialNodeItem)
 NodeItem.registerNodeItem(ShaderNodeItem)
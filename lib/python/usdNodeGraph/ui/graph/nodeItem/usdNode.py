@@ -2,19 +2,26 @@
 
 from usdNodeGraph.module.sqt import QtWidgets
 from .nodeItem import NodeItem
+from usdNodeGraph.ui.graph.other.tag import PixmapTag
 
 
 class UsdNodeItem(NodeItem):
     nodeItemType = 'UsdNodeItem'
 
+    def __init__(self, *args, **kwargs):
+        super(UsdNodeItem, self).__init__(*args, **kwargs)
+
+        if self.nodeObject.typeTagVisible:
+            self.addTag(self.nodeType, PixmapTag('{}.png'.format(self.nodeType)), position=0.25)
+
     def getToolTip(self):
         tooltip = super(UsdNodeItem, self).getToolTip()
         tooltip += '\n'
-        tooltip += '\n'.join(self.nodeObject.getPrimPath())
+        tooltip += '\n'.join([path.pathString for path in self.nodeObject.getPrimPath()])
         return tooltip
 
-    def execute(self, stage, prim):
-        return self.nodeObject.execute(stage, prim)
+    def execute(self, stage, prim, logError=None):
+        return self.nodeObject.execute(stage, prim, logError=logError)
 
     def getPrimPath(self):
         return self.nodeObject.getPrimPath()
@@ -27,10 +34,34 @@ class UsdNodeItem(NodeItem):
         return menus
 
     def _copyPathActionTriggered(self):
-        path = ' + '.join(self.nodeObject.getPrimPath())
+        path = ' + '.join([path.pathString for path in self.nodeObject.getPrimPath()])
         cb = QtWidgets.QApplication.clipboard()
         cb.setText(path)
 
 
+class PrimCollapsedNodeItem(UsdNodeItem):
+    nodeItemType = 'PrimCollapsedNodeItem'
+
+    def getToolTip(self):
+        tooltip = super(PrimCollapsedNodeItem, self).getToolTip()
+        tooltip += '\n(collapsed, double click to expand)'
+        return tooltip
+
+    def getContextMenus(self):
+        menus = super(PrimCollapsedNodeItem, self).getContextMenus()
+        menus.extend([
+            ['expand_prim', 'Expand', None, self._expandActionTriggered],
+        ])
+        return menus
+
+    def mouseDoubleClickEvent(self, event):
+        event.accept()
+        self.scene().expandCollapsedNode(self)
+
+    def _expandActionTriggered(self):
+        self.scene().expandCollapsedNode(self)
+
+
 NodeItem.registerNodeItem(UsdNodeItem)
+NodeItem.registerNodeItem(PrimCollapsedNodeItem)
 
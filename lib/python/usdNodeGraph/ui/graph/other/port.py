@@ -122,12 +122,19 @@ class Port(QtWidgets.QGraphicsEllipseItem):
     def addPipe(self, pipe, emitSignal=True):
         self.pipes.append(pipe)
         if emitSignal:
-            self.portObj._connectChanged()
+            self._connectChanged()
 
     def removePipe(self, pipe):
         if pipe in self.pipes:
             self.pipes.remove(pipe)
-            self.portObj._connectChanged()
+            self._connectChanged()
+
+    def _connectChanged(self):
+        # a scene creating nodes in bulk emits it once per port at the end
+        scene = self.scene()
+        if scene is not None and scene.deferConnectChanged(self):
+            return
+        self.portObj._connectChanged()
 
     def _checkConnectionNumber(self):
         if self.maxConnections is None:
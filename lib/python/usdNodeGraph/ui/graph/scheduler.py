@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import traceback
+from pxr import Sdf
+from usdNodeGraph.module.sqt import *
+from usdNodeGraph.core.graph import Graph
+from usdNodeGraph.core.graph.plan import CookCancelled
+from usdNodeGraph.core.state import GraphState
+from usdNodeGraph.utils.log import get_logger
+
+logger = get_logger('usdNodeGraph.scheduler')
+
+
+# ms to wait for more changes before cooking
+LIVE_UPDATE_DELAY = 100
+
+
+class LiveUpdateGraph(object):
+    """
+    copy of the scene graph which the worker cooks, each job updates only the nodes changed since the job before.
+    it is cooked incrementally like the scene graph, against a private copy of the layer.
+    """
+    def __init__(self, layer):
+        # the collapsed prims are read from here while the layer is edited on the gui thread
+        self.layer = Sdf.Layer.CreateAnonymous()
+        self.layer.TransferContent(layer)
+        self.graph = Graph(layer=self.layer)
+
+        # scene node: node of the graph, only used by the worker
+        self.nodes = {}
+        # change count of the scene graph and its nodes at the last snapshot, only used by the gui thread
+        self.changeCount = None
+        self.sceneNodes = {}
+        # cooked by the dropped jobs and not applied to the layer, None if the whole layer is behind
+        self.missedPaths = []
+        self.missedErrors = []
+
+    def takeSnapshot(self, sceneGraph, job):
+        """
+        write the scene nodes changed since the last snapshot to job, on the gui thread
+        """
+        if self.changeCount is None:
+            changedNodes = sceneGraph.allNodes()
+        else:
+            changedNodes = sceneGraph.getNodesChangedSince(self.changeCount)
+        self.changeCount = sceneGraph.getChangeCount()
+
+        for node in list(self.sceneNodes):
+            if node.graph is not sceneGraph:
+                self.sceneNodes.pop(node)
+                job.removedNodes.append(node)
+        for node in changedNodes:
+            self.sceneNodes[node] = None
+            job.elements.append((node, node.item.toXmlElement(specValues=job.specValues, typed=True)))
+            for other in [node] + node.getSources() + node.getDestinations():
+                job.connections[other] = (other.getSources(), other.getDestinations())
+
+    def update(self, job):
+        """
+        replace the changed nodes, on the worker
+        """
+        graph = self.graph
+        with graph.deferPrimPaths():
+            cookedPaths = {}
+            for sceneNode in job.removedNodes:
+                node = self.nodes.pop(sceneNode, None)
+                if node is not None:
+                    graph.removeNode(node)
+            # all go before the new ones take their names
+            for sceneNode, _ in job.elements:
+                node = self.nodes.pop(sceneNode, None)
+                if node is not None:
+                    cookedPaths[sceneNode] = graph.getCookedPaths(node)
+                    graph.removeNode(node)
+
+            for sceneNode, element in job.elements:
+                newNodes = []
+                graph.createNodeFromXml(element, newNodes, {}, specValues=job.specValues)
+                if len(newNodes) > 0:
+                    self.nodes[sceneNode] = newNodes[0]
+                    graph.inheritCookedPaths(newNodes[0], cookedPaths.get(sceneNode))
+
+            # in the order of the scene, it decides the order of the prims
+            for sceneNode, (sources, destinations) in job.connections.items():
+                node = self.nodes.get(sceneNode)
+                if node is not None:
+                    node._setConnections(
+                        [self.nodes[n] for n in sources if n in self.nodes],
+                        [self.nodes[n] for n in destinations if n in self.nodes]
+                    )
+
+    def addMissed(self, job):
+        if job.changedPaths is None or self.missedPaths is None:
+            self.missedPaths = None
+        else:
+            self.missedPaths.extend(job.changedPaths)
+        self.missedErrors.extend(job.errors)
+
+
+class LiveUpdateJob(object):
+    def __init__(self, generation, layer, liveGraph):
+        self.generation = generation
+        self.layer = layer
+        self.liveGraph = liveGraph
+        self.cancelEvent = threading.Event()
+
+        # see LiveUpdateGraph.takeSnapshot, the big arrays of the layer go to the worker by reference
+        self.elements = []
+        self.connections = {}
+        self.removedNodes = []
+        self.specValues = {}
+
+        self.changedPaths = None
+        self.errors = []
+        self.cooked = False
+        self.cancelled = False
+        self.failed = False
+
+
+class LiveUpdateScheduler(QtCore.QObject):
+    """
+    cook live updates of a scene off the gui thread.
+    changes within the delay are cooked once, a newer change cancels the running cook,
+    and only the result of the latest change is applied to the layer.
+    """
+    cookFinished = QtCore.Signal(object)
+
+    def __init__(self, scene, delay=LIVE_UPDATE_DELAY):
+        super(LiveUpdateScheduler, self).__init__(scene)
+
+        self.scene = scene
+
+        self._generation = 0
+        self._runningJob = None
+        self._pending = False
+        self._liveGraph = None
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay)
+        self._timer.timeout.connect(self._startCook)
+
+        self.cookFinished.connect(self._applyJob)
+
+    def isBusy(self):
+        return self._timer.isActive() or self._runningJob is not None
+
+    def schedule(self):
+        """
+        a change needs a live update, restarts the delay
+        """
+        self._generation += 1
+        if self._runningJob is not None:
+            self._runningJob.cancelEvent.set()
+        self._timer.start()
+
+    def cancel(self):
+        """
+        drop the waiting and running cooks, their results are not applied.
+        the layer is changed or edited by others, the next cook starts over from the whole scene
+        """
+        self._generation += 1
+        self._pending = False
+        self._timer.stop()
+        self._liveGraph = None
+        if self._runningJob is not None:
+            self._runningJob.cancelEvent.set()
+
+    def _startCook(self):
+        if not GraphState.isLiveUpdate() or self.scene.layer is None:
+            return
+        if self._runningJob is not None:
+            # start when the cancelled cook returns
+            self._pending = True
+            return
+
+        if self._liveGraph is None:
+            self._liveGraph = LiveUpdateGraph(self.scene.layer)
+        job = LiveUpdateJob(self._generation, self.scene.layer, self._liveGraph)
+        self._liveGraph.takeSnapshot(self.scene.graph, job)
+        self._runningJob = job
+        thread = threading.Thread(target=self._cook, args=(job, ))
+        thread.daemon = True
+        thread.start()
+
+    def _cook(self, job):
+        liveGraph = job.liveGraph
+        graph = liveGraph.graph
+        try:
+            liveGraph.update(job)
+            graph.cancelEvent = job.cancelEvent
+            job.changedPaths = graph.cookChanges(logError=job.errors.append)
+            # the private layer follows the cooks, like the layer follows the applied ones
+            graph.applyCookedChanges(liveGraph.layer, job.changedPaths)
+            graph.updateCollapsedSourcePaths()
+            job.cooked = True
+        except CookCancelled:
+            job.cancelled = True
+            graph.setCookDirty()
+        except Exception:
+            job.errors.append('Live Update Error:\n{}'.format(traceback.format_exc()))
+            job.failed = True
+        finally:
+            graph.cancelEvent = None
+        self.cookFinished.emit(job)
+
+    def _applyJob(self, job):
+        self._runningJob = None
+        liveGraph = job.liveGraph
+
+        if job.failed:
+            for message in job.errors:
+                GraphState.executeFunction('logError', message)
+            if liveGraph is self._liveGraph:
+                self._liveGraph = None
+        elif not job.cooked or liveGraph is not self._liveGraph:
+            logger.debug('live update {} cancelled'.format(job.generation))
+        elif job.generation != self._generation or not GraphState.isLiveUpdate():
+            logger.debug('live update {} dropped, latest is {}'.format(job.generation, self._generation))
+            liveGraph.addMissed(job)
+        else:
+            liveGraph.addMissed(job)
+            for message in liveGraph.missedErrors:
+                GraphState.executeFunction('logError', message)
+            liveGraph.graph.applyCookedChanges(job.layer, liveGraph.missedPaths)
+            liveGraph.missedPaths = []
+            liveGraph.missedErrors = []
+            self.scene.graph.updateCollapsedSourcePaths()
+            GraphState.executeCallbacks(
+                'layerChangesApplied',
+                layer=job.layer.realPath
+            )
+
+        if self._pending:
+            self._pending = False
+            self._startCook()
@@ -2,21 +2,28 @@
 
 import os
 import re
+import gc
 import json
 import time
-from pxr import Usd, Sdf, Ar
+from pxr import Sdf, Ar
 from usdNodeGraph.module.sqt import *
 from usdNodeGraph.utils.const import VIEWPORT_FULL_UPDATE
-from usdNodeGraph.core.node import (
-    Node, TransformNode, AttributeSetNode, MetadataNode,
-    RelationshipSetNode, MaterialAssignNode, LIST_EDITOR_PROXY_OPS
-)
+from usdNodeGraph.core.node import Node
 from .nodeItem import NodeItem
 from .other.pipe import Pipe
 from .other.port import Port
+from .scheduler import LiveUpdateScheduler
+from .importer import LayerImporter
+from .autosave import AutosaveService
+from .layout import TreeLayout
+from .const import REINDEX_RATIO
 from usdNodeGraph.utils.log import get_logger, log_cost_time
 from usdNodeGraph.core.state import GraphState
-from usdNodeGraph.core.parse._xml import ET, convertToString
+from usdNodeGraph.core.graph import Graph
+from usdNodeGraph.core.graph.describe import LayerDescriber, UP_NODE_INDEX
+from usdNodeGraph.core.parse._xml import ET, XmlWriter, getConnections, iterXmlFile
+from usdNodeGraph.core.parse._sidecar import ValueSidecar
+from usdNodeGraph.core.parse._journal import UngJournal, JOURNAL_TOKEN_ATTRIBUTE
 from usdNodeGraph.utils.res import resource
 from usdNodeGraph.ui.utils.menu import WithMenuObject
 from usdNodeGraph.ui.utils.drop import DropWidget
@@ -25,9 +32,6 @@ from usdNodeGraph.ui.utils.drop import DropWidget
 logger = get_logger('usdNodeGraph.view')
 
 
-NODE_NAME_PATTERN = re.compile('(?P<suffix>[^\d]*)(?P<index>\d+)')
-VARIANT_PRIM_PATH_PATTERN = re.compile('.*{(?P<variantSet>.+)=(?P<variant>.+)}$')
-
 VIEW_FILL_COLOR = QtGui.QColor(38, 38, 38)
 VIEW_LINE_COLOR = QtGui.QColor(55, 55, 55)
 DISABLE_LINE_COLOR = QtGui.QColor(95, 75, 75)
@@ -259,6 +263,8 @@ class GraphicsView(QtWidgets.QGraphicsView, DropWidget, WithMenuObject):
             for item in self.scene().items():
                 if isinstance(item, NodeItem):
                     items.append(item)
+        if len(items) == 0:
+            return
 
         max_x = items[0].pos().x()
         min_x = items[0].pos().x()
@@ -441,7 +447,7 @@ class GraphicsView(QtWidgets.QGraphicsView, DropWidget, WithMenuObject):
         if format == 'usd':
             xmlString = self.scene().getAllNodesAsXml()
             self._floatWidget.switchButton.writeTempNodes(xmlString)
-            self.scene().resetScene(forceFromLayer=True)
+            self.scene().resetScene(forceFromLayer=True, background=True)
         else:
             xmlString = self._floatWidget.switchButton.getTempNodes()
             self.scene().resetScene(forceFromLayer=False, xmlString=xmlString)
@@ -541,13 +547,13 @@ class GraphicsSceneWidget(QtWidgets.QWidget):
         layer = Sdf.Layer.FindOrOpen(absLayerPath)
         self.enterLayerRequired.emit(self.stage, layer, layerPath, force)
 
-    def setStage(self, stage, layer=None, assetPath=None, reset=True):
+    def setStage(self, stage, layer=None, assetPath=None, reset=True, importMask=None):
         self.stage = stage
         if layer is None:
             layer = stage.GetRootLayer()
         self.layer = layer
         self.assetPath = assetPath
-        self.scene.setStage(self.stage, self.layer, assetPath, reset=reset)
+        self.scene.setStage(self.stage, self.layer, assetPath, reset=reset, importMask=importMask)
 
     def exportToString(self):
         return self.scene.exportToString()
@@ -570,6 +576,7 @@ class GraphicsScene(QtWidgets.QGraphicsScene):
     enterLayerRequired = QtCore.Signal(str, bool)
     nodeParameterChanged = QtCore.Signal(object)
     nodeDeleted = QtCore.Signal(object)
+    nodesAdded = QtCore.Signal(object)
 
     def __init__(self, view=None, **kwargs):
         super(GraphicsScene, self).__init__(**kwargs)
@@ -580,200 +587,178 @@ class GraphicsScene(QtWidgets.QGraphicsScene):
         self.layer = None
         self.assetPath = None
         self.editable = True
-
-        self._allNodes = {}
-        self._nodesSuffix = {}
-        self._primNodes = {}
+        # PrimImportMask of the prims opened from the layer, None for all
+        self.importMask = None
+        # UngJournal of the .ung the scene was loaded from or saved to
+        self.ungJournal = None
+
+        self.graph = Graph()
+        self.liveUpdateScheduler = LiveUpdateScheduler(self)
+        self._bulkCreateDepth = 0
+        self._bulkCreate = None
+        self.layerImporter = LayerImporter(self)
+        self.layerImporter.importFinished.connect(self._afterImportLayer)
+        self.autosave = AutosaveService(self)
 
         self.setSceneRect(QtCore.QRectF(-25000 / 2, -25000 / 2, 25000, 25000))
 
-    def _addLayerNodes(self, rootLayer):
-        for index, layerPath in enumerate(rootLayer.subLayerPaths):
-            layerOffset = rootLayer.subLayerOffsets[index]
-            layerNode = self.createNode('Layer', layerPath=layerPath, layerOffset=layerOffset)
-            layerNode.setX(-250)
-            layerNode.setY(index * 150)
-
     def _addChildNode(self, node, upNode, index=0):
         if upNode is not None:
             node.setX(upNode.pos().x() + index * (upNode.w + 50))
             node.setY(upNode.pos().y() + upNode.h + 100)
             node.connectToNode(upNode)
 
-    def _getPrim(self, primSpec, upNode=None):
-        skipAttribute = False
-
-        primPath = primSpec.path.pathString
-        match = re.match(VARIANT_PRIM_PATH_PATTERN, primPath)
-        if match:
-            variantSwitchNode = self.createNode(
-                'VariantSwitch', primPath=primPath,
-                variantSetName=match.group('variantSet'),
-                variantSelected=match.group('variant')
-            )
-            self._addChildNode(variantSwitchNode, upNode)
-            upNode = variantSwitchNode
-        else:
-            # prim define
-            specifier = primSpec.specifier
-            if specifier == Sdf.SpecifierDef:
-                typeName = primSpec.typeName
-                if typeName in ['Material', 'Shader']:
-                    primNode = self.createNode(
-                        typeName, name=primSpec.name, primPath=primPath,
-                        primSpec=primSpec
-                    )
-                    skipAttribute = True
-                elif typeName in Node.getAllNodeClassNames():
-                    primNode = self.createNode(typeName, primPath=primPath, primSpec=primSpec)
+    def createNodesFromDescription(self, description, createdNodes, stop=None, upNode=None):
+        """
+        create the nodes of a LayerDescription in order, so it can be created over several calls
+        :param createdNodes: the nodes created before by their index, the new nodes are appended
+        :param stop: index of the node to stop before, None for all
+        :param upNode: the node UP_NODE_INDEX connects to
+        """
+        if stop is None:
+            stop = description.getNodeCount()
+        with self.bulkCreate():
+            for nodeDescription in description.nodes[len(createdNodes):stop]:
+                source = nodeDescription['source']
+                if source == UP_NODE_INDEX:
+                    sourceNode = upNode
+                elif source is not None:
+                    sourceNode = createdNodes[source]
                 else:
-                    primNode = self.createNode('PrimDefine', primPath=primPath, primSpec=primSpec)
-            elif specifier == Sdf.SpecifierOver:
-                primNode = self.createNode('PrimOverride', primPath=primPath, primSpec=primSpec)
-            else:
-                return upNode
-
-            self._addChildNode(primNode, upNode)
-            self._addNodeToPrimPath(primNode, primPath)
-            upNode = primNode
-
-        # metadata
-        _tmpMetadataNodes = {}
-        _keys = [key for key in primSpec.ListInfoKeys() if key in MetadataNode.getIgnorePrimInfoKeys()]
-        for key in _keys:
-            nodeClass = MetadataNode.getMetadataNodeClass(key)
-            metadataNode = _tmpMetadataNodes.get(nodeClass.nodeType)
-            if metadataNode is None:
-                metadataNode = self.createNode(nodeClass.nodeType)
-                self._addChildNode(metadataNode, upNode)
-                _tmpMetadataNodes.update({nodeClass.nodeType: metadataNode})
-            metadataNode.parameter(key).setValueQuietly(primSpec.GetInfo(key))
-            upNode = metadataNode
-
-        # reference
-        referenceList = primSpec.referenceList
-        for op in LIST_EDITOR_PROXY_OPS:
-            items = getattr(referenceList, '{}Items'.format(op))
-            for reference in items:
-                referenceNode = self.createNode('Reference', primPath=primPath, reference=reference, op=op)
-                self._addChildNode(referenceNode, upNode)
-
-                upNode = referenceNode
-
-        # payload
-        payloadList = primSpec.payloadList
-        for op in LIST_EDITOR_PROXY_OPS:
-            items = getattr(payloadList, '{}Items'.format(op))
-            for payload in items:
-                payloadNode = self.createNode('Payload', primPath=primPath, reference=payload, op=op)
-                self._addChildNode(payloadNode, upNode)
-
-                upNode = payloadNode
-
-        # attribute
-        if not skipAttribute:
-            upNode = self._getPrimAttributes(primSpec, upNode)
-
-        # relationship
-        upNode = self._getPrimRelationships(primSpec, upNode)
-
-        # variant
-        selectedVariantDict = {}
-        variantSetNameList = primSpec.variantSetNameList
-        variantSetNameItems = variantSetNameList.GetAddedOrExplicitItems()
-        variantSelections = primSpec.variantSelections
-        if len(variantSetNameItems) > 0:
-            variantSets = primSpec.variantSets
-            for variantSetName, variantSetSpec in variantSets.items():
-                variantSetNode = self.createNode(
-                    'VariantSet',
-                    primPath=primPath,
-                    variantSetName=variantSetSpec.name,
-                    options=[v.name for v in variantSetSpec.variantList]
+                    sourceNode = None
+
+                pos = nodeDescription['pos']
+                if pos is None and sourceNode is not None:
+                    pos = [sourceNode.pos().x(), sourceNode.pos().y() + sourceNode.h + 100]
+                node = self.createNode(
+                    nodeDescription['nodeClass'], name=nodeDescription['name'], primPath=nodeDescription['primPath'],
+                    pos=pos, **nodeDescription['kwargs']
                 )
-                self._addChildNode(variantSetNode, upNode)
-
-                variantSelected = variantSelections.get(variantSetName)
-                variantSelectNode = self.createNode(
-                    'VariantSelect', primPath=primPath,
-                    variantSetName=variantSetName,
-                    variantSelected=variantSelected,
-                    options=[v.name for v in variantSetSpec.variantList]
-                )
-                self._addChildNode(variantSelectNode, variantSetNode)
-                selectedVariantDict.update({variantSetName: variantSelected})
-
-                variantList = variantSetSpec.variantList
-                for i, variantSpec in enumerate(variantList):
-                    variantPrim = variantSpec.primSpec
-                    self._getIntoPrim(variantPrim, upNode=variantSelectNode)
-
-        for variantSetName, variantSelected in variantSelections.items():
-            if not variantSetName in selectedVariantDict:
-
-                variantNameList = None
-                # try to get variant list
-                stagePrim = self.stage.GetPrimAtPath(primPath)
-                if stagePrim.IsValid():
-                    variantSet = stagePrim.GetVariantSet(variantSetName)
-                    variantNameList = variantSet.GetVariantNames()
-
-                variantSelectNode = self.createNode(
-                    'VariantSelect', primPath=primPath,
-                    variantSetName=variantSetName,
-                    variantSelected=variantSelected,
-                    options=variantNameList
-                )
-                self._addChildNode(variantSelectNode, upNode)
-                upNode = variantSelectNode
-
-        return upNode
-
-    def _getIntoPrim(self, primSpec, upNode):
-        primPath = primSpec.path.pathString
-        node = upNode
-        if primPath != '/':
-            node = self._getPrim(primSpec, upNode)
-        for childName, child in primSpec.nameChildren.items():
-            self._getIntoPrim(child, node)
-
-    def _getPrimAttributes(self, primSpec, upNode):
-        attrs = list(primSpec.attributes.keys())
-        if len(attrs) == 0:
-            return upNode
-
-        addTransform = TransformNode._checkIsNodeNeeded(attrs)
-        if addTransform:
-            transformNode = self.createNode('Transform', primPath=primSpec.path.pathString, primSpec=primSpec)
-            self._addChildNode(transformNode, upNode)
-            upNode = transformNode
-
-        addAttributeSet = AttributeSetNode._checkIsNodeNeeded(attrs)
-        if addAttributeSet:
-            attributeSetNode = self.createNode('AttributeSet', primPath=primSpec.path.pathString, primSpec=primSpec)
-            self._addChildNode(attributeSetNode, upNode)
-            upNode = attributeSetNode
-
-        return upNode
-
-    def _getPrimRelationships(self, primSpec, upNode):
-        attrs = list(primSpec.relationships.keys())
-        if len(attrs) == 0:
-            return upNode
-
-        addMaterialAssign = MaterialAssignNode._checkIsNodeNeeded(attrs)
-        if addMaterialAssign:
-            materialAssignNode = self.createNode('MaterialAssign', primPath=primSpec.path.pathString, primSpec=primSpec)
-            self._addChildNode(materialAssignNode, upNode)
-            upNode = materialAssignNode
-
-        addRelationshipSet = RelationshipSetNode._checkIsNodeNeeded(attrs)
-        if addRelationshipSet:
-            relationshipSetNode = self.createNode('RelationshipSet', primPath=primSpec.path.pathString, primSpec=primSpec)
-            self._addChildNode(relationshipSetNode, upNode)
-            upNode = relationshipSetNode
-
-        return upNode
+                createdNodes.append(node)
+                if node is None:
+                    continue
+                for key, value in nodeDescription['params'].items():
+                    node.parameter(key).setValueQuietly(value)
+
+                if sourceNode is not None:
+                    node.inputPort.connectTo(sourceNode.outputPort)
+
+    def expandCollapsedNode(self, nodeItem, layout=True):
+        """
+        replace a collapsed prim with the nodes of its prim spec, its children may be collapsed again
+        :param nodeItem: PrimCollapsed or PrimPassThrough node, the opened children of a PrimPassThrough are kept
+        :return: the node of the prim, None if the prim is not in the layer
+        """
+        nodeObject = nodeItem.nodeObject
+        primSpec = nodeObject.getSourcePrimSpec()
+        if primSpec is None:
+            logger.warning('collapsed prim not found in layer: {}'.format(nodeObject.parameter('sourcePath').getValue()))
+            return
+        openedChildren = None
+        if nodeObject.Class() == 'PrimPassThrough':
+            openedChildren = nodeObject.getOpenedChildren()
+
+        sources = nodeItem.getSources()
+        destinations = nodeItem.getDestinations()
+        upNode = sources[0] if len(sources) > 0 else None
+        # the order of the children is the order of the prims
+        childIndex = upNode.getDestinations().index(nodeItem) if upNode is not None else 0
+        primName = nodeObject.parameter('primName').getValue()
+        depth = primSpec.path.StripAllVariantSelections().pathElementCount
+
+        with GraphState.stopLiveUpdate():
+            self.deleteNode(nodeItem)
+
+            describer = LayerDescriber(self.layer, stage=self.stage)
+            description = describer.describePrim(primSpec, depth=depth, expand=True, skipChildren=openedChildren)
+            newNodes = []
+            self.createNodesFromDescription(description, newNodes, upNode=upNode)
+            primNodes = [
+                newNodes[index] for index, nodeDescription in enumerate(description.nodes)
+                if nodeDescription['source'] == UP_NODE_INDEX
+            ]
+            if len(primNodes) == 0:
+                return
+
+            primNode = primNodes[0]
+            lastNode = newNodes[description.lastIndex]
+            if upNode is not None:
+                self._moveDestination(upNode, primNode, childIndex)
+            if primName != primSpec.name and primNode.hasParameter('primName'):
+                # keep the name the collapsed prim was renamed to
+                primNode.parameter('primName').setValue(primName)
+            for destination in destinations:
+                destination.connectToNode(lastNode)
+            if openedChildren is not None:
+                self._sortChildNodes(lastNode, primSpec)
+
+            for node in newNodes:
+                if node is not None:
+                    self._connectShadeNodeInputs(node)
+
+        if layout:
+            self.layoutNodes()
+        return primNode
+
+    def openPassThroughChild(self, nodeItem, childName, layout=True):
+        """
+        make the nodes of a child prim a PrimPassThrough node copies, the child may be collapsed
+        :param childName: name of the child in the layer
+        :return: the node of the child, None if it is not in the layer or opened already
+        """
+        nodeObject = nodeItem.nodeObject
+        primSpec = nodeObject.getSourcePrimSpec()
+        openedChildren = nodeObject.getOpenedChildren()
+        if primSpec is None or childName in openedChildren:
+            return
+        childSpec = primSpec.nameChildren.get(childName)
+        if childSpec is None:
+            return
+
+        depth = childSpec.path.StripAllVariantSelections().pathElementCount
+        childNames = [child.name for child in primSpec.nameChildren.values()]
+        with GraphState.stopLiveUpdate():
+            describer = LayerDescriber(self.layer, stage=self.stage)
+            description = describer.describePrim(childSpec, depth=depth, expand=False)
+            newNodes = []
+            self.createNodesFromDescription(description, newNodes, upNode=nodeItem)
+            for node in newNodes:
+                if node is not None:
+                    self._connectShadeNodeInputs(node)
+
+            openedChildren.append(childName)
+            openedChildren.sort(key=childNames.index)
+            nodeObject.parameter('openedChildren').setValue(openedChildren)
+            self._sortChildNodes(nodeItem, primSpec)
+
+        if layout:
+            self.layoutNodes()
+        primNodes = [
+            newNodes[index] for index, nodeDescription in enumerate(description.nodes)
+            if nodeDescription['source'] == UP_NODE_INDEX
+        ]
+        return primNodes[0] if len(primNodes) > 0 else None
+
+    def _sortChildNodes(self, node, primSpec):
+        # the child prim nodes follow the order of the children in the layer, others go last
+        childIndices = dict([(child.name, index) for index, child in enumerate(primSpec.nameChildren.values())])
+        destinationIndices = {}
+        for index, destination in enumerate(node.getDestinations()):
+            childIndex = len(childIndices)
+            if destination.nodeObject.NodeTypes().isSubType('Prim'):
+                childIndex = childIndices.get(destination.parameter('primName').getValue(), childIndex)
+            destinationIndices[destination.inputPort] = (childIndex, index)
+        outputPort = node.outputPort
+        outputPort.pipes.sort(key=lambda pipe: destinationIndices.get(pipe.target))
+        outputPort.portObj._connectChanged()
+
+    def _moveDestination(self, node, destination, index):
+        outputPort = node.outputPort
+        pipes = [pipe for pipe in outputPort.pipes if pipe.target is destination.inputPort]
+        for pipe in pipes:
+            outputPort.pipes.remove(pipe)
+            outputPort.pipes.insert(index, pipe)
+        outputPort.portObj._connectChanged()
 
     def _connectShadeNodeInputs(self, node):
         if not node.Class() in ['Shader', 'Material']:
@@ -782,9 +767,9 @@ class GraphicsScene(QtWidgets.QGraphicsScene):
             node.nodeObject.connectShader(param)
 
     def getPrimNode(self, primPath):
-        nodes = self._primNodes.get(primPath)
-        if nodes is not None:
-            return nodes[0]
+        nodes = self.graph.getNodesAtPath(primPath)
+        if len(nodes) > 0:
+            return nodes[0].item
 
     def getRootNode(self):
         nodes = self.getNodes(type='Root')
@@ -796,111 +781,73 @@ class GraphicsScene(QtWidgets.QGraphicsScene):
         for node in self.getNodes(type=['Shader', 'Material']):
             self._connectShadeNodeInputs(node)
 
-    def _layoutNode(self, node):
-        childrenCount = 0
-        for index, child in enumerate(node.getDestinations()):
-            child.setX(childrenCount * (node.w + 50) + node.pos().x())
-            currentChildCount = self._layoutNode(child)
-            if currentChildCount > 1:
-                childrenCount += currentChildCount
-            else:
-                childrenCount += 1
-        return childrenCount
-
-    def layoutNodes(self):
-        node = self.getRootNode()
-        self._layoutNode(node)
-        for node in self.allNodes():
-            node.updatePipe()
-
-    def _afterNodeNameChanged(self, node):
-        self._allNodes[node] = node.name()
+    def _getLayoutChildren(self, node):
+        return node.getDestinations()
 
-    def _getUniqueName(self, name):
-        # nodes = self.allNodes()
-        # names = [n.name() for n in nodes]
-        names = list(self._allNodes.values())
+    def _getLayoutSize(self, node):
+        return node.w, node.h
 
-        match = re.match(NODE_NAME_PATTERN, name)
-        if match:
-            suffix = match.group('suffix')
-            index = int(match.group('index'))
-        else:
-            suffix = name
-            index = 0
-
-        if name not in names:
-            return name, suffix, index
-
-        if suffix in self._nodesSuffix:
-            indexs = self._nodesSuffix.get(suffix)
-            indexs.sort(reverse=True)
-        else:
-            indexs = []
-
-        if len(indexs) > 0:
-            index = indexs[0]
-
-        while name in names:
-            index += 1
-            name = '{}{}'.format(suffix, index)
-
-        return name, suffix, index
-
-    def _executeLayerNodes(self, stage, nodes):
-        from functools import cmp_to_key
-        nodes.sort(key=cmp_to_key(self._node_cmp))
-        for node in nodes:
-            stage, _ = node.execute(stage, None)
-
-        return stage
-
-    def _node_cmp(self, n1, n2):
-        if n1.pos().y() > n2.pos().y():
-            return 1
-        if n1.pos().y() < n2.pos().y():
-            return -1
-        return 0
-
-    def _executeNode(self, node, stage, prim):
-        stage, prim = node.execute(stage, prim)
-        if node.Class() == 'VariantSwitch':
-            variantSet = node.nodeObject.getVariantSet(prim)
-            variantSelected = node.nodeObject.getVariantSelection()
-
-            currentSelected = variantSet.GetVariantSelection()
-
-            variantSet.SetVariantSelection(variantSelected)
-            with variantSet.GetVariantEditContext():
-                for child in node.getDestinations():
-                    stage = self._executeNode(child, stage, prim)
-
-            variantSet.SetVariantSelection(currentSelected)
-        else:
-            for child in node.getDestinations():
-                stage = self._executeNode(child, stage, prim)
-
-        return stage
-
-    def _executeAllToStage(self):
-        stage = Usd.Stage.CreateInMemory()
-        prim = None
-
-        layerNodes = self.getNodes(type='Layer')
-        stage = self._executeLayerNodes(stage, layerNodes)
-
-        node = self.getRootNode()
-        stage = self._executeNode(node, stage, prim)
-
-        return stage
+    def layoutNodes(self, node=None):
+        """
+        place the nodes as a tidy tree under the root node
+        :param node: only place the nodes under this node, it keeps its position
+        """
+        if node is None:
+            node = self.getRootNode()
+        if node is None:
+            return
+        positions = TreeLayout(node, self._getLayoutChildren, self._getLayoutSize).run()
+        x = node.pos().x()
+        y = node.pos().y()
+        self._moveNodes([(item, x + itemX, y + itemY) for item, itemX, itemY in positions])
 
-    def setStage(self, stage, layer=None, assetPath=None, reset=True):
+    def layoutSelection(self):
+        for node in self.getSelectedNodes():
+            self.layoutNodes(node)
+
+    def _moveNodes(self, positions):
+        """
+        :param positions: list of (node, x, y)
+        """
+        positions = [(node, x, y) for node, x, y in positions if node.pos().x() != x or node.pos().y() != y]
+        if len(positions) == 0:
+            return
+        # the index is built again once instead of updated for every move and pipe
+        indexMethod = self.itemIndexMethod()
+        reindex = len(positions) > len(self.graph.allNodes()) * REINDEX_RATIO
+        if reindex:
+            self.setItemIndexMethod(QtWidgets.QGraphicsScene.NoIndex)
+        try:
+            pipes = {}
+            for node, x, y in positions:
+                node.setPos(x, y)
+                for port in node.ports:
+                    for pipe in port.pipes:
+                        pipes[pipe] = None
+            for pipe in pipes.keys():
+                pipe.updatePath()
+        finally:
+            if reindex:
+                self.setItemIndexMethod(indexMethod)
+
+    def setStage(self, stage, layer=None, assetPath=None, reset=True, importMask=None):
+        """
+        :param importMask: PrimImportMask of the prims opened from the layer, None for all,
+        it is kept for the layer to reload with
+        """
         self.stage = stage
         if layer is None:
             layer = stage.GetRootLayer()
         self.layer = layer
         self.assetPath = assetPath
+        self.importMask = importMask
         self.editable = isEditable(self.layer.realPath)
+        self.graph.stage = stage
+        self.graph.layer = layer
+        self.graph.setCookDirty()
+        self.liveUpdateScheduler.cancel()
+        self.layerImporter.cancel()
+        self.autosave.start()
 
         if reset:
             ungFile = os.path.splitext(self.layer.realPath)[0] + '.ung'
@@ -909,23 +856,45 @@ class GraphicsScene(QtWidgets.QGraphicsScene):
             else:
                 self.loadSceneFromLayer()
 
-    def reloadLayer(self):
-        self.resetScene()
+    def reloadLayer(self, background=False):
+        self.resetScene(background=background)
 
     def clear(self):
-        for node in self.allNodes():
-            self.deleteNode(node)
+        # every node goes, so the connections are not synced pipe by pipe
+        with self.graph.deferPrimPaths():
+            for node in self.allNodes():
+                for port in node.ports:
+                    port.pipes = []
+                self.removeItem(node)
+                self.graph.removeNode(node.nodeObject)
+                self.nodeDeleted.emit(node)
         super(GraphicsScene, self).clear()
 
     def _loadSceneFromUng(self, ungFile):
         self.view._floatWidget.switchButton.setFormat('ung')
 
-        with open(ungFile, 'r') as f:
-            xmlString = f.read()
+        journal = UngJournal(ungFile)
+        rootAttrib, nodeElements, sidecar = journal.stream()
         with GraphState.stopLiveUpdate():
-            self.pasteNodesFromXml(xmlString, selected=False)
+            # not moved to the cursor like a paste, the journal saves the positions the .ung has
+            self.createNodesFromXml(nodeElements, sidecar=sidecar)
+        self.ungJournal = journal
+        self.graph.markSaved()
         # self.applyChanges()
 
+    def restoreRecovery(self, recoveryFile):
+        """
+        reset the scene to an autosave snapshot, its nodes are saved as changed
+        """
+        self._beforeResetScene()
+        self.view._floatWidget.switchButton.setFormat('ung')
+
+        rootAttrib, nodeElements = iterXmlFile(recoveryFile)
+        with GraphState.stopLiveUpdate():
+            self.createNodesFromXml(nodeElements, sidecar=ValueSidecar.openForXml(recoveryFile))
+
+        self._afterResetScene()
+
     def _loadSceneFromXml(self, xmlString):
         self.view._floatWidget.switchButton.setFormat('ung')
 
@@ -934,26 +903,40 @@ class GraphicsScene(QtWidgets.QGraphicsScene):
         # self.applyChanges()
 
     @log_cost_time
-    def resetScene(self, forceFromLayer=False, xmlString=''):
+    def resetScene(self, forceFromLayer=False, xmlString='', background=False):
+        """
+        :param background: import a layer on a worker thread with a progress dialog,
+        the scene is reset when the import finishes
+        """
         self._beforeResetScene()
 
         ungFile = os.path.splitext(self.layer.realPath)[0] + '.ung'
-        if forceFromLayer:
+        if forceFromLayer or (xmlString == '' and not os.path.exists(ungFile)):
+            if background:
+                self._loadSceneFromLayerInBackground()
+                return
             self._loadSceneFromLayer()
         elif xmlString != '':
             self._loadSceneFromXml(xmlString)
-        elif os.path.exists(ungFile):
-            self._loadSceneFromUng(ungFile)
         else:
-            self._loadSceneFromLayer()
+            self._loadSceneFromUng(ungFile)
 
         self._afterResetScene()
 
     def _beforeResetScene(self):
+        self.layerImporter.cancel()
         self.clear()
-        self._primNodes = {}
-        self._allNodes = {}
-        self._nodesSuffix = {}
+        self.graph.clear()
+        self.closeJournal()
+        self.autosave.reset()
+
+    def closeJournal(self):
+        """
+        wait for the journal of the scene to finish compacting, the scene doesn't use it after it
+        """
+        if self.ungJournal is not None:
+            self.ungJournal.waitForCompact()
+            self.ungJournal = None
 
     def _afterResetScene(self):
         self.view._resizeScene()
@@ -962,21 +945,118 @@ class GraphicsScene(QtWidgets.QGraphicsScene):
         logger.debug('scene nodeItem number: {}'.format(len(self.allNodes())))
 
     def _loadSceneFromLayer(self):
-        with GraphState.stopLiveUpdate():
-            self.view._floatWidget.switchButton.setFormat('usd')
-
-            primSpec = self.layer.GetPrimAtPath('/')
-
-            rootNode = self.createNode('Root')
-            self._addNodeToPrimPath(rootNode, '/')
-
-            self._addLayerNodes(self.layer)
-            self._getIntoPrim(primSpec, rootNode)
-
-            # we need to connect shader nodes after all nodes are created
-            self._connectShadeNodes()
+        self.view._floatWidget.switchButton.setFormat('usd')
+        self.layerImporter.importLayer()
+
+    def _loadSceneFromLayerInBackground(self):
+        self.view._floatWidget.switchButton.setFormat('usd')
+        self.layerImporter.start()
+
+    def _afterImportLayer(self, job):
+        if job.background:
+            self._afterResetScene()
+
+    class BulkCreate(object):
+        def __init__(self, scene):
+            self.scene = scene
+
+        def __enter__(self):
+            self.scene.beginBulkCreate()
+
+        def __exit__(self, *args):
+            self.scene.endBulkCreate()
+
+    def bulkCreate(self):
+        """
+        create many nodes at once:
+        the ports emit connectChanged once at the end, not per pipe, so a prim with many children is synced once,
+        the scene index is built again at the end when the new nodes are a large part of the scene,
+        the GraphState callbacks are executed at the end and nodesAdded is emitted once with all the new nodes,
+        the garbage collector is paused, it would walk all the objects of the scene many times.
+        nodes without a position go to the center of the view when the first of them is created.
+        """
+        return self.BulkCreate(self)
+
+    def isBulkCreating(self):
+        return self._bulkCreateDepth > 0
+
+    def beginBulkCreate(self):
+        """
+        start bulkCreate for a creation that doesn't fit in a context, each call needs an endBulkCreate
+        """
+        self._bulkCreateDepth += 1
+        if self._bulkCreateDepth > 1:
+            return
+        self._bulkCreate = {
+            'nodes': [],
+            'ports': {},
+            'nodeCount': len(self.graph.allNodes()),
+            'indexMethod': None,
+            'center': None,
+            'contexts': [GraphState.deferCallbacks(), self.graph.deferPrimPaths()],
+            'gcEnabled': gc.isenabled(),
+        }
+        gc.disable()
+        for context in self._bulkCreate['contexts']:
+            context.__enter__()
 
-            self.layoutNodes()
+    def endBulkCreate(self):
+        self._bulkCreateDepth -= 1
+        if self._bulkCreateDepth > 0:
+            return
+        bulkCreate = self._bulkCreate
+        self._bulkCreate = None
+        contexts = list(reversed(bulkCreate['contexts']))
+        try:
+            # ports of the nodes deleted meanwhile are left out
+            for port in bulkCreate['ports'].keys():
+                if port.scene() is self:
+                    port.portObj._connectChanged()
+            if bulkCreate['indexMethod'] is not None:
+                self.setItemIndexMethod(bulkCreate['indexMethod'])
+            # the prim paths of the new nodes are up to date for nodesAdded
+            contexts.pop(0).__exit__(None, None, None)
+            nodes = [node for node in bulkCreate['nodes'] if node.scene() is self]
+            if len(nodes) > 0:
+                self._nodesAdded(nodes)
+        finally:
+            for context in contexts:
+                context.__exit__(None, None, None)
+            if bulkCreate['gcEnabled']:
+                gc.enable()
+
+    def deferConnectChanged(self, port):
+        """
+        :return: True if the connectChanged of the port is emitted at the end of bulkCreate
+        """
+        if self._bulkCreate is None:
+            return False
+        self._bulkCreate['ports'][port] = None
+        return True
+
+    def _addBulkNode(self, nodeItem):
+        bulkCreate = self._bulkCreate
+        bulkCreate['nodes'].append(nodeItem)
+        if bulkCreate['indexMethod'] is None \
+                and len(bulkCreate['nodes']) > bulkCreate['nodeCount'] * REINDEX_RATIO:
+            bulkCreate['indexMethod'] = self.itemIndexMethod()
+            self.setItemIndexMethod(QtWidgets.QGraphicsScene.NoIndex)
+
+    def _getNewNodePos(self):
+        if self._bulkCreate is None:
+            center = self.view.getCenterPos()
+            return [center.x(), center.y()]
+        if self._bulkCreate['center'] is None:
+            center = self.view.getCenterPos()
+            self._bulkCreate['center'] = [center.x(), center.y()]
+        return self._bulkCreate['center']
+
+    def _nodesAdded(self, nodes):
+        self.nodesAdded.emit(nodes)
+        GraphState.executeCallbacks(
+            'nodesAdded',
+            nodes=[node.nodeObject for node in nodes]
+        )
 
     def createNode(self, nodeClass, name=None, primPath=None, pos=None, **kwargs):
         # QCoreApplication.processEvents()
@@ -984,7 +1064,7 @@ class GraphicsScene(QtWidgets.QGraphicsScene):
         if nodeClass in Node.getAllNodeClassNames():
             if name is None:
                 name = nodeClass
-            nodeName, suffix, index = self._getUniqueName(name)
+            nodeName = self.graph.getUniqueName(name)
             nodeItem = NodeItem.createItem(
                 nodeClass,
                 stage=self.stage, layer=self.layer,
@@ -992,20 +1072,20 @@ class GraphicsScene(QtWidgets.QGraphicsScene):
                 **kwargs
             )
 
-            self.addItem(nodeItem)
-            nodeItem.afterAddToScene()
-            self._allNodes.update({nodeItem: nodeName})
-
             if pos is None:
-                center = self.view.getCenterPos()
-                pos = [center.x(), center.y()]
+                pos = self._getNewNodePos()
+            # placed before it is added to the index
             nodeItem.setX(pos[0])
             nodeItem.setY(pos[1])
 
-            if suffix in self._nodesSuffix:
-                self._nodesSuffix[suffix].append(index)
-            else:
-                self._nodesSuffix[suffix] = [index]
+            if self._bulkCreate is not None:
+                self._addBulkNode(nodeItem)
+            self.addItem(nodeItem)
+            self.graph.addNode(nodeItem.nodeObject)
+            nodeItem.afterAddToScene()
+
+            if self._bulkCreate is None:
+                self._nodesAdded([nodeItem])
 
             return nodeItem
 
@@ -1045,7 +1125,7 @@ class GraphicsScene(QtWidgets.QGraphicsScene):
         for pipe in pipes:
             pipe.breakConnection()
         self.removeItem(node)
-        self._allNodes.pop(node)
+        self.graph.removeNode(node.nodeObject)
         self.nodeDeleted.emit(node)
 
     def frameSelection(self):
@@ -1079,52 +1159,54 @@ class GraphicsScene(QtWidgets.QGraphicsScene):
             pipe.updatePath()
 
     def allNodes(self):
-        return list(self._allNodes.keys())
+        return [node.item for node in self.graph.allNodes()]
         # nodes = [item for item in self.items() if isinstance(item, NodeItem)]
         # return nodes
 
     def getNode(self, nodeName):
-        nodes = self.allNodes()
-        for node in nodes:
-            if node.name() == nodeName:
-                return node
+        node = self.graph.getNode(nodeName)
+        if node is not None:
+            return node.item
 
     def getNodes(self, type=None):
-        nodes = self.allNodes()
-        if type is None:
-            return nodes
-        if not isinstance(type, (list, tuple)):
-            type = [type]
-        nodes = [n for n in nodes if n.nodeType in type]
-        return nodes
+        return [node.item for node in self.graph.getNodes(type=type)]
 
     def getSelectedNodes(self):
         return [n for n in self.selectedItems() if isinstance(n, NodeItem)]
 
-    def getNodesAsXml(self, nodes):
-        rootElement = ET.Element('usdnodegraph')
-        nodesDict = {}
-        if len(nodes) > 0:
-            firstNode = nodes[0]
-            minX = firstNode.parameter('x').getValue()
-            minY = firstNode.parameter('y').getValue()
-            for node in nodes:
-                nodeElement = node.toXmlElement()
-                rootElement.append(nodeElement)
-
-                minX = min(node.parameter('x').getValue(), minX)
-                minY = min(node.parameter('y').getValue(), minY)
-
-            rootElement.set('x', str(minX))
-            rootElement.set('y', str(minY))
-            nodesString = convertToString(rootElement)
-            return nodesString
-        return ''
+    def writeNodes(self, nodes, writer, sidecar=None, attrib=None):
+        """
+        write the nodes one after another, the whole tree is never built
+        :param writer: XmlWriter
+        :param sidecar: ValueSidecar to save the big values to, they are written with the nodes without it
+        :param attrib: more attributes of the root element
+        """
+        if len(nodes) == 0:
+            return
+        minX = min(node.parameter('x').getValue() for node in nodes)
+        minY = min(node.parameter('y').getValue() for node in nodes)
 
-    def _exportNodesToFile(self, nodes, xmlfile):
-        nodesString = self.getNodesAsXml(nodes)
+        writer.writeDeclaration()
+        rootAttrib = {'x': str(minX), 'y': str(minY)}
+        rootAttrib.update(attrib or {})
+        writer.startElement('usdnodegraph', rootAttrib)
+        for node in nodes:
+            writer.writeElement(node.toXmlElement(sidecar=sidecar))
+        writer.endElement()
+
+    def getNodesAsXml(self, nodes, sidecar=None):
+        parts = []
+        self.writeNodes(nodes, XmlWriter(parts.append), sidecar=sidecar)
+        return ''.join(parts)
+
+    def _exportNodesToFile(self, nodes, xmlfile, attrib=None):
+        """
+        :param attrib: see writeNodes
+        """
+        sidecar = ValueSidecar.new()
         with open(xmlfile, 'w') as f:
-            f.write(nodesString)
+            self.writeNodes(nodes, XmlWriter(f.write), sidecar=sidecar, attrib=attrib)
+        sidecar.saveForXml(xmlfile)
 
     def getSelectedNodesAsXml(self):
         nodes = self.getSelectedNodes()
@@ -1142,7 +1224,7 @@ class GraphicsScene(QtWidgets.QGraphicsScene):
         nodes = self.getSelectedNodes()
         self._exportNodesToFile(nodes, xmlfile)
 
-    def createParamFromXml(self, paramElement, node, offsetX=0, offsetY=0):
+    def createParamFromXml(self, paramElement, node, offsetX=0, offsetY=0, sidecar=None):
         paramName = paramElement.get('n')
         if paramName in ['name']:
             return
@@ -1152,6 +1234,7 @@ class GraphicsScene(QtWidgets.QGraphicsScene):
         parameterType = paramElement.get('t')
         value = paramElement.get('val')
         connect = paramElement.get('con')
+        dataKey = paramElement.get('data')
         samples = paramElement.findall('s')
         metadatas = paramElement.findall('m')
         hints = paramElement.findall('h')
@@ -1165,7 +1248,12 @@ class GraphicsScene(QtWidgets.QGraphicsScene):
 
         if connect is not None:
             parameter.setConnect(connect)
-        if len(samples) == 0:
+        if dataKey is not None:
+            if sidecar is not None:
+                sidecar.readParameter(parameter, dataKey)
+            else:
+                logger.warning('No value sidecar for {}.{}'.format(node.name(), paramName))
+        elif len(samples) == 0:
             value = parameter.convertValueFromPy(value)
             if paramName == 'x':
                 value = offsetX + value
@@ -1189,14 +1277,14 @@ class GraphicsScene(QtWidgets.QGraphicsScene):
     def createMetadataFromXml(self, metadataElement, obj):
         key = metadataElement.get('k')
         value = metadataElement.get('v')
-        obj.setMetadata(key, value)
+        obj.setMetadata(key, value, valueType=metadataElement.get('t'))
 
     def createHintFromXml(self, hintElement, obj):
         key = hintElement.get('k')
         value = hintElement.get('v')
         obj.setHint(key, value)
 
-    def createNodeFromXml(self, nodeElement, _newNodes, _nameConvertDict, offsetX=0, offsetY=0):
+    def createNodeFromXml(self, nodeElement, _newNodes, _nameConvertDict, offsetX=0, offsetY=0, sidecar=None):
         oldNodeName = nodeElement.get('n')
         nodeClass = nodeElement.get('c')
         node = self.createNode(nodeClass, name=oldNodeName)
@@ -1206,7 +1294,7 @@ class GraphicsScene(QtWidgets.QGraphicsScene):
         _nameConvertDict.update({oldNodeName: newName})
 
         for paramElement in nodeElement.findall('p'):
-            self.createParamFromXml(paramElement, node, offsetX, offsetY)
+            self.createParamFromXml(paramElement, node, offsetX, offsetY, sidecar=sidecar)
 
         for metadataElement in nodeElement.findall('m'):
             self.createMetadataFromXml(metadataElement, node)
@@ -1214,53 +1302,59 @@ class GraphicsScene(QtWidgets.QGraphicsScene):
         node.afterAddToScene()
 
     def createConnectFromXml(self, nodeElement, _nameConvertDict):
-        oldNodeName = nodeElement.get('n')
+        self.createConnects(nodeElement.get('n'), getConnections(nodeElement), _nameConvertDict)
 
+    def createConnects(self, oldNodeName, connections, _nameConvertDict):
+        """
+        :param connections: see getConnections
+        """
         newNode = self.getNode(_nameConvertDict.get(oldNodeName))
         if newNode is None:
             return
 
-        for outputElement in nodeElement.findall('o'):
-            outputName = outputElement.get('n')
-            sourceNodeName = outputElement.get('conN')
-            sourceNodeInputName = outputElement.get('conP')
-
-            sourceNode = self.getNode(_nameConvertDict.get(sourceNodeName))
-            if sourceNode is None:
-                sourceNode = self.getNode(sourceNodeName)
-                if sourceNode is None:
-                    continue
-            sourceNode.connectSource(newNode, inputName=sourceNodeInputName, outputName=outputName)
-
-        for inputElement in nodeElement.findall('i'):
-            inputName = inputElement.get('n')
-            sourceNodeName = inputElement.get('conN')
-            sourceNodeOutputName = inputElement.get('conP')
-
+        for tag, portName, sourceNodeName, sourcePortName in connections:
             sourceNode = self.getNode(_nameConvertDict.get(sourceNodeName))
             if sourceNode is None:
                 sourceNode = self.getNode(sourceNodeName)
                 if sourceNode is None:
                     continue
-            newNode.connectSource(sourceNode, inputName=inputName, outputName=sourceNodeOutputName)
+            if tag == 'o':
+                sourceNode.connectSource(newNode, inputName=sourcePortName, outputName=portName)
+            else:
+                newNode.connectSource(sourceNode, inputName=portName, outputName=sourcePortName)
 
-    def createNodesFromXml(self, rootElement, offsetX=0, offsetY=0):
+    def createNodesFromXml(self, rootElement, offsetX=0, offsetY=0, sidecar=None):
+        """
+        :param rootElement: root element, or an iterator of the node elements, each is read once
+        """
         _nameConvertDict = {}
         _newNodes = []
-        for nodeElement in rootElement.getchildren():
-            self.createNodeFromXml(
-                nodeElement, _newNodes, _nameConvertDict,
-                offsetX, offsetY
-            )
+        # the connections wait for the nodes they refer to, only they are kept of the elements
+        _connections = []
+        _strings = {}
+        with self.bulkCreate():
+            for nodeElement in rootElement:
+                self.createNodeFromXml(
+                    nodeElement, _newNodes, _nameConvertDict,
+                    offsetX, offsetY, sidecar=sidecar
+                )
+                connections = getConnections(nodeElement, _strings)
+                if len(connections) > 0:
+                    _connections.append((nodeElement.get('n'), connections))
 
-        # connections
-        for nodeElement in rootElement.getchildren():
-            self.createConnectFromXml(nodeElement, _nameConvertDict)
+            for oldNodeName, connections in _connections:
+                self.createConnects(oldNodeName, connections, _nameConvertDict)
 
         return _newNodes
 
-    def pasteNodesFromXml(self, nodesString, selected=True):
-        rootElement = ET.fromstring(nodesString)
+    def pasteNodesFromXml(self, nodesString, selected=True, sidecar=None):
+        return self.pasteNodesFromElement(ET.fromstring(nodesString), selected=selected, sidecar=sidecar)
+
+    def pasteNodesFromElement(self, rootElement, selected=True, sidecar=None):
+        """
+        :param rootElement: root element of a .ung
+        :param sidecar: ValueSidecar of the file the nodes are read from
+        """
         _topLeftX = float(rootElement.get('x'))
         _topLeftY = float(rootElement.get('y'))
 
@@ -1268,7 +1362,7 @@ class GraphicsScene(QtWidgets.QGraphicsScene):
         offsetX = scenePos.x() - _topLeftX
         offsetY = scenePos.y() - _topLeftY
 
-        nodes = self.createNodesFromXml(rootElement, offsetX, offsetY)
+        nodes = self.createNodesFromXml(rootElement, offsetX, offsetY, sidecar=sidecar)
         if selected:
             for node in nodes:
                 node.setSelected(True)
@@ -1276,14 +1370,14 @@ class GraphicsScene(QtWidgets.QGraphicsScene):
         return nodes
 
     def exportToString(self):
-        stage = self._executeAllToStage()
+        stage = self.graph.executeToStage()
         return stage.GetRootLayer().ExportToString()
 
     def _exportToFile(self, exportFile):
         if not self.editable:
             QtWidgets.QMessageBox.warning(None, 'Warning', 'This layer can\'t be exported!')
             return
-        stage = self._executeAllToStage()
+        stage = self.graph.executeToStage()
         print(exportFile)
         stage.GetRootLayer().Export(exportFile)
 
@@ -1302,15 +1396,37 @@ class GraphicsScene(QtWidgets.QGraphicsScene):
         self._exportToFile(usdFile)
 
     def saveNodes(self):
+        """
+        only the nodes changed since the last save are appended to the journal of the .ung,
+        the whole .ung is written when there is no journal of this session to append to
+        """
         usdFile = self.layer.realPath
         xmlFile = os.path.splitext(usdFile)[0] + '.ung'
-        self.exportAllNodesToFile(xmlFile)
 
-    def applyChanges(self):
-        stage = self._executeAllToStage()
+        journal = self.ungJournal
+        if journal is not None and journal.ungFile == xmlFile and journal.canAppend():
+            nodes, removedNames = self.graph.getSaveChanges()
+            if len(nodes) > 0 or len(removedNames) > 0:
+                journal.append([node.item for node in nodes], removedNames)
+                self.graph.markSaved(nodes)
+            self.autosave.clearRecovery()
+            return
 
-        layerString = stage.GetRootLayer().ExportToString()
-        self.layer.ImportFromString(layerString)
+        if journal is None or journal.ungFile != xmlFile:
+            self.closeJournal()
+            journal = UngJournal(xmlFile)
+        journal.saveBase(
+            lambda token: self._exportNodesToFile(self.allNodes(), xmlFile, attrib={JOURNAL_TOKEN_ATTRIBUTE: token})
+        )
+        self.ungJournal = journal
+        self.graph.markSaved()
+        self.autosave.clearRecovery()
+
+    @log_cost_time
+    def applyChanges(self):
+        self.liveUpdateScheduler.cancel()
+        self.graph.applyChanges(self.layer)
+        self.graph.updateCollapsedSourcePaths()
 
         GraphState.executeCallbacks(
             'layerChangesApplied',
@@ -1319,77 +1435,61 @@ class GraphicsScene(QtWidgets.QGraphicsScene):
 
     def liveUpdateRequired(self):
         if GraphState.isLiveUpdate():
-            self.applyChanges()
+            self.liveUpdateScheduler.schedule()
 
     def setAsEditTarget(self):
         if self.stage is not None:
             self.stage.SetEditTarget(self.layer)
 
-    def _addNodeToPrimPath(self, nodeItem, path):
-        if path not in self._primNodes:
-            self._primNodes[path] = []
-        self._primNodes[path].append(nodeItem)
-
-    def reSyncPath(self, node, parentPaths=None):
-        node.reSyncPath(parentPaths)
-        syncPaths = node.getPrimPath()
-        for syncPath in syncPaths:
-            self._addNodeToPrimPath(node.item, syncPath)
-
-        for n in [i.nodeObject for i in node.item.getDestinations()]:
-            self.reSyncPath(n, syncPaths)
-
-    def reSyncPaths(self):
-        self._primNodes = {}
-        self.reSyncPath(self.getRootNode().nodeObject)
-
     def findNodeAtPath(self, path):
-        self.reSyncPaths()
-
-        find = False
-        findPath = path
-        findNodes = []
-        while not find:
-            for key, nodes in self._primNodes.items():
-                node = nodes[0]
-                sdfPath = Sdf.Path(key)
-                composedPath = sdfPath.StripAllVariantSelections()
-                # print key, composedPath
-                if composedPath == findPath:
-                    findNodes.append(node)
-                    find = True
-            if not find:
-                findPath = '/'.join(findPath.split('/')[:-1])
-                if findPath == '':
-                    findPath = '/'
-
+        return self.findNodesAtPaths([path])
+
+    def findNodesAtPaths(self, paths):
+        """
+        select the nodes of prim paths, like a stage selection,
+        prims no node authors get PrimOverride nodes under the deepest node above them
+        :param paths: prim paths without variant selections
+        :return: the selected items
+        """
         self.clearSelection()
 
-        primPath = findPath
-        if findPath != '/':
-            addPath = path.replace(findPath, '')
-        else:
-            addPath = path
-
-        addPrimNames = addPath.split('/')
-        for findNode in findNodes:
-            currentNode = findNode
-            for addPrimName in addPrimNames:
-                if addPrimName == '':
-                    continue
-
-                primPath += '/' + addPrimName
-
-                node = self.createNode('PrimOverride')
-                node.parameter('primName').setValue(addPrimName)
-                self._addChildNode(node, currentNode)
-                self._addNodeToPrimPath(node, primPath)
-                currentNode = node
+        # expand the collapsed prims the paths go into
+        nodesCreated = False
+        for path in paths:
+            while True:
+                findPath, nodes = self.graph.findNodesAbovePaths([path])[0]
+                if findPath is None:
+                    break
+                collapsedNodes = [node for node in nodes if node.Class() == 'PrimCollapsed']
+                for node in collapsedNodes:
+                    self.expandCollapsedNode(node.item, layout=False)
+                openedNodes = []
+                if findPath != Sdf.Path(path):
+                    childName = Sdf.Path(path).GetPrefixes()[findPath.pathElementCount].name
+                    for node in nodes:
+                        if node.Class() == 'PrimPassThrough':
+                            openedNodes.append(self.openPassThroughChild(node.item, childName, layout=False))
+                if len(collapsedNodes) == 0 and not any(openedNodes):
+                    break
+                nodesCreated = True
+
+        for path, (findPath, nodes) in zip(paths, self.graph.findNodesAbovePaths(paths)):
+            if findPath is None:
+                continue
+            addPrimNames = [name for name in str(path).split('/') if name != ''][findPath.pathElementCount:]
+            for node in nodes:
+                currentNode = node.item
+                for addPrimName in addPrimNames:
+                    node = self.createNode('PrimOverride')
+                    node.parameter('primName').setValue(addPrimName)
+                    self._addChildNode(node, currentNode)
+                    currentNode = node
+                    nodesCreated = True
 
-            currentNode.setSelected(True)
+                currentNode.setSelected(True)
 
-        self.layoutNodes()
-        self._layoutNode(findNode)
+        if nodesCreated:
+            self.layoutNodes()
 
         self.frameSelection()
 
@@ -7,6 +7,8 @@ from usdNodeGraph.ui.graph.view import GraphicsSceneWidget, isEditable
 from usdNodeGraph.ui.parameter.param_panel import ParameterPanel
 from usdNodeGraph.core.state.core import GraphState
 from usdNodeGraph.core.node.node import Node
+from usdNodeGraph.core.parse._journal import UngJournal
+from usdNodeGraph.ui.graph.autosave import findRecoveryFile
 from usdNodeGraph.ui.other.timeSlider import TimeSliderWidget
 from usdNodeGraph.utils.settings import User_Setting, read_setting, write_setting
 from usdNodeGraph.utils.res import resource
@@ -183,6 +185,7 @@ class UsdNodeGraph(QtWidgets.QMainWindow, WithMenuObject):
             ]],
             ['View', [
                 ['layout_nodes', 'Layout Nodes', None, self._layoutActionTriggered],
+                ['layout_selection', 'Layout Selection', None, self._layoutSelectionActionTriggered],
                 ['frame_selection', 'Frame Selection', None, self._frameSelectionActionTriggered],
             ]]
         ]
@@ -274,29 +277,29 @@ class UsdNodeGraph(QtWidgets.QMainWindow, WithMenuObject):
             stage = self.currentScene.scene.stage
             self.timeSlider.setStage(stage)
 
-    def _addUsdFile(self, usdFile, assetPath=None):
+    def _addUsdFile(self, usdFile, assetPath=None, background=False, importMask=None):
         if assetPath is None:
             assetPath = usdFile
         stage = Usd.Stage.Open(usdFile)
         stage.Reload()
-        self._addStage(stage, assetPath=assetPath)
+        self._addStage(stage, assetPath=assetPath, background=background, importMask=importMask)
 
-    def _addStage(self, stage, layer=None, assetPath=None):
+    def _addStage(self, stage, layer=None, assetPath=None, background=False, importMask=None):
         if layer is None:
             layer = stage.GetRootLayer()
 
-        self._addScene(stage, layer, assetPath)
+        self._addScene(stage, layer, assetPath, background=background, importMask=importMask)
         GraphState.executeCallbacks(
             'stageAdded',
             stage=stage, layer=layer
         )
 
-    def _addNewScene(self, stage=None, layer=None, assetPath=None):
+    def _addNewScene(self, stage=None, layer=None, assetPath=None, importMask=None):
         newScene = GraphicsSceneWidget(
             parent=self
         )
         if stage is not None:
-            newScene.setStage(stage, layer, assetPath, reset=False)
+            newScene.setStage(stage, layer, assetPath, reset=False, importMask=importMask)
             GraphState.setTimeIn(stage.GetStartTimeCode(), stage)
             GraphState.setTimeOut(stage.GetEndTimeCode(), stage)
             GraphState.setCurrentTime(stage.GetStartTimeCode(), stage)
@@ -314,7 +317,12 @@ class UsdNodeGraph(QtWidgets.QMainWindow, WithMenuObject):
 
         return newScene
 
-    def _addScene(self, stage, layer, assetPath):
+    def _addScene(self, stage, layer, assetPath, background=False, importMask=None):
+        """
+        :param background: import the layer on a worker thread with a progress dialog
+        :param importMask: PrimImportMask of the prims opened as nodes, None for all,
+        the other prims are placeholders which cook unchanged
+        """
         newScene = None
         for scene in self.scenes:
             if scene.stage == stage and scene.layer == layer:
@@ -322,8 +330,12 @@ class UsdNodeGraph(QtWidgets.QMainWindow, WithMenuObject):
                 return
 
         if newScene is None:
-            newScene = self._addNewScene(stage, layer, assetPath)
-            newScene.scene.resetScene()
+            newScene = self._addNewScene(stage, layer, assetPath, importMask=importMask)
+            recoveryFile = findRecoveryFile(layer.realPath, newScene.scene.autosave.recoveryDir)
+            if recoveryFile is not None and self._askRecovery(layer.realPath, recoveryFile):
+                newScene.scene.restoreRecovery(recoveryFile)
+            else:
+                newScene.scene.resetScene(background=background)
 
         # newScene.setStage(stage, layer)
         self.nodeGraphTab.setTabText(len(self.scenes) - 1, os.path.basename(layer.realPath))
@@ -331,9 +343,23 @@ class UsdNodeGraph(QtWidgets.QMainWindow, WithMenuObject):
 
         # self._switchScene()
 
+    def _askRecovery(self, layerFile, recoveryFile):
+        # hosts may answer with their own 'askRecovery' function
+        if GraphState.hasFunction('askRecovery'):
+            return GraphState.executeFunction('askRecovery', layerFile, recoveryFile)
+        answer = QtWidgets.QMessageBox.question(
+            None, 'Recover',
+            'An autosave of:\n{}\nis newer than its last save, recover it?\n{}'.format(layerFile, recoveryFile),
+            QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No
+        )
+        return answer == QtWidgets.QMessageBox.Yes
+
     def _tabCloseRequest(self, index):
         if self.nodeGraphTab.count() > 0:
             scene = self.nodeGraphTab.widget(index)
+            scene.scene.layerImporter.cancel()
+            scene.scene.autosave.stop()
+            scene.scene.closeJournal()
             self.nodeGraphTab.removeTab(index)
             self.scenes.remove(scene)
 
@@ -347,18 +373,18 @@ class UsdNodeGraph(QtWidgets.QMainWindow, WithMenuObject):
         self.parameterPanel.addNode(item)
         self.entityItemDoubleClicked.emit(item)
 
-    def _enterFileRequired(self, usdFile, assetPath, force=False):
+    def _enterFileRequired(self, usdFile, assetPath, force=False, importMask=None):
         usdFile = str(usdFile)
         if not force and not isEditable(usdFile):
             QtWidgets.QMessageBox.warning(None, 'Warning', 'The file:\n{}\ncan\'t be accessed'.format(assetPath))
             return
-        self._addUsdFile(usdFile, assetPath)
+        self._addUsdFile(usdFile, assetPath, background=True, importMask=importMask)
 
-    def _enterLayerRequired(self, stage, layer, assetPath, force=False):
+    def _enterLayerRequired(self, stage, layer, assetPath, force=False, importMask=None):
         if not force and not isEditable(layer.realPath):
             QtWidgets.QMessageBox.warning(None, 'Warning', 'The layer:\n{}\ncan\'t be accessed'.format(assetPath))
             return
-        self._addScene(stage, layer, assetPath)
+        self._addScene(stage, layer, assetPath, background=True, importMask=importMask)
 
     def _nodeDeleted(self, node):
         self.parameterPanel.removeNode(node.name())
@@ -373,11 +399,11 @@ class UsdNodeGraph(QtWidgets.QMainWindow, WithMenuObject):
             usdFile = usdFile[0]
         usdFile = str(usdFile)
         if os.path.exists(usdFile):
-            self.setUsdFile(usdFile)
+            self.setUsdFile(usdFile, background=True)
 
     def _reopenActionTriggered(self):
         if self._usdFile is not None:
-            self.setUsdFile(self._usdFile)
+            self.setUsdFile(self._usdFile, background=True)
 
     def _reloadStageActionTriggered(self):
         currentStage = self.currentScene.stage
@@ -389,7 +415,7 @@ class UsdNodeGraph(QtWidgets.QMainWindow, WithMenuObject):
         self.addStage(currentStage)
 
     def _reloadLayerActionTriggered(self):
-        self.currentScene.scene.reloadLayer()
+        self.currentScene.scene.reloadLayer(background=True)
 
     def _showEditTextActionTriggered(self):
         self.textEditDock.setVisible(True)
@@ -408,9 +434,8 @@ class UsdNodeGraph(QtWidgets.QMainWindow, WithMenuObject):
             xmlFile = xmlFile[0]
         xmlFile = str(xmlFile)
         if os.path.exists(xmlFile):
-            with open(xmlFile, 'r') as f:
-                nodesString = f.read()
-            nodes = self.currentScene.scene.pasteNodesFromXml(nodesString)
+            rootElement, sidecar = UngJournal(xmlFile).load()
+            nodes = self.currentScene.scene.pasteNodesFromElement(rootElement, sidecar=sidecar)
 
     def _exportNodesActionTriggered(self):
         xmlFile = QtWidgets.QFileDialog.getSaveFileName(None, 'Export', filter='USD Node Graph(*.ung *.xml)')
@@ -464,6 +489,9 @@ class UsdNodeGraph(QtWidgets.QMainWindow, WithMenuObject):
     def _layoutActionTriggered(self):
         self.currentScene.scene.layoutNodes()
 
+    def _layoutSelectionActionTriggered(self):
+        self.currentScene.scene.layoutSelection()
+
     def _disableSelectionActionTriggered(self):
         self.currentScene.scene.disableSelection()
 
@@ -474,30 +502,36 @@ class UsdNodeGraph(QtWidgets.QMainWindow, WithMenuObject):
         for i in range(self.nodeGraphTab.count()):
             self._tabCloseRequest(i)
 
-    def setUsdFile(self, usdFile):
+    def setUsdFile(self, usdFile, background=False, importMask=None):
         self._usdFile = usdFile
         self._clearScenes()
-        self._addUsdFile(usdFile)
+        self._addUsdFile(usdFile, background=background, importMask=importMask)
 
-    def addUsdFile(self, usdFile):
-        self._addUsdFile(usdFile)
+    def addUsdFile(self, usdFile, background=False, importMask=None):
+        self._addUsdFile(usdFile, background=background, importMask=importMask)
 
-    def setStage(self, stage, layer=None):
+    def setStage(self, stage, layer=None, background=False, importMask=None):
         self._clearScenes()
-        self._addStage(stage, layer)
+        self._addStage(stage, layer, background=background, importMask=importMask)
 
-    def addStage(self, stage, layer=None):
-        self._addStage(stage, layer)
+    def addStage(self, stage, layer=None, background=False, importMask=None):
+        self._addStage(stage, layer, background=background, importMask=importMask)
 
     def findNodeAtPath(self, path):
         nodes = self.currentScene.scene.findNodeAtPath(path)
         return nodes
 
+    def findNodesAtPaths(self, paths):
+        nodes = self.currentScene.scene.findNodesAtPaths(paths)
+        return nodes
+
     def createNode(self, nodeType):
         node = self.currentScene.scene.createNode(nodeType)
         return node
 
     def closeEvent(self, event):
+        for scene in self.scenes:
+            scene.scene.closeJournal()
         super(UsdNodeGraph, self).closeEvent(event)
         self.mainWindowClosed.emit()
 
@@ -57,5 +57,6 @@ class MetadataPanel(QtWidgets.QTableWidget):
         key = str(self.item(row, 0).text())
         value = str(self.item(row, 1).text())
 
-        self.nodeOrParam.setMetadata(key, value)
+        # the edited string keeps the type of the value it was
+        self.nodeOrParam.setMetadata(key, value, valueType=self.nodeOrParam.getMetadataType(key))
 
@@ -397,6 +397,9 @@ class NodeParameterWidget(QtWidgets.QFrame):
         layout.formLayout.addRow(parameterLabel, parameterWidget)
 
     def removeParameterConnections(self):
+        self._nodeItem.nodeObject.parameterAdded.disconnect(self._nodeParameterAdded)
+        self._nodeItem.nodeObject.parameterRemoved.disconnect(self._nodeParameterRemoved)
+        self._nodeItem.nodeObject.parameterPagesCleared.disconnect(self._nodeParameterPagesCleared)
         for paramName, widget in self._paramWidgets.items():
             param = self._nodeItem.parameter(paramName)
             param.removeParamWidget(widget)
@@ -430,8 +433,9 @@ class NodeParameterWidget(QtWidgets.QFrame):
 
     def updateUI(self):
         self.nodeTypeLabel.setText(self._nodeItem.nodeType)
-        self.nodePrimPathLabel.setText(':'.join(self._nodeItem.getPrimPath()))
-        self.nodePrimPathLabel.setToolTip('\n'.join(self._nodeItem.getPrimPath()))
+        primPaths = [path.pathString for path in self._nodeItem.getPrimPath()]
+        self.nodePrimPathLabel.setText(':'.join(primPaths))
+        self.nodePrimPathLabel.setToolTip('\n'.join(primPaths))
 
         for labelWidget in self._paramLabelWidgets.values():
             if labelWidget is not None:
@@ -8,9 +8,13 @@ from usdNodeGraph.ui.utils.log import LogWindow
 from ..param_edit.number_edit import IntEditWidget, FloatEditWidget
 from usdNodeGraph.utils.res import resource
 from usdNodeGraph.ui.utils.layout import FormLayout
+from usdNodeGraph.ui.utils.signal import connectUntilDestroyed, disconnectOnDestroyed, callOnDestroyed
 
 logger = get_logger('usdNodeGraph.ParameterWidget')
 
+# arrays longer than this are shown by size only, a widget per item does not scale
+ARRAY_EDIT_MAX_SIZE = 1000
+
 
 class ParameterWidget(object):
     # parameterClass = None
@@ -95,6 +99,9 @@ class ParameterWidget(object):
         self._parameter = parameter
         self._parameter.addParamWidget(self)
         self._reConnectSignal()
+        # the parameter doesn't keep the widget once it is deleted
+        disconnectOnDestroyed(parameter.valueChanged, self._parameterValueChanged)
+        callOnDestroyed(self, parameter.removeParamWidget)
         if update:
             self.updateUI()
 
@@ -286,9 +293,24 @@ class ArrayParameterWidget(QtWidgets.QWidget, ParameterWidget):
 
     def _updateUI(self):
         self.setToolTip(self._parameter.name())
-        text = 'expand...{}'.format(len(self._parameter.getValue()))
+        size = len(self._parameter.getValue())
+        if size > ARRAY_EDIT_MAX_SIZE:
+            text = '{}[{}]'.format(self._parameter.getChildParamClass().parameterTypeString, size)
+            toolTip = text
+            if self._parameter.hasSpecValue():
+                toolTip = '{}\n{}'.format(text, self._parameter.getSpecValue())
+            self.expandButton.setText(text)
+            self.expandButton.setToolTip(toolTip)
+            self.expandButton.setEnabled(False)
+            self.expandButton.setFixedHeight(20)
+            self.scrollArea.setVisible(False)
+            self.expanded = 0
+            return
+
+        text = 'expand...{}'.format(size)
         self.expandButton.setText(text)
         self.expandButton.setToolTip(text)
+        self.expandButton.setEnabled(True)
 
         if self.formLayout is not None and self.scrollArea.isVisible():
             clearLayout(self.formLayout)
@@ -525,7 +547,7 @@ class VecWidget(QtWidgets.QWidget):
             self.masterLayout.addWidget(lineEdit)
             self.lineEdits.append(lineEdit)
 
-        GraphState.getState().currentTimeChanged.connect(self.updateLineEditsUI)
+        connectUntilDestroyed(GraphState.getState().currentTimeChanged, self.updateLineEditsUI)
 
     def _editTextChanged(self):
         lineEdit = self.sender()
@@ -617,7 +639,7 @@ class MatrixWidget(VecWidget):
 
             self.masterLayout.addLayout(layout)
 
-        GraphState.getState().currentTimeChanged.connect(self.updateLineEditsUI)
+        connectUntilDestroyed(GraphState.getState().currentTimeChanged, self.updateLineEditsUI)
 
     def setPyValue(self, value):
         if not isinstance(value, list):
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 from usdNodeGraph.module.sqt import QtWidgets, QtGui, QtCore
+from usdNodeGraph.core.state import GraphState
 
 
 LOG_WINDOW = None
@@ -66,3 +67,5 @@ def getLogWindow():
     return LOG_WINDOW
 
 
+GraphState.setFunction('logWarning', LogWindow.warning)
+GraphState.setFunction('logError', LogWindow.error)
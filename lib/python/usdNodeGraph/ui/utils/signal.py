@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+
+import weakref
+
+
+def disconnectOnDestroyed(signal, slot):
+    """
+    disconnect slot from a python Signal of the core when the widget of the slot is destroyed,
+    the Signal doesn't know when the C++ object of a live python wrapper is deleted
+    :param signal: bound usdNodeGraph.utils.signal.Signal
+    :param slot: method of a QObject
+    """
+    func = slot.__func__
+    callOnDestroyed(slot.__self__, lambda instance: signal.disconnect(func.__get__(instance, type(instance))))
+
+
+def callOnDestroyed(qObject, func):
+    """
+    :param func: called with qObject when it is destroyed, qObject is kept as a weak reference until then
+    """
+    instanceRef = weakref.ref(qObject)
+
+    def destroyed(*args):
+        instance = instanceRef()
+        if instance is not None:
+            func(instance)
+
+    qObject.destroyed.connect(destroyed)
+
+
+def connectUntilDestroyed(signal, slot):
+    """
+    connect slot of a QObject to a python Signal of the core, it is disconnected when the QObject is destroyed
+    """
+    signal.connect(slot)
+    disconnectOnDestroyed(signal, slot)
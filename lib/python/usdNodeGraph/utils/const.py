@@ -18,3 +18,14 @@ OUTPUT_ATTRIBUTE_PREFIX = 'outputs:'
 
 VIEWPORT_FULL_UPDATE = os.environ.get('USD_NODEGRAPH_VIEWPORT_FULL_UPDATE', '0')
 
+
+# '1' to open the top prims collapsed when an import is cancelled, the scene is left empty otherwise
+IMPORT_CANCEL_COLLAPSED = os.environ.get('USD_NODEGRAPH_IMPORT_CANCEL_COLLAPSED', '0') == '1'
+
+
+# seconds between the autosaves of a changed scene, 0 to turn them off
+AUTOSAVE_INTERVAL = float(os.environ.get('USD_NODEGRAPH_AUTOSAVE_INTERVAL', '60'))
+# folder the recovery snapshots of the autosaves are written to
+AUTOSAVE_DIR = os.environ.get(
+    'USD_NODEGRAPH_AUTOSAVE_DIR', os.path.join(os.path.expanduser('~'), '.usd', 'recovery')
+)
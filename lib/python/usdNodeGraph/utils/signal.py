@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+import weakref
+
+
+class BoundSignal(object):
+    def __init__(self):
+        self._slots = []
+
+    def _getSlotRef(self, slot):
+        instance = getattr(slot, '__self__', None)
+        if instance is None:
+            return None, slot
+        return weakref.ref(instance), slot.__func__
+
+    def _resolveSlot(self, slotRef):
+        instanceRef, func = slotRef
+        if instanceRef is None:
+            return func
+        instance = instanceRef()
+        if instance is None:
+            return None
+        return func.__get__(instance, type(instance))
+
+    def _isSameSlot(self, slotRef, slot):
+        instanceRef, func = slotRef
+        instance = getattr(slot, '__self__', None)
+        if instanceRef is None:
+            return instance is None and func is slot
+        return instanceRef() is instance and func is slot.__func__
+
+    def connect(self, slot):
+        self._slots.append(self._getSlotRef(slot))
+
+    def disconnect(self, slot):
+        for slotRef in self._slots:
+            if self._isSameSlot(slotRef, slot):
+                self._slots.remove(slotRef)
+                return
+
+    def emit(self, *args):
+        for slotRef in list(self._slots):
+            func = self._resolveSlot(slotRef)
+            if func is None:
+                if slotRef in self._slots:
+                    self._slots.remove(slotRef)
+                continue
+            func(*args)
+
+
+class Signal(object):
+    """
+    pure python signal with the connect/disconnect/emit interface of QtCore.Signal,
+    so the core objects don't need Qt. bound methods are kept as weak references.
+    """
+    def __init__(self, *types):
+        self.types = types
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        key = '_signal_{}'.format(id(self))
+        signal = instance.__dict__.get(key)
+        if signal is None:
+            signal = BoundSignal()
+            instance.__dict__[key] = signal
+        return signal
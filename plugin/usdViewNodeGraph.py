@@ -50,6 +50,16 @@ def openNodeGraph(usdviewApi):
     mainWindow.nodeGraph.setStage(usdviewApi.stage)
 
 
+def findSelectedPrims(usdviewApi):
+    mainWindow = usdviewApi.qMainWindow
+    if not hasattr(mainWindow, 'nodeGraph'):
+        openNodeGraph(usdviewApi)
+
+    primPaths = [path.GetPrimPath() for path in usdviewApi.selectedPaths]
+    if len(primPaths) > 0:
+        mainWindow.nodeGraph.findNodesAtPaths(primPaths)
+
+
 class NodeGraphPluginContainer(PluginContainer):
     def registerPlugins(self, plugRegistry, usdviewApi):
         self.openItem = plugRegistry.registerCommandPlugin(
@@ -57,10 +67,16 @@ class NodeGraphPluginContainer(PluginContainer):
             'Open Node Graph',
             openNodeGraph
         )
+        self.findSelectedItem = plugRegistry.registerCommandPlugin(
+            'NodeGraphPluginContainer.FindSelected',
+            'Find Selected Prims In Node Graph',
+            findSelectedPrims
+        )
 
     def configureView(self, plugRegistry, plugUIBuilder):
         nodeGraphMenu = plugUIBuilder.findOrCreateMenu('NodeGraph')
         nodeGraphMenu.addItem(self.openItem)
+        nodeGraphMenu.addItem(self.findSelectedItem)
 
 
 Tf.Type.Define(NodeGraphPluginContainer)
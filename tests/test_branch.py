@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from usdNodeGraph.core.graph import Graph
+from usdNodeGraph.core.graph.branch import canForkProcesses
+from usdNodeGraph.core.state import GraphState
+
+pytestmark = pytest.mark.skipif(not canForkProcesses(), reason='branches are cooked in forked processes')
+
+
+def _buildGraph(processes, childNames=('c', 'd')):
+    graph = Graph()
+    graph.fragmentCache = None
+    graph.cookProcesses = processes
+    root = graph.createNode('Root')
+    for index, childName in enumerate(childNames):
+        top = graph.createNode('PrimDefine')
+        top.parameter('primName').setValue('B{}'.format(index))
+        graph.connect(root, top)
+        child = graph.createNode('PrimDefine')
+        child.parameter('primName').setValue(childName)
+        graph.connect(top, child)
+    return graph
+
+
+def _cook(graph, logError=None):
+    cookedPaths = {}
+    stage = graph.executeToStage(cookedPaths, logError=logError)
+    paths = sorted((node.name(), [path.pathString for path in nodePaths]) for node, nodePaths in cookedPaths.items())
+    return stage.GetRootLayer().ExportToString(), paths
+
+
+def test_same_as_sequential():
+    childNames = ['c{}'.format(index) for index in range(6)]
+    assert _cook(_buildGraph(3, childNames)) == _cook(_buildGraph(1, childNames))
+
+
+def test_errors_go_to_log_error():
+    globalErrors = []
+    logErrorFunc = GraphState.getFunction('logError')
+    GraphState.setFunction('logError', globalErrors.append)
+    try:
+        errors = []
+        output, paths = _cook(_buildGraph(2, childNames=('c', 'bad name', 'd')), logError=errors.append)
+    finally:
+        GraphState.setFunction('logError', logErrorFunc)
+
+    assert len(errors) == 1 and errors[0].startswith('Node Execute Error')
+    assert globalErrors == []
+    assert ('PrimDefine5', ['/B2/d']) in paths
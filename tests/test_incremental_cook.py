@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+from pxr import Sdf
+from usdNodeGraph.core.graph import Graph
+
+
+def _buildChain(primNames=('a', 'b', 'c', 'd')):
+    graph = Graph()
+    nodes = {}
+    source = graph.createNode('Root')
+    for primName in primNames:
+        node = graph.createNode('PrimDefine')
+        node.parameter('primName').setValue(primName)
+        graph.connect(source, node)
+        nodes[primName] = source = node
+    layer = Sdf.Layer.CreateAnonymous('.usda')
+    graph.applyChanges(layer)
+    return graph, nodes, layer
+
+
+def _assertSameAsFullCook(graph, layer):
+    graph.setCookDirty()
+    assert layer.ExportToString() == graph.executeToStage().GetRootLayer().ExportToString()
+
+
+def test_disconnect_removes_the_detached_prims():
+    graph, nodes, layer = _buildChain()
+    assert layer.GetPrimAtPath('/a/b/c/d') is not None
+
+    graph.disconnect(nodes['b'], nodes['c'])
+    graph.applyChanges(layer)
+
+    assert layer.GetPrimAtPath('/a/b') is not None
+    assert layer.GetPrimAtPath('/a/b/c') is None
+    _assertSameAsFullCook(graph, layer)
+
+
+def test_remove_node_removes_its_prims():
+    graph, nodes, layer = _buildChain()
+
+    graph.removeNode(nodes['c'])
+    graph.applyChanges(layer)
+
+    assert layer.GetPrimAtPath('/a/b/c') is None
+    assert layer.GetPrimAtPath('/a/b/c/d') is None
+    _assertSameAsFullCook(graph, layer)
+
+
+def test_set_attribute_value_without_a_stage():
+    graph, nodes, layer = _buildChain()
+    node = graph.createNode('AttributeSet')
+    graph.connect(nodes['b'], node)
+    parameter = node.addParameter('size', 'float', custom=True)
+    graph.applyChanges(layer)
+
+    parameter.setValue(2.0)
+    graph.applyChanges(layer)
+
+    assert layer.GetAttributeAtPath('/a/b.size').default == 2.0
+    _assertSameAsFullCook(graph, layer)
+
+
+def test_fragments_of_other_branches_hit_after_an_edit():
+    graph = Graph()
+    parent = graph.createNode('PrimDefine')
+    parent.parameter('primName').setValue('a')
+    graph.connect(graph.createNode('Root'), parent)
+    branches = []
+    for primName in ('b', 'c', 'd'):
+        node = graph.createNode('PrimDefine')
+        node.parameter('primName').setValue(primName)
+        graph.connect(parent, node)
+        branches.append(node)
+    graph.executeToStage()
+
+    cache = graph.fragmentCache
+    cache.resetStats()
+    branches[0].parameter('primName').setValue('e')
+    stage = graph.executeToStage()
+
+    assert stage.GetPrimAtPath('/a/e').IsValid()
+    assert not stage.GetPrimAtPath('/a/b').IsValid()
+    assert cache.hits == 3
+    assert cache.misses == 1
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from pxr import Gf, Sdf, Vt
+from usdNodeGraph.core.graph import Graph
+from usdNodeGraph.core.parse import _journal
+from usdNodeGraph.core.parse._journal import UngJournal, JOURNAL_TOKEN_ATTRIBUTE
+from usdNodeGraph.core.parse._sidecar import ValueSidecar, SIDECAR_MIN_SIZE
+from usdNodeGraph.core.parse._xml import ET, XmlWriter
+
+
+class _SavedNode(object):
+    def __init__(self, node):
+        self.node = node
+
+    def toXmlElement(self, sidecar=None):
+        nodeElement = ET.Element('n', {'n': self.node.name(), 'c': self.node.nodeType})
+        for param in self.node.parameters():
+            if param.isCustom():
+                nodeElement.append(param.toXmlElement(sidecar=sidecar))
+        return nodeElement
+
+
+def _points(value):
+    return Vt.Vec3fArray([Gf.Vec3f(value, value, value)] * (SIDECAR_MIN_SIZE + 1))
+
+
+def _createNodes():
+    graph = Graph()
+    nodes = []
+    for name in ['a', 'b', 'c']:
+        node = graph.createNode('AttributeSet', name=name)
+        node.addParameter('points', 'point3f[]', custom=True).setValueQuietly(_points(len(nodes)))
+        nodes.append(node)
+    return nodes
+
+
+def _writeUng(ungFile, nodes, token):
+    sidecar = ValueSidecar.new()
+    with open(ungFile, 'w') as f:
+        writer = XmlWriter(f.write)
+        writer.writeDeclaration()
+        writer.startElement('usdnodegraph', {JOURNAL_TOKEN_ATTRIBUTE: token})
+        for node in nodes:
+            writer.writeElement(_SavedNode(node).toXmlElement(sidecar=sidecar))
+        writer.endElement()
+    sidecar.saveForXml(ungFile)
+
+
+def _loadPoints(ungFile):
+    rootElement, sidecar = UngJournal(ungFile).load()
+    points = {}
+    for nodeElement in rootElement:
+        key = nodeElement.find('p').get('data')
+        points[nodeElement.get('n')] = sidecar.layer.GetAttributeAtPath(Sdf.Path(key)).default[0][0]
+    return points
+
+
+@pytest.mark.parametrize('crashAt', [0, 1, 2, None])
+def test_compact_is_crash_safe(tmpdir, monkeypatch, crashAt):
+    ungFile = str(tmpdir.join('a.ung'))
+    nodes = _createNodes()
+    journal = UngJournal(ungFile)
+    journal.saveBase(lambda token: _writeUng(ungFile, nodes, token))
+    # the values of the new .ung are not the ones of the old one
+    nodes[1].parameter('points').setValueQuietly(_points(5))
+    journal.append([_SavedNode(nodes[1])], ['a'])
+    assert _loadPoints(ungFile) == {'b': 5, 'c': 2}
+
+    replaceFile = _journal.replaceFile
+    calls = []
+
+    def crashingReplaceFile(source, target):
+        if len(calls) == crashAt:
+            raise KeyboardInterrupt('crash')
+        calls.append(target)
+        replaceFile(source, target)
+
+    monkeypatch.setattr(_journal, 'replaceFile', crashingReplaceFile)
+    if crashAt is None:
+        journal.compact()
+    else:
+        with pytest.raises(KeyboardInterrupt):
+            journal.compact()
+    assert _loadPoints(ungFile) == {'b': 5, 'c': 2}
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+from pxr import Sdf
+from usdNodeGraph.core.layer import applyLayerDiff
+
+
+def _newLayer(typeName=Sdf.ValueTypeNames.Float):
+    layer = Sdf.Layer.CreateAnonymous('.usda')
+    primSpec = Sdf.CreatePrimInLayer(layer, '/a')
+    primSpec.specifier = Sdf.SpecifierDef
+    Sdf.AttributeSpec(primSpec, 'value', typeName)
+    return layer
+
+
+def test_time_samples_added():
+    srcLayer = _newLayer()
+    dstLayer = _newLayer()
+    srcLayer.GetAttributeAtPath('/a.value').default = 1.0
+    dstLayer.GetAttributeAtPath('/a.value').default = 1.0
+    srcLayer.SetTimeSample('/a.value', 1, 2.0)
+    srcLayer.SetTimeSample('/a.value', 5, 3.0)
+
+    applyLayerDiff(srcLayer, dstLayer)
+
+    assert dstLayer.ListTimeSamplesForPath('/a.value') == [1.0, 5.0]
+    assert dstLayer.QueryTimeSample('/a.value', 5) == 3.0
+    assert dstLayer.ExportToString() == srcLayer.ExportToString()
+
+
+def test_time_samples_removed():
+    srcLayer = _newLayer()
+    dstLayer = _newLayer()
+    dstLayer.SetTimeSample('/a.value', 1, 2.0)
+
+    applyLayerDiff(srcLayer, dstLayer)
+
+    assert not dstLayer.GetAttributeAtPath('/a.value').HasInfo('timeSamples')
+
+
+def test_time_samples_changed():
+    srcLayer = _newLayer()
+    dstLayer = _newLayer()
+    srcLayer.SetTimeSample('/a.value', 1, 2.0)
+    dstLayer.SetTimeSample('/a.value', 1, 4.0)
+    dstLayer.SetTimeSample('/a.value', 2, 4.0)
+
+    applyLayerDiff(srcLayer, dstLayer, primPaths=['/a'])
+
+    assert dstLayer.ListTimeSamplesForPath('/a.value') == [1.0]
+    assert dstLayer.QueryTimeSample('/a.value', 1) == 2.0
+
+
+def test_default_keeps_float_type():
+    srcLayer = _newLayer()
+    dstLayer = _newLayer()
+    # not exact as a float, a double of it is written with more digits
+    srcLayer.GetAttributeAtPath('/a.value').default = 1.0 / 3.0
+    dstLayer.GetAttributeAtPath('/a.value').default = 0.0
+
+    applyLayerDiff(srcLayer, dstLayer)
+
+    assert dstLayer.ExportToString() == srcLayer.ExportToString()
+    assert '0.33333334' in dstLayer.ExportToString()
+
+
+def test_default_added_keeps_half_type():
+    srcLayer = _newLayer(Sdf.ValueTypeNames.Half)
+    dstLayer = _newLayer(Sdf.ValueTypeNames.Half)
+    srcLayer.GetAttributeAtPath('/a.value').default = 0.1
+
+    applyLayerDiff(srcLayer, dstLayer)
+
+    assert dstLayer.ExportToString() == srcLayer.ExportToString()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+from pxr import Gf, Sdf, Vt
+from usdNodeGraph.core.graph import Graph
+from usdNodeGraph.core.parse._sidecar import ValueSidecar, SIDECAR_MIN_SIZE
+
+LAYER = '''#usda 1.0
+def Mesh "m"
+{
+    point3f[] points = [(0, 0, 0), (1, 1, 1)]
+}
+'''
+
+
+def _importPoints(graph, layer):
+    root = graph.createNode('Root')
+    mesh = graph.createNode('Mesh')
+    mesh.parameter('primName').setValueQuietly('m')
+    graph.connect(root, mesh)
+    imported = graph.createNode('AttributeSet', primPath='/m', primSpec=layer.GetPrimAtPath('/m'))
+    graph.connect(mesh, imported)
+    return imported
+
+
+def test_imported_value_is_kept_when_the_layer_is_edited():
+    layer = Sdf.Layer.CreateAnonymous('.usda')
+    layer.ImportFromString(LAYER)
+
+    graph = Graph()
+    imported = _importPoints(graph, layer)
+    node = graph.createNode('AttributeSet')
+    graph.connect(imported, node)
+    node.addParameter('points', 'point3f[]', custom=False).setValueQuietly(Vt.Vec3fArray([Gf.Vec3f(5, 5, 5)]))
+
+    original = Vt.Vec3fArray([Gf.Vec3f(0, 0, 0), Gf.Vec3f(1, 1, 1)])
+    assert imported.parameter('points').hasSpecValue()
+    graph.applyChanges(layer)
+    assert layer.GetAttributeAtPath('/m.points').default == Vt.Vec3fArray([Gf.Vec3f(5, 5, 5)])
+    assert imported.parameter('points').getValue() == original
+
+    # a full cook gives the same points
+    graph.setCookDirty()
+    stage = graph.executeToStage()
+    assert stage.GetRootLayer().GetAttributeAtPath('/m.points').default == Vt.Vec3fArray([Gf.Vec3f(5, 5, 5)])
+
+
+def test_only_large_spec_values_go_to_the_sidecar():
+    layer = Sdf.Layer.CreateAnonymous('.usda')
+    layer.ImportFromString(LAYER)
+    parameter = _importPoints(Graph(), layer).parameter('points')
+    sidecar = ValueSidecar.new()
+    assert not sidecar.isLargeParameter(parameter)
+
+    layer.GetAttributeAtPath('/m.points').default = Vt.Vec3fArray(SIDECAR_MIN_SIZE + 1)
+    parameter = _importPoints(Graph(), layer).parameter('points')
+    assert sidecar.isLargeParameter(parameter)
+    assert not parameter.getSpecValue().isLoaded()
+
+
+def test_write_spec_value_to_the_sidecar():
+    layer = Sdf.Layer.CreateAnonymous('.usda')
+    layer.ImportFromString(LAYER)
+    specValue = _importPoints(Graph(), layer).parameter('points').getSpecValue()
+    sidecar = ValueSidecar.new()
+    key = sidecar.writeSpecValue(specValue)
+    assert not specValue.isLoaded()
+    assert sidecar.layer.GetAttributeAtPath(key).default == specValue.getSpec().default
+
+    # a loaded value is written as it was read
+    specValue.getValue()
+    specValue.getSpec().default = Vt.Vec3fArray([Gf.Vec3f(5, 5, 5)])
+    key = sidecar.writeSpecValue(specValue)
+    assert sidecar.layer.GetAttributeAtPath(key).default == specValue.getValue()
+    assert len(specValue.getValue()) == 2
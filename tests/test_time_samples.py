@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+
+from pxr import Gf
+from usdNodeGraph.core.graph import Graph
+
+
+def _cookKeys(timeSamples):
+    graph = Graph()
+    root = graph.createNode('Root')
+    prim = graph.createNode('PrimDefine')
+    prim.parameter('primName').setValue('a')
+    graph.connect(root, prim)
+    node = graph.createNode('AttributeSet')
+    graph.connect(prim, node)
+    parameter = node.addParameter('v', 'float3', custom=True)
+    parameter.setTimeSamplesQuietly(timeSamples)
+
+    errors = []
+    stage = graph.executeToStage(logError=errors.append)
+    attribute = stage.GetPrimAtPath('/a').GetAttribute('v')
+    return dict((t, attribute.Get(t)) for t in attribute.GetTimeSamples()), errors
+
+
+def test_keys_are_written():
+    keys, errors = _cookKeys({1.0: (1, 2, 3), 2.0: Gf.Vec3f(4, 5, 6)})
+    assert errors == []
+    assert keys == {1.0: Gf.Vec3f(1, 2, 3), 2.0: Gf.Vec3f(4, 5, 6)}
+
+
+def test_bad_key_goes_to_log_error():
+    keys, errors = _cookKeys({1.0: (1, 2, 3), 2.0: 'abc'})
+    assert len(errors) == 1
+    assert errors[0].startswith('Time Sample Error: AttributeSet.v at 2.0')
+    assert keys == {1.0: Gf.Vec3f(1, 2, 3)}